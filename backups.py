@@ -0,0 +1,174 @@
+"""Module Backups of kytos/pathfinder Kytos Network Application."""
+
+from collections import OrderedDict
+from threading import Condition, Thread
+
+from kytos.core import log
+
+
+class BackupPaths:
+    """Backup paths of the paths served or registered, by the links they use.
+
+    Each tracked path is keyed by its (source, destination, parameter,
+    undesired) query and indexed by the IDs of the links it crosses. A
+    background thread searches, for every tracked path, a backup path
+    sharing none of its links, again for all of them after each topology
+    update. When links fail, the paths crossing them are rerouted to their
+    backups, searched right away only when the backup is missing or failed
+    too. At most ``max_paths`` paths are tracked, the least recently used
+    one being dropped first.
+    """
+
+    def __init__(self, graph, max_paths):
+        self.graph = graph
+        self.max_paths = max_paths
+        self._paths = OrderedDict()
+        self._index = {}
+        self._backups = {}
+        self._stale = OrderedDict()
+        self._busy = False
+        self._condition = Condition()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._paths)
+
+    def _remove(self, query):
+        """Stop tracking the path of a query."""
+        _, link_ids = self._paths.pop(query)
+        for link_id in link_ids:
+            queries = self._index[link_id]
+            queries.discard(query)
+            if not queries:
+                del self._index[link_id]
+        self._backups.pop(query, None)
+        self._stale.pop(query, None)
+
+    def register(self, query, path, snapshot):
+        """Track the path of a query, served on a snapshot.
+
+        ``query`` is a (source, destination, parameter, undesired) tuple,
+        with undesired (endpoint_a, endpoint_b) links. Its backup is
+        searched in background.
+        """
+        if self.max_paths < 1 or not path:
+            return
+        link_ids = snapshot.get_path_links(path)
+        with self._condition:
+            if query in self._paths:
+                self._remove(query)
+            self._paths[query] = (list(path), link_ids)
+            for link_id in link_ids:
+                self._index.setdefault(link_id, set()).add(query)
+            while len(self._paths) > self.max_paths:
+                self._remove(next(iter(self._paths)))
+            self._stale[query] = None
+            self._start()
+
+    def get(self, query):
+        """Return the tracked path of a query and its backup, or None."""
+        with self._condition:
+            if query not in self._paths:
+                return None
+            return self._paths[query][0], self._backups.get(query)
+
+    def affected(self, link_ids):
+        """Return the queries whose tracked paths cross any of the links."""
+        with self._condition:
+            return {query for link_id in link_ids
+                    for query in self._index.get(link_id, ())}
+
+    def submit(self):
+        """Schedule every backup to be searched again on a new topology."""
+        with self._condition:
+            self._stale.update(dict.fromkeys(self._paths))
+            if self._stale:
+                self._start()
+
+    def wait(self, timeout=None):
+        """Wait until every stale backup was searched.
+
+        Return False if the timeout expired first.
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._stale and not self._busy, timeout)
+
+    def _start(self):
+        """Start the background thread, if needed, and wake it up."""
+        if self._thread is None:
+            self._thread = Thread(target=self._run, daemon=True,
+                                  name='pathfinder-backups')
+            self._thread.start()
+        self._condition.notify_all()
+
+    def _run(self):
+        """Search the stale backups forever."""
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._stale)
+                query, _ = self._stale.popitem(last=False)
+                path, link_ids = entry = self._paths[query]
+                self._busy = True
+            snapshot = self.graph.snapshot
+            try:
+                backup = self._search(snapshot, query,
+                                      snapshot.get_links_endpoints(link_ids))
+            except Exception as error:  # pylint: disable=broad-except
+                log.error(f'Backup path not searched for {path}: {error}')
+                backup = None
+            with self._condition:
+                if self._paths.get(query) is entry:
+                    self._backups[query] = backup
+                self._busy = False
+                self._condition.notify_all()
+            self.graph.metrics.count('backup_paths_searched')
+
+    @staticmethod
+    def _search(snapshot, query, avoided):
+        """Return the shortest path of a query avoiding some links, or []."""
+        source, destination, parameter, undesired = query
+        path = snapshot.get_search(parameter).shortest_path(
+            source, destination, parameter,
+            undesired=list(undesired) + avoided)
+        return path or []
+
+    @staticmethod
+    def _valid(snapshot, path):
+        """Return True if every hop of a path is an edge of the snapshot."""
+        return bool(path) and all(
+            snapshot.graph.has_edge(*hop) for hop in zip(path[:-1], path[1:]))
+
+    def reroute(self, previous, snapshot):
+        """Reroute the tracked paths crossing the links which failed.
+
+        Links of the ``previous`` snapshot missing from the current one
+        failed. Every tracked path crossing any of them is replaced with its
+        backup, or with the shortest path of its query on the current
+        snapshot when the backup is missing or not valid anymore, and the
+        backups of every path are searched again. Return the rerouted
+        queries, with their failed paths and replacements, which are empty
+        when there is no path left.
+        """
+        failed = previous.links.keys() - snapshot.links.keys()
+        rerouted = []
+        for query in self.affected(failed):
+            with self._condition:
+                if query not in self._paths:
+                    continue
+                path, _ = self._paths[query]
+                backup = self._backups.get(query)
+            if self._valid(snapshot, backup):
+                self.graph.metrics.count('backup_paths_used')
+            else:
+                backup = self._search(snapshot, query, [])
+            source, destination, parameter, _ = query
+            rerouted.append({'source': source, 'destination': destination,
+                             'parameter': parameter, 'path': path,
+                             'backup': backup})
+            with self._condition:
+                if query in self._paths:
+                    self._remove(query)
+            self.register(query, backup, snapshot)
+        self.submit()
+        return rerouted
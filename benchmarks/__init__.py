@@ -0,0 +1 @@
+"""Benchmarks of the pathfinder NApp over synthetic topologies."""
@@ -0,0 +1,203 @@
+r"""Run the pathfinder benchmarks and write their results as JSON.
+
+From the NApp directory, with the NApp installed::
+
+    python -m benchmarks.run --topology fat-tree mesh --size 2000 \
+        --output results.json
+    python -m benchmarks.run --size 2000 --baseline results.json
+
+Each topology is timed on graph build, incremental update, single pair,
+k-shortest, constrained and batch queries, and the memory held by the
+graph is recorded. With ``--baseline`` the timings are compared with a
+previous run and the regressions listed.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tracemalloc
+from datetime import datetime, timezone
+from statistics import mean, median
+from time import perf_counter
+
+import networkx as nx
+
+# pylint: disable=import-error
+from napps.kytos.pathfinder import settings
+from napps.kytos.pathfinder.constraints import Constraints
+from napps.kytos.pathfinder.graph import KytosGraph
+
+# pylint: enable=import-error
+from benchmarks.topologies import KINDS, generate
+
+
+def _summary(samples):
+    """Return the statistics of a list of durations in seconds."""
+    ordered = sorted(samples)
+    return {'count': len(ordered), 'total': sum(ordered),
+            'mean': mean(ordered), 'p50': median(ordered),
+            'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            'max': ordered[-1]}
+
+
+def _time(function, *args, **kwargs):
+    """Return the duration of a call and its result."""
+    start = perf_counter()
+    result = function(*args, **kwargs)
+    return perf_counter() - start, result
+
+
+def _queries(kytos_graph, pairs, **kwargs):
+    """Return the durations of one shortest_paths call per pair."""
+    kytos_graph.cache.clear(kytos_graph.version)
+    return [_time(kytos_graph.shortest_paths, source, destination,
+                  **kwargs)[0] for source, destination in pairs]
+
+
+def _memory(topology):
+    """Return the memory allocated to build the graph of a topology."""
+    tracemalloc.start()
+    kytos_graph = KytosGraph()
+    kytos_graph.update_topology(topology)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kytos_graph
+    return {'graph_bytes': current, 'build_peak_bytes': peak}
+
+
+def benchmark(topology, options):
+    """Run every benchmark on a topology and return its results."""
+    results = {'topology': topology.name,
+               'switches': len(topology.switches),
+               'interfaces': topology.interfaces,
+               'links': len(topology.links)}
+
+    build = []
+    for _ in range(options.repeat):
+        kytos_graph = KytosGraph()
+        build.append(_time(kytos_graph.update_topology, topology)[0])
+    results['build'] = _summary(build)
+
+    updates = []
+    for seed in range(options.repeat):
+        topology.change_links(options.changed, seed)
+        updates.append(_time(kytos_graph.update_topology, topology)[0])
+    results['incremental_update'] = _summary(updates)
+
+    pairs = topology.interface_pairs(options.queries, options.seed)
+    results['single_pair'] = _summary(_queries(
+        kytos_graph, pairs, parameter='delay', max_paths=1))
+    results['k_shortest'] = _summary(_queries(
+        kytos_graph, pairs, parameter='delay', max_paths=options.paths))
+    constraints = Constraints({'bandwidth': 40},
+                              budget={'delay': options.budget})
+    results['constrained'] = _summary(_queries(
+        kytos_graph, pairs, parameter='delay', max_paths=1,
+        constraints=constraints))
+
+    sources = [source for source, _ in pairs[:options.sources]]
+    queries = [(sources[index % len(sources)], destination, 'delay', 1,
+                [], [], None)
+               for index, (_, destination) in enumerate(pairs)]
+    kytos_graph.cache.clear(kytos_graph.version)
+    results['batch'] = _summary(
+        [_time(kytos_graph.batch_shortest_paths, queries)[0]])
+
+    results['memory'] = _memory(topology)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return the (topology, measure, ratio) of the regressed timings.
+
+    Median durations are compared, and a measure regresses when it is
+    slower than the baseline by more than the ``threshold`` fraction.
+    """
+    previous = {result['topology']: result
+                for result in baseline['results']}
+    regressions = []
+    for result in results['results']:
+        old = previous.get(result['topology'])
+        if old is None:
+            continue
+        for measure, value in result.items():
+            if not isinstance(value, dict) or 'p50' not in value or \
+                    not old.get(measure, {}).get('p50'):
+                continue
+            ratio = value['p50'] / old[measure]['p50']
+            if ratio > 1 + threshold:
+                regressions.append((result['topology'], measure, ratio))
+    return regressions
+
+
+def _parse(arguments):
+    """Return the command line options."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--topology', nargs='+', choices=KINDS,
+                        default=list(KINDS))
+    parser.add_argument('--size', type=int, default=1000,
+                        help='approximate number of switches')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='builds and incremental updates timed')
+    parser.add_argument('--queries', type=int, default=200,
+                        help='interface pairs queried')
+    parser.add_argument('--paths', type=int, default=5,
+                        help='paths of the k-shortest queries')
+    parser.add_argument('--sources', type=int, default=10,
+                        help='distinct sources of the batch queries')
+    parser.add_argument('--budget', type=int, default=1000,
+                        help='delay budget of the constrained queries')
+    parser.add_argument('--changed', type=float, default=0.01,
+                        help='fraction of links changed per update')
+    parser.add_argument('--backend', choices=('networkx', 'compact'),
+                        default=settings.GRAPH_BACKEND)
+    parser.add_argument('--no-switch-level', action='store_true',
+                        help='search the interface-level graph only')
+    parser.add_argument('--output', help='JSON file written, or stdout')
+    parser.add_argument('--baseline', help='JSON results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative slowdown reported as a regression')
+    return parser.parse_args(arguments)
+
+
+def main(arguments=None):
+    """Run the benchmarks and return the exit status.
+
+    The status is 1 when a timing regressed against the baseline.
+    """
+    options = _parse(arguments)
+    settings.GRAPH_BACKEND = options.backend
+    settings.SWITCH_LEVEL_SEARCH = not options.no_switch_level
+
+    results = {'created': datetime.now(timezone.utc).isoformat(),
+               'python': platform.python_version(),
+               'platform': platform.platform(),
+               'networkx': nx.__version__,
+               'options': vars(options),
+               'results': []}
+    for kind in options.topology:
+        topology = generate(kind, options.size, options.seed)
+        print(f'{topology.name}: {len(topology.switches)} switches, '
+              f'{len(topology.links)} links', file=sys.stderr)
+        results['results'].append(benchmark(topology, options))
+
+    output = json.dumps(results, indent=2)
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+    if not options.baseline:
+        return 0
+    with open(options.baseline, encoding='utf-8') as file:
+        regressions = compare(results, json.load(file), options.threshold)
+    for topology, measure, ratio in regressions:
+        print(f'{topology} {measure}: {ratio:.2f}x slower', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
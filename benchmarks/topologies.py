@@ -0,0 +1,189 @@
+"""Synthetic topologies shaped like the kytos/topology ones.
+
+Switches, interfaces and links only carry what KytosGraph reads from them:
+switch and interface IDs, the interfaces of each switch, and the endpoints,
+metadata and state of each link. Every topology is generated from a seed,
+so runs with the same arguments give the same graphs.
+"""
+
+from random import Random
+
+
+class Interface:
+    """Interface of a switch."""
+
+    def __init__(self, switch, port):
+        self.switch = switch
+        self.port_number = port
+        self.id = f'{switch.id}:{port}'  # pylint: disable=invalid-name
+
+
+class Switch:
+    """Switch with numbered interfaces."""
+
+    def __init__(self, number):
+        self.dpid = ':'.join(f'{number:016x}'[index:index + 2]
+                             for index in range(0, 16, 2))
+        self.id = self.dpid  # pylint: disable=invalid-name
+        self.interfaces = {}
+
+    def new_interface(self):
+        """Add an interface on the next free port and return it."""
+        interface = Interface(self, len(self.interfaces) + 1)
+        self.interfaces[interface.id] = interface
+        return interface
+
+
+class Link:
+    """Link between two interfaces."""
+
+    def __init__(self, endpoint_a, endpoint_b, metadata):
+        self.endpoint_a = endpoint_a
+        self.endpoint_b = endpoint_b
+        self.metadata = metadata
+        self.active = True
+
+    def is_active(self):
+        """Return True if the link is up."""
+        return self.active
+
+
+class Topology:
+    """Switches and links of a synthetic network.
+
+    Links get random 'delay' and 'bandwidth' metadata drawn from ``seed``.
+    """
+
+    def __init__(self, name, seed=0):
+        self.name = name
+        self.switches = {}
+        self.links = {}
+        self._switches = []
+        self._random = Random(seed)
+
+    @property
+    def interfaces(self):
+        """Return the number of interfaces."""
+        return sum(len(switch.interfaces)
+                   for switch in self.switches.values())
+
+    def add_switches(self, count):
+        """Add switches and return them."""
+        new = [Switch(len(self._switches) + number + 1)
+               for number in range(count)]
+        for switch in new:
+            self.switches[switch.dpid] = switch
+        self._switches.extend(new)
+        return new
+
+    def link(self, switch_a, switch_b):
+        """Link two switches through new interfaces and return the link."""
+        metadata = {'delay': self._random.randint(1, 100),
+                    'bandwidth': self._random.choice((10, 40, 100, 400))}
+        link = Link(switch_a.new_interface(), switch_b.new_interface(),
+                    metadata)
+        self.links[f'link-{len(self.links) + 1}'] = link
+        return link
+
+    def change_links(self, fraction, seed=0):
+        """Redraw the delay of a fraction of the links.
+
+        Return how many links were changed.
+        """
+        random = Random(seed)
+        links = random.sample(sorted(self.links),
+                              max(1, int(len(self.links) * fraction)))
+        for link_id in links:
+            metadata = dict(self.links[link_id].metadata)
+            metadata['delay'] = random.randint(1, 100)
+            self.links[link_id].metadata = metadata
+        return len(links)
+
+    def interface_pairs(self, count, seed=0):
+        """Return random (source, destination) pairs of interfaces."""
+        random = Random(seed)
+        interfaces = sorted(interface for switch in self.switches.values()
+                            for interface in switch.interfaces)
+        return [tuple(random.sample(interfaces, 2)) for _ in range(count)]
+
+
+def fat_tree(pods, seed=0):
+    """Return a k-ary fat-tree with ``pods`` pods, ``pods`` being even.
+
+    It has (pods / 2) ** 2 core switches and ``pods`` aggregation and edge
+    switches per pod, for 5 * pods ** 2 / 4 switches.
+    """
+    half = pods // 2
+    topology = Topology(f'fat-tree-{pods}', seed)
+    core = topology.add_switches(half * half)
+    for _ in range(pods):
+        aggregation = topology.add_switches(half)
+        edge = topology.add_switches(half)
+        for position, switch in enumerate(aggregation):
+            for other in edge:
+                topology.link(switch, other)
+            for other in core[position * half:(position + 1) * half]:
+                topology.link(switch, other)
+    return topology
+
+
+def ring(switches, seed=0):
+    """Return a ring of switches."""
+    topology = Topology(f'ring-{switches}', seed)
+    nodes = topology.add_switches(switches)
+    for position, switch in enumerate(nodes):
+        topology.link(switch, nodes[(position + 1) % switches])
+    return topology
+
+
+def mesh(rows, columns=None, seed=0):
+    """Return a grid of switches, each linked to its four neighbors."""
+    columns = columns or rows
+    topology = Topology(f'mesh-{rows}x{columns}', seed)
+    nodes = topology.add_switches(rows * columns)
+    for row in range(rows):
+        for column in range(columns):
+            switch = nodes[row * columns + column]
+            if column + 1 < columns:
+                topology.link(switch, nodes[row * columns + column + 1])
+            if row + 1 < rows:
+                topology.link(switch, nodes[(row + 1) * columns + column])
+    return topology
+
+
+def random_graph(switches, degree=4, seed=0):
+    """Return a connected random topology with the given average degree.
+
+    A random spanning tree keeps the switches connected, and the remaining
+    links join random pairs of switches.
+    """
+    topology = Topology(f'random-{switches}', seed)
+    random = Random(seed)
+    nodes = topology.add_switches(switches)
+    order = list(nodes)
+    random.shuffle(order)
+    for position in range(1, switches):
+        topology.link(order[position], order[random.randrange(position)])
+    for _ in range(max(0, switches * degree // 2 - (switches - 1))):
+        switch_a, switch_b = random.sample(nodes, 2)
+        topology.link(switch_a, switch_b)
+    return topology
+
+
+def generate(kind, size, seed=0):
+    """Return a topology of a kind with about ``size`` switches."""
+    if kind == 'fat-tree':
+        pods = 2
+        while 5 * (pods + 2) ** 2 // 4 <= size:
+            pods += 2
+        return fat_tree(pods, seed)
+    if kind == 'ring':
+        return ring(size, seed)
+    if kind == 'mesh':
+        return mesh(max(2, int(size ** 0.5)), seed=seed)
+    if kind == 'random':
+        return random_graph(size, seed=seed)
+    raise ValueError(f'Unknown topology kind: {kind}')
+
+
+KINDS = ('fat-tree', 'ring', 'mesh', 'random')
@@ -0,0 +1,147 @@
+"""Module Cache of kytos/pathfinder Kytos Network Application."""
+
+from collections import OrderedDict
+from sys import getsizeof
+from threading import Lock
+from time import monotonic
+
+
+class PathCache:
+    """LRU cache of calculated paths, bounded by entries, memory and TTL.
+
+    Each entry remembers the nodes and links its paths go through, and the
+    tokens its result depends on, so a topology update only drops the
+    entries touching what was changed. The
+    cache follows the topology version: entries are only read or stored for
+    the version of the last invalidation.
+    """
+
+    def __init__(self, max_entries, max_bytes, ttl):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version = 0
+        self.size = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0,
+                      'expirations': 0, 'invalidations': 0}
+        self._entries = OrderedDict()
+        self._elements = {}
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _path_elements(paths):
+        """Return the nodes and links the paths go through."""
+        elements = set()
+        for path in paths:
+            elements.update(path)
+            elements.update(frozenset(link)
+                            for link in zip(path[:-1], path[1:]))
+        return elements
+
+    def _remove(self, key):
+        """Remove an entry and its elements from the index."""
+        _, paths, elements, size = self._entries.pop(key)
+        for element in elements:
+            keys = self._elements[element]
+            keys.discard(key)
+            if not keys:
+                del self._elements[element]
+        self.size -= size
+        return paths
+
+    def get(self, key, version):
+        """Return the paths cached for the key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or version != self.version:
+                self.stats['misses'] += 1
+                return None
+            if entry[0] < monotonic():
+                self._remove(key)
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return [list(path) for path in entry[1]]
+
+    # pylint: disable=too-many-arguments
+    def put(self, key, version, paths, complete=True, depends=()):
+        """Store the paths calculated for the key on a topology version.
+
+        Paths calculated on an outdated version are not stored. Incomplete
+        results, with fewer paths than requested, are marked so they can be
+        dropped when new nodes or links show up. ``depends`` are hashable
+        tokens of anything else the result depends on, dropping the entry
+        when they are invalidated.
+        """
+        if self.max_entries < 1:
+            return
+        paths = tuple(tuple(path) for path in paths)
+        elements = self._path_elements(paths)
+        elements.update(depends)
+        if not complete:
+            elements.add(None)
+        size = getsizeof(paths) + sum(getsizeof(path) for path in paths)
+
+        with self._lock:
+            if version != self.version:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (monotonic() + self.ttl, paths, elements,
+                                  size)
+            for element in elements:
+                self._elements.setdefault(element, set()).add(key)
+            self.size += size
+
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or self.size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.stats['evictions'] += 1
+
+    # pylint: disable=too-many-arguments
+    def invalidate(self, version, nodes=(), links=(), added=False,
+                   depends=()):
+        """Drop the entries touching the changed nodes and links.
+
+        ``links`` are (endpoint_a, endpoint_b) pairs. When ``added`` is True
+        incomplete entries are dropped too, as new nodes or links may give
+        them more paths. Entries stored with any of the ``depends`` tokens
+        are dropped as well. Return how many entries were dropped.
+        """
+        elements = set(nodes)
+        elements.update(frozenset(link) for link in links)
+        elements.update(depends)
+        if added:
+            elements.add(None)
+
+        with self._lock:
+            self.version = version
+            keys = set()
+            for element in elements:
+                keys.update(self._elements.get(element, ()))
+            for key in keys:
+                self._remove(key)
+            self.stats['invalidations'] += len(keys)
+        return len(keys)
+
+    def clear(self, version):
+        """Drop all the entries."""
+        with self._lock:
+            self.version = version
+            self.stats['invalidations'] += len(self._entries)
+            self._entries.clear()
+            self._elements.clear()
+            self.size = 0
+
+    def get_stats(self):
+        """Return the cache counters and its current size."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self.size
+        return stats
@@ -0,0 +1,854 @@
+"""Module Compact of kytos/pathfinder Kytos Network Application."""
+
+from array import array
+from heapq import heappop, heappush
+from itertools import accumulate, count
+from math import inf
+from threading import Lock
+
+# pylint: disable=import-error
+from napps.kytos.pathfinder.cost import Cost
+
+# pylint: enable=import-error
+
+# Decimal places to which path costs are compared when looking for all the
+# paths of least cost
+COST_DECIMALS = 9
+
+
+class CompactGraph:
+    """Graph with integer node IDs and the adjacency stored in CSR arrays.
+
+    Node IDs are interned to the integers ``0..n-1``. The neighbors of node
+    ``i`` are ``targets[offsets[i]:offsets[i + 1]]``, and ``edges`` holds, at
+    the same positions, the ID of the undirected edge leading to each of
+    them. Edge metrics are columns indexed by edge ID, built once per metric
+    and shared by every search on this graph.
+
+    Each edge is given as (endpoint_a, endpoint_b, parts), where parts is a
+    tuple of metadata dicts whose weights add up to the edge weight. Parallel
+    edges are allowed.
+
+    Instances are never changed after being built, so they can be searched
+    from many threads. Landmarks may be attached later to guide the searches
+    on a metric column.
+    """
+
+    def __init__(self, nodes, edges):
+        self.nodes = list(nodes)
+        self.index = {node: position for position, node
+                      in enumerate(self.nodes)}
+        self.endpoints_a = array('i')
+        self.endpoints_b = array('i')
+        self._metadata = []
+
+        degrees = [0] * (len(self.nodes) + 1)
+        for endpoint_a, endpoint_b, parts in edges:
+            node_a, node_b = self.index[endpoint_a], self.index[endpoint_b]
+            self.endpoints_a.append(node_a)
+            self.endpoints_b.append(node_b)
+            self._metadata.append(parts)
+            degrees[node_a + 1] += 1
+            degrees[node_b + 1] += 1
+
+        self.offsets = array('i', accumulate(degrees))
+        self.targets = array('i', [0]) * self.offsets[-1]
+        self.edges = array('i', [0]) * self.offsets[-1]
+        positions = list(self.offsets[:-1])
+        for edge, node_a in enumerate(self.endpoints_a):
+            node_b = self.endpoints_b[edge]
+            for node, neighbor in ((node_a, node_b), (node_b, node_a)):
+                self.targets[positions[node]] = neighbor
+                self.edges[positions[node]] = edge
+                positions[node] += 1
+
+        self._columns = {}
+        self._cost_terms = {}
+        self._landmarks = {}
+        self._columns_lock = Lock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_columns_lock']
+        with self._columns_lock:
+            state['_columns'] = dict(self._columns)
+            state['_cost_terms'] = dict(self._cost_terms)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._columns_lock = Lock()
+
+    def reweighted(self, graph, links):
+        """Return a copy of this graph with new metadata on some links.
+
+        ``graph`` must have the nodes and edges this graph was built from,
+        only the metadata of the (endpoint_a, endpoint_b) ``links`` having
+        changed. The CSR arrays are shared, and the metric columns already
+        built are copied with only the changed edges weighed again.
+        """
+        metadata = list(self._metadata)
+        changed = set()
+        for link in links:
+            for edge, parts in self._relinked(graph, link).items():
+                metadata[edge] = parts
+                changed.add(edge)
+
+        state = self.__getstate__()
+        columns = {}
+        for parameter, column in state['_columns'].items():
+            if isinstance(parameter, Cost):
+                continue
+            column = array('d', column)
+            for edge in changed:
+                column[edge] = sum(self._part_weight(part, parameter)
+                                   for part in metadata[edge])
+            columns[parameter] = column
+        state.update(_metadata=metadata, _columns=columns, _cost_terms={},
+                     _landmarks={})
+        copy = self.__class__.__new__(self.__class__)
+        copy.__setstate__(state)
+        return copy
+
+    def _relinked(self, graph, link):
+        """Return the parts of the edges of a link, by edge ID."""
+        endpoint_a, endpoint_b = link
+        return {edge: (graph[endpoint_a][endpoint_b],)
+                for edge in self._edge_ids([link])}
+
+    @classmethod
+    def from_graph(cls, graph):
+        """Create a CompactGraph with the nodes and edges of a nx.Graph."""
+        return cls(graph, ((endpoint_a, endpoint_b, (metadata,))
+                           for endpoint_a, endpoint_b, metadata
+                           in graph.edges(data=True)))
+
+    @property
+    def number_of_edges(self):
+        """Return the number of undirected edges."""
+        return len(self.endpoints_a)
+
+    def column(self, parameter=None):
+        """Return the weights of every edge for a metadata key or a Cost.
+
+        Edges without the key weigh 1, as in networkx searches, and a None
+        parameter gives the hop count column. Cost columns combine the
+        columns of their metrics.
+        """
+        column = self._columns.get(parameter)
+        if column is None and isinstance(parameter, Cost):
+            column = self._combine(self._terms(parameter))
+            with self._columns_lock:
+                column = self._columns.setdefault(parameter, column)
+        elif column is None:
+            with self._columns_lock:
+                column = self._columns.get(parameter)
+                if column is None:
+                    if parameter is None:
+                        column = array('d', (len(parts)
+                                             for parts in self._metadata))
+                    else:
+                        column = array('d', (sum(part.get(parameter, 1)
+                                                 for part in parts)
+                                             for parts in self._metadata))
+                    self._columns[parameter] = column
+        return column
+
+    def set_landmarks(self, landmarks):
+        """Guide the searches on the column of some landmarks with them.
+
+        Landmarks replace the ones previously set for the same parameter.
+        """
+        with self._columns_lock:
+            self._landmarks = {**self._landmarks,
+                               landmarks.parameter: landmarks}
+
+    def get_landmarks(self, weights):
+        """Return the landmarks computed over a weights column, or None."""
+        for landmarks in self._landmarks.values():
+            if landmarks.weights is weights:
+                return landmarks
+        return None
+
+    def _terms(self, cost):
+        """Return the (metric, factor) terms of a Cost on this graph."""
+        terms = self._cost_terms.get(cost)
+        if terms is None:
+            terms = self._cost_terms.setdefault(cost, cost.terms(self))
+        return terms
+
+    def _combine(self, terms):
+        """Return the column of a linear combination of metric columns."""
+        columns = [self.column(metric) for metric, _ in terms]
+        factors = [factor for _, factor in terms]
+        return array('d', (sum(factor * value for factor, value
+                               in zip(factors, values))
+                           for values in zip(*columns)))
+
+    def _part_weight(self, metadata, parameter=None):
+        """Return the weight of a single metadata dict of an edge."""
+        if isinstance(parameter, Cost):
+            return sum(factor * self._part_weight(metadata, metric)
+                       for metric, factor in self._terms(parameter))
+        return 1 if parameter is None else metadata.get(parameter, 1)
+
+    def edge_id(self, node_a, node_b):
+        """Return the ID of the edge between two interned nodes, or None."""
+        for position in range(self.offsets[node_a], self.offsets[node_a + 1]):
+            if self.targets[position] == node_b:
+                return self.edges[position]
+        return None
+
+    def _edge_ids(self, links):
+        """Return the IDs of the existing edges among (node, node) links."""
+        ids = set()
+        for endpoint_a, endpoint_b in links or ():
+            try:
+                edge = self.edge_id(self.index[endpoint_a],
+                                    self.index[endpoint_b])
+            except KeyError:
+                continue
+            if edge is not None:
+                ids.add(edge)
+        return ids
+
+    # pylint: disable=too-many-locals
+    def _dijkstra(self, source, weights, hidden_nodes=(), hidden_edges=()):
+        """Run Dijkstra from source over interned node IDs.
+
+        Return the distances and, for each reached node, the edge used to
+        reach it.
+        """
+        offsets, targets, edges = self.offsets, self.targets, self.edges
+        distances = {source: 0}
+        previous = {}
+        settled = set()
+        heap = [(0, source)]
+        while heap:
+            distance, node = heappop(heap)
+            if node in settled:
+                continue
+            settled.add(node)
+            for position in range(offsets[node], offsets[node + 1]):
+                neighbor = targets[position]
+                if neighbor in settled or neighbor in hidden_nodes:
+                    continue
+                edge = edges[position]
+                if edge in hidden_edges:
+                    continue
+                new_distance = distance + weights[edge]
+                if new_distance < distances.get(neighbor, inf):
+                    distances[neighbor] = new_distance
+                    previous[neighbor] = edge
+                    heappush(heap, (new_distance, neighbor))
+        return distances, previous
+
+    def _walk_back(self, previous, source, target):
+        """Return the nodes and edges from source to target."""
+        nodes, edges = [target], []
+        while nodes[-1] != source:
+            edge = previous[nodes[-1]]
+            edges.append(edge)
+            node_a = self.endpoints_a[edge]
+            nodes.append(node_a if node_a != nodes[-1]
+                         else self.endpoints_b[edge])
+        nodes.reverse()
+        edges.reverse()
+        return nodes, edges
+
+    # pylint: disable=too-many-arguments,too-many-locals
+    def _bidirectional(self, source, target, weights, hidden_nodes=(),
+                       hidden_edges=()):
+        """Run Dijkstra from both ends until the two searches meet.
+
+        Return the cost of the shortest path and the node where the searches
+        met, with the edges used to reach each node from either end, or None
+        when there is no path.
+        """
+        offsets, targets, edges = self.offsets, self.targets, self.edges
+        distances = ({source: 0}, {target: 0})
+        previous = ({}, {})
+        settled = (set(), set())
+        heaps = ([(0, source)], [(0, target)])
+        best, meeting = inf, None
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            distance, node = heappop(heaps[side])
+            if node in settled[side]:
+                continue
+            settled[side].add(node)
+            side_distances, other_distances = distances[side], \
+                distances[1 - side]
+            for position in range(offsets[node], offsets[node + 1]):
+                neighbor = targets[position]
+                if neighbor in settled[side] or neighbor in hidden_nodes:
+                    continue
+                edge = edges[position]
+                if edge in hidden_edges:
+                    continue
+                new_distance = distance + weights[edge]
+                if new_distance < side_distances.get(neighbor, inf):
+                    side_distances[neighbor] = new_distance
+                    previous[side][neighbor] = edge
+                    heappush(heaps[side], (new_distance, neighbor))
+                total = new_distance + other_distances.get(neighbor, inf)
+                if total < best:
+                    best, meeting = total, neighbor
+        if meeting is None:
+            return None
+        return best, meeting, previous
+
+    # pylint: disable=too-many-arguments,too-many-locals
+    def _astar(self, source, target, weights, landmarks, hidden_nodes=(),
+               hidden_edges=()):
+        """Run A* from source to target with landmark lower bounds (ALT).
+
+        Nodes are settled by distance plus their lower bound to the target,
+        which keeps the search heading towards it, and nodes the landmarks
+        tell cannot reach the target are never queued. Return the cost,
+        nodes and edges of a shortest path, or None.
+        """
+        offsets, targets, edges = self.offsets, self.targets, self.edges
+        bound = landmarks.heuristic(target)
+        if bound(source) == inf:
+            return None
+        distances = {source: 0}
+        previous = {}
+        settled = set()
+        heap = [(bound(source), source)]
+        while heap:
+            _, node = heappop(heap)
+            if node in settled:
+                continue
+            if node == target:
+                nodes, path_edges = self._walk_back(previous, source, target)
+                return distances[target], nodes, path_edges
+            settled.add(node)
+            distance = distances[node]
+            for position in range(offsets[node], offsets[node + 1]):
+                neighbor = targets[position]
+                if neighbor in settled or neighbor in hidden_nodes:
+                    continue
+                edge = edges[position]
+                if edge in hidden_edges:
+                    continue
+                new_distance = distance + weights[edge]
+                if new_distance < distances.get(neighbor, inf):
+                    estimate = bound(neighbor)
+                    if estimate == inf:
+                        continue
+                    distances[neighbor] = new_distance
+                    previous[neighbor] = edge
+                    heappush(heap, (new_distance + estimate, neighbor))
+        return None
+
+    # pylint: disable=too-many-arguments
+    def _shortest_path(self, source, target, weights, hidden_nodes=(),
+                       hidden_edges=()):
+        """Return the cost, nodes and edges of a shortest path, or None.
+
+        Searches run A* when landmarks were set for the weights column, and
+        bidirectional Dijkstra otherwise. Hiding nodes and edges only makes
+        paths longer, so the landmark bounds still hold; weights lowered from
+        the column, like the terminal discounts of SwitchGraph, are another
+        column and are searched without landmarks.
+        """
+        if source == target:
+            return 0, [source], []
+        landmarks = self.get_landmarks(weights)
+        if landmarks is not None:
+            return self._astar(source, target, weights, landmarks,
+                               hidden_nodes, hidden_edges)
+        result = self._bidirectional(source, target, weights, hidden_nodes,
+                                     hidden_edges)
+        if result is None:
+            return None
+        cost, meeting, previous = result
+        nodes, edges = self._walk_back(previous[0], source, meeting)
+        back_nodes, back_edges = self._walk_back(previous[1], target,
+                                                 meeting)
+        return (cost, nodes + back_nodes[-2::-1],
+                edges + back_edges[::-1])
+
+    def _yen(self, source, target, weights, hidden_edges):
+        """Yield loopless paths from source to target, cheapest first.
+
+        This is Yen's algorithm: each new path is the cheapest deviation
+        from the previous ones, found by a spur search from every node of
+        the last accepted path. Paths are yielded as (nodes, edges) lists,
+        and paths differing only by parallel edges are told apart.
+        """
+        first = self._shortest_path(source, target, weights, (),
+                                    hidden_edges)
+        if first is None:
+            return
+        accepted = [first]
+        seen = {tuple(first[2])}
+        candidates = []
+        yield first[1], first[2]
+
+        while True:
+            _, nodes, edges = accepted[-1]
+            root_cost = 0
+            for spur in range(len(nodes) - 1):
+                removed = set(hidden_edges)
+                for _, _, path_edges in accepted:
+                    if path_edges[:spur] == edges[:spur]:
+                        removed.add(path_edges[spur])
+                deviation = self._shortest_path(nodes[spur], target, weights,
+                                                set(nodes[:spur]), removed)
+                if deviation is not None:
+                    path_edges = edges[:spur] + deviation[2]
+                    if tuple(path_edges) not in seen:
+                        seen.add(tuple(path_edges))
+                        path = nodes[:spur] + deviation[1]
+                        heappush(candidates, (root_cost + deviation[0],
+                                              len(path), path, path_edges))
+                root_cost += weights[edges[spur]]
+
+            if not candidates:
+                return
+            cost, _, path, path_edges = heappop(candidates)
+            accepted.append((cost, path, path_edges))
+            yield path, path_edges
+
+    # pylint: disable=too-many-arguments,too-many-locals
+    def constrained_paths(self, source, destination, parameter=None,
+                          budget=(), undesired=None, max_labels=None):
+        """Yield the simple paths within metric budgets, cheapest first.
+
+        ``budget`` is a list of (metadata key, limit) pairs, and the total
+        of each key along a path must not exceed its limit. This is a
+        label-setting search: each label is a partial path from the source,
+        expanded best-first by its cost plus the least cost left to the
+        destination, so paths reach it in cost order. Labels are pruned as
+        soon as a total plus the least amount of that key left to the
+        destination exceeds its limit. At most ``max_labels`` labels are
+        expanded, when it is not None.
+        """
+        if source not in self.index or destination not in self.index:
+            return
+        source, target = self.index[source], self.index[destination]
+        hidden = self._edge_ids(undesired)
+        weights = self.column(parameter)
+        remaining, _ = self._dijkstra(target, weights, (), hidden)
+        limits = []
+        for key, limit in budget:
+            column = self.column(key)
+            limits.append((column, limit,
+                           self._dijkstra(target, column, (), hidden)[0]))
+        if source not in remaining or any(
+                least[source] > limit for _, limit, least in limits):
+            return
+
+        offsets, targets, edges = self.offsets, self.targets, self.edges
+        counter = count()
+        heap = [(remaining[source], 0, next(counter), (source,),
+                 (0,) * len(limits))]
+        expanded = 0
+        while heap and (max_labels is None or expanded < max_labels):
+            _, cost, _, path, totals = heappop(heap)
+            node = path[-1]
+            if node == target:
+                yield [self.nodes[node] for node in path]
+                continue
+            expanded += 1
+            for position in range(offsets[node], offsets[node + 1]):
+                neighbor, edge = targets[position], edges[position]
+                if edge in hidden or neighbor not in remaining or \
+                        neighbor in path:
+                    continue
+                new_totals = tuple(total + column[edge] for total,
+                                   (column, _, _) in zip(totals, limits))
+                if any(total + least[neighbor] > limit for total,
+                       (_, limit, least) in zip(new_totals, limits)):
+                    continue
+                new_cost = cost + weights[edge]
+                heappush(heap, (new_cost + remaining[neighbor], new_cost,
+                                next(counter), path + (neighbor,),
+                                new_totals))
+
+    @staticmethod
+    def _flows(heads, caps, arc_edges, size):
+        """Return the heads of the saturated arcs leaving every node.
+
+        Saturated arcs going both ways over the same edge cancel out.
+        """
+        used = {}
+        for arc in range(0, len(heads), 2):
+            if not caps[arc] and arc_edges[arc] is not None:
+                used.setdefault(arc_edges[arc], []).append(arc)
+        flows = [[] for _ in range(size)]
+        for arc in range(0, len(heads), 2):
+            if not caps[arc] and (arc_edges[arc] is None or
+                                  len(used[arc_edges[arc]]) == 1):
+                flows[heads[arc ^ 1]].append(heads[arc])
+        return flows
+
+    # pylint: disable=too-many-arguments,too-many-locals
+    # pylint: disable=too-many-branches,too-many-statements
+    def disjoint_paths(self, source, destination, parameter=None,
+                       undesired=None, node_disjoint=False):
+        """Return two disjoint paths of least total cost, or [].
+
+        This is Suurballe's algorithm, run as two successive shortest path
+        augmentations of a min-cost flow: the second Dijkstra searches the
+        residual graph with costs reduced by the first distances, so it may
+        cancel links of the first path. Paths share no link, and with
+        ``node_disjoint`` each node is split in two joined by an arc, so
+        they share no node but the source and destination either.
+        """
+        if source not in self.index or destination not in self.index or \
+                source == destination:
+            return []
+        split = 2 if node_disjoint else 1
+        heads, costs, caps, arc_edges = [], [], [], []
+        arcs = [[] for _ in range(len(self.nodes) * split)]
+
+        def add_arc(tail, head, cost, edge):
+            for node_a, node_b, arc_cost, cap in ((tail, head, cost, 1),
+                                                  (head, tail, -cost, 0)):
+                arcs[node_a].append(len(heads))
+                heads.append(node_b)
+                costs.append(arc_cost)
+                caps.append(cap)
+                arc_edges.append(edge)
+
+        if node_disjoint:
+            for node in range(len(self.nodes)):
+                add_arc(2 * node, 2 * node + 1, 0, None)
+        hidden = self._edge_ids(undesired)
+        weights = self.column(parameter)
+        for edge, node_a in enumerate(self.endpoints_a):
+            if edge in hidden:
+                continue
+            node_b = self.endpoints_b[edge]
+            for tail, head in ((node_a, node_b), (node_b, node_a)):
+                add_arc(tail * split + split - 1, head * split,
+                        weights[edge], edge)
+
+        start = self.index[source] * split + split - 1
+        target = self.index[destination] * split
+        potentials = [0] * len(arcs)
+        for _ in range(2):
+            distances = {start: 0}
+            previous = {}
+            heap = [(0, start)]
+            while heap:
+                distance, node = heappop(heap)
+                if distance > distances[node]:
+                    continue
+                for arc in arcs[node]:
+                    if not caps[arc]:
+                        continue
+                    head = heads[arc]
+                    new_distance = distance + max(
+                        costs[arc] + potentials[node] - potentials[head], 0)
+                    if new_distance < distances.get(head, inf):
+                        distances[head] = new_distance
+                        previous[head] = arc
+                        heappush(heap, (new_distance, head))
+            if target not in distances:
+                return []
+            for node, distance in distances.items():
+                potentials[node] += distance
+            node = target
+            while node != start:
+                arc = previous[node]
+                caps[arc] -= 1
+                caps[arc ^ 1] += 1
+                node = heads[arc ^ 1]
+        flows = self._flows(heads, caps, arc_edges, len(arcs))
+
+        paths = []
+        for _ in range(2):
+            path = [start]
+            while path[-1] != target:
+                path.append(flows[path[-1]].pop())
+            nodes = []
+            for node in path:
+                node //= split
+                if node in nodes:
+                    del nodes[nodes.index(node) + 1:]
+                else:
+                    nodes.append(node)
+            paths.append([self.nodes[node] for node in nodes])
+        return paths
+
+    def has_edge(self, endpoint_a, endpoint_b):
+        """Return True if there is an edge between the two nodes."""
+        return bool(self._edge_ids([(endpoint_a, endpoint_b)]))
+
+    def path_cost(self, path, parameter=None):
+        """Return the cost of a path, using hops when parameter is None."""
+        weights = self.column(parameter)
+        return sum(weights[edge] for edge in self._edge_ids(
+            zip(path[:-1], path[1:])))
+
+    def shortest_simple_paths(self, source, destination, parameter=None,
+                              undesired=None):
+        """Yield the simple paths between two nodes, cheapest first.
+
+        Undesired (endpoint_a, endpoint_b) links are never used. Nothing is
+        yielded when a node is unknown or there is no path.
+        """
+        if source not in self.index or destination not in self.index:
+            return
+        for path, _ in self._yen(self.index[source],
+                                 self.index[destination],
+                                 self.column(parameter),
+                                 self._edge_ids(undesired)):
+            yield [self.nodes[node] for node in path]
+
+    # pylint: disable=too-many-arguments
+    def shortest_path(self, source, destination, parameter=None, hidden=(),
+                      undesired=None):
+        """Return a shortest path avoiding hidden nodes, or None."""
+        try:
+            hidden_nodes = {self.index[node] for node in hidden
+                            if node in self.index}
+            result = self._shortest_path(self.index[source],
+                                         self.index[destination],
+                                         self.column(parameter), hidden_nodes,
+                                         self._edge_ids(undesired))
+        except KeyError:
+            return None
+        if result is None or result[1][0] in hidden_nodes or \
+                result[1][-1] in hidden_nodes:
+            return None
+        return [self.nodes[node] for node in result[1]]
+
+    # pylint: disable=too-many-locals
+    def shortest_path_dag(self, source, destination, parameter=None,
+                          undesired=None):
+        """Return the DAG of the shortest paths between two nodes, or None.
+
+        A single Dijkstra pass, ordered by cost then hops, keeps every edge
+        reaching a node at its least cost and hops until the destination is
+        settled, counting the paths to each node along the way. Costs are
+        compared to ``COST_DECIMALS`` decimal places, so equal costs summed
+        in another order still tie. Paths of least cost with more hops are
+        left out, which keeps edges weighing 0 from closing cycles.
+
+        Return the nodes, the (node, node) links oriented away from the
+        source and the number of paths of the DAG, which may be exponential
+        in its size.
+        """
+        if source not in self.index or destination not in self.index:
+            return None
+        start, target = self.index[source], self.index[destination]
+        offsets, targets, edges = self.offsets, self.targets, self.edges
+        weights = self.column(parameter)
+        hidden = self._edge_ids(undesired)
+        distances = {start: (0, 0)}
+        parents = {start: []}
+        counts = {}
+        heap = [(0, 0, start)]
+        while heap:
+            distance, hops, node = heappop(heap)
+            if node in counts:
+                continue
+            counts[node] = sum(counts[parent] for parent in parents[node]) \
+                if parents[node] else 1
+            if node == target:
+                break
+            for position in range(offsets[node], offsets[node + 1]):
+                neighbor = targets[position]
+                if neighbor in counts or edges[position] in hidden:
+                    continue
+                new_distance = (round(distance + weights[edges[position]],
+                                      COST_DECIMALS), hops + 1)
+                known = distances.get(neighbor)
+                if known is None or new_distance < known:
+                    distances[neighbor] = new_distance
+                    parents[neighbor] = [node]
+                    heappush(heap, new_distance + (neighbor,))
+                elif new_distance == known:
+                    parents[neighbor].append(node)
+        if target not in counts:
+            return None
+
+        nodes, links, pending = {target}, [], [target]
+        while pending:
+            node = pending.pop()
+            for parent in parents[node]:
+                links.append((parent, node))
+                if parent not in nodes:
+                    nodes.add(parent)
+                    pending.append(parent)
+        links.sort(key=lambda link: (distances[link[1]], link))
+        return {'nodes': [self.nodes[node] for node
+                          in sorted(nodes, key=distances.__getitem__)],
+                'links': [(self.nodes[node_a], self.nodes[node_b])
+                          for node_a, node_b in links],
+                'paths': counts[target]}
+
+    def shortest_distances(self, source, parameter=None):
+        """Return the distances from source to every reachable node."""
+        if source not in self.index:
+            return {}
+        distances, _ = self._dijkstra(self.index[source],
+                                      self.column(parameter))
+        return {self.nodes[node]: distance
+                for node, distance in distances.items()}
+
+    def shortest_path_tree(self, source, parameter=None, undesired=None):
+        """Return the shortest paths from source to every reachable node."""
+        if source not in self.index:
+            return {}
+        source = self.index[source]
+        distances, previous = self._dijkstra(source, self.column(parameter),
+                                             (), self._edge_ids(undesired))
+        paths = {source: [self.nodes[source]]}
+        for node in sorted(previous, key=distances.__getitem__):
+            branch = []
+            while node not in paths:
+                branch.append(node)
+                edge = previous[node]
+                parent = self.endpoints_a[edge]
+                node = parent if parent != node else self.endpoints_b[edge]
+            for child in reversed(branch):
+                paths[child] = paths[node] + [self.nodes[child]]
+                node = child
+        return {self.nodes[node]: path for node, path in paths.items()}
+
+
+class SwitchGraph(CompactGraph):
+    """CompactGraph with each switch and its interfaces collapsed to a node.
+
+    In the interface-level graph every interface is a node joined to its
+    switch by a star edge. Here every link between two switches becomes a
+    single edge weighing star_a + link + star_b, so a search settles one node
+    per switch instead of three. Paths are expanded back to interface-level
+    hops, with the same costs and order the interface-level graph gives.
+    Interfaces without a switch are kept as nodes of their own.
+
+    Paths never go back through a switch they have left, so the hairpins
+    the interface-level graph allows, leaving the source interface through
+    its own link and crossing its switch later, are not found. ``contracts``
+    leaves the searches which may need them to the interface-level graph.
+    """
+
+    def __init__(self, graph, switches):
+        self.switch_of = {interface: switch_id
+                          for switch_id, interfaces in switches.items()
+                          for interface in interfaces}
+        self.links = []
+        self._stars = {}
+        self._interface_edges = {}
+        nodes = set(switches)
+        edges = []
+        for endpoint_a, endpoint_b, metadata in graph.edges(data=True):
+            if endpoint_a in switches or endpoint_b in switches:
+                continue
+            node_a = self.switch_of.get(endpoint_a, endpoint_a)
+            node_b = self.switch_of.get(endpoint_b, endpoint_b)
+            if node_a == node_b:
+                continue
+            parts = [metadata]
+            for interface in endpoint_a, endpoint_b:
+                self._interface_edges.setdefault(interface, []).append(
+                    len(self.links))
+                switch_id = self.switch_of.get(interface)
+                if switch_id is not None:
+                    self._stars[interface] = graph[switch_id][interface]
+                    parts.append(self._stars[interface])
+            nodes.update((node_a, node_b))
+            self.links.append((endpoint_a, endpoint_b))
+            edges.append((node_a, node_b, tuple(parts)))
+        super().__init__(nodes, edges)
+
+    def _relinked(self, graph, link):
+        """Return the parts of the edges of a link, by edge ID.
+
+        Star edges are kept, only the link metadata being replaced.
+        """
+        endpoint_a, endpoint_b = link
+        edges = set(self._interface_edges.get(endpoint_a, ())).intersection(
+            self._interface_edges.get(endpoint_b, ()))
+        metadata = graph[endpoint_a][endpoint_b]
+        return {edge: (metadata,) + tuple(self._metadata[edge][1:])
+                for edge in edges}
+
+    def contracts(self, source, destination, max_paths=1):
+        """Return True if paths between the two nodes can be searched here.
+
+        Both nodes must be known and belong to different switches. When more
+        than one path is wanted, neither node may be an interface, as the
+        hairpins through its switch would be missed. The cheapest path is
+        never a hairpin.
+        """
+        node_a = self.switch_of.get(source, source)
+        node_b = self.switch_of.get(destination, destination)
+        if max_paths != 1 and (source in self.switch_of or
+                               destination in self.switch_of):
+            return False
+        return node_a != node_b and node_a in self.index and \
+            node_b in self.index
+
+    def _terminal_weights(self, parameter, terminals):
+        """Return the edge weights of a search between two terminals.
+
+        A path leaving an interface through its own link skips both star
+        edges of that interface, while any other path crosses them. Those
+        links are discounted twice the star weight, so every path costs the
+        same constant less than its interface-level path.
+        """
+        weights = self.column(parameter)
+        discounts = {}
+        for interface in terminals:
+            star = self._stars.get(interface)
+            if star is None:
+                continue
+            weight = self._part_weight(star, parameter)
+            for edge in self._interface_edges.get(interface, ()):
+                discounts[edge] = discounts.get(edge, 0) + 2 * weight
+        if not any(discounts.values()):
+            return weights
+        weights = array('d', weights)
+        for edge, discount in discounts.items():
+            weights[edge] = max(weights[edge] - discount, 0)
+        return weights
+
+    def expand(self, source, destination, nodes, edges):
+        """Return the interface-level hops of a switch-level path."""
+        hops = [self.nodes[nodes[0]]]
+        for position, edge in enumerate(edges):
+            endpoint_a, endpoint_b = self.links[edge]
+            if self.switch_of.get(endpoint_a, endpoint_a) != hops[-1]:
+                endpoint_a, endpoint_b = endpoint_b, endpoint_a
+            if endpoint_a != hops[-1]:
+                hops.append(endpoint_a)
+            hops.append(endpoint_b)
+            if endpoint_b != self.nodes[nodes[position + 1]]:
+                hops.append(self.nodes[nodes[position + 1]])
+        if source != hops[0]:
+            hops = hops[1:] if hops[1] == source else [source] + hops
+        if destination != hops[-1]:
+            hops = hops[:-1] if hops[-2] == destination \
+                else hops + [destination]
+        return hops
+
+    def _links_edges(self, links):
+        """Return the IDs of the edges of (interface, interface) links."""
+        wanted = {frozenset(link) for link in links or ()}
+        return {edge for edge, link in enumerate(self.links)
+                if frozenset(link) in wanted}
+
+    def shortest_simple_paths(self, source, destination, parameter=None,
+                              undesired=None):
+        """Yield the interface-level simple paths between two nodes.
+
+        Only nodes for which ``contracts`` is True can be searched here.
+        Undesired (endpoint_a, endpoint_b) links are never used.
+        """
+        if not self.contracts(source, destination):
+            return
+        weights = self._terminal_weights(parameter, (source, destination))
+        for nodes, edges in self._yen(
+                self.index[self.switch_of.get(source, source)],
+                self.index[self.switch_of.get(destination, destination)],
+                weights, self._links_edges(undesired)):
+            yield self.expand(source, destination, nodes, edges)
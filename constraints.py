@@ -0,0 +1,88 @@
+"""Module Constraints of kytos/pathfinder Kytos Network Application."""
+
+from numbers import Real
+
+# pylint: disable=import-error
+from napps.kytos.pathfinder.cost import HOPS
+
+# pylint: enable=import-error
+
+
+class Constraints:
+    """Constraints of a path request on link metadata.
+
+    ``minimum`` and ``maximum`` map metadata keys to thresholds every link
+    of a path must meet, so the links failing them are hidden from the
+    search. ``budget`` maps metadata keys to the largest total a path may
+    add up; the 'hops' key limits the number of hops.
+
+    Constraints are immutable and hashable, so they can be part of the path
+    cache keys.
+    """
+
+    def __init__(self, minimum=None, maximum=None, budget=None):
+        self.minimum = tuple(sorted((minimum or {}).items()))
+        self.maximum = tuple(sorted((maximum or {}).items()))
+        self.budget = tuple(sorted((budget or {}).items(),
+                                   key=lambda item: str(item[0])))
+
+    def __eq__(self, other):
+        return isinstance(other, Constraints) and \
+            self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return (f'Constraints({dict(self.minimum)!r}, '
+                f'{dict(self.maximum)!r}, {dict(self.budget)!r})')
+
+    def _key(self):
+        """Return the tuple identifying the constraints."""
+        return (self.minimum, self.maximum, self.budget)
+
+    @staticmethod
+    def _thresholds(data, name):
+        """Return the {metadata key: number} mapping of a constraint."""
+        value = data.get(name) or {}
+        if not isinstance(value, dict) or not all(
+                isinstance(key, str) and key and isinstance(limit, Real)
+                and not isinstance(limit, bool)
+                for key, limit in value.items()):
+            raise ValueError(f"'{name}' must map metadata keys to numbers.")
+        return value
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create Constraints from their request representation.
+
+        ``data`` may have 'minimum', 'maximum' and 'budget' mappings of
+        metadata keys to numbers. Raise ValueError if the data is invalid.
+        """
+        if not isinstance(data, dict) or \
+                set(data) - {'minimum', 'maximum', 'budget'}:
+            raise ValueError("'constraints' may only have 'minimum', "
+                             "'maximum' and 'budget'.")
+        budget = cls._thresholds(data, 'budget')
+        if any(limit < 0 for limit in budget.values()):
+            raise ValueError("'budget' limits must be non-negative.")
+        return cls(cls._thresholds(data, 'minimum'),
+                   cls._thresholds(data, 'maximum'),
+                   {None if key == HOPS else key: limit
+                    for key, limit in budget.items()})
+
+    def allows(self, metadata):
+        """Return True if a link metadata meets every threshold.
+
+        Links without a thresholded key, or with a non-numeric value for
+        it, do not meet the threshold.
+        """
+        for key, limit in self.minimum:
+            value = metadata.get(key)
+            if not isinstance(value, Real) or value < limit:
+                return False
+        for key, limit in self.maximum:
+            value = metadata.get(key)
+            if not isinstance(value, Real) or value > limit:
+                return False
+        return True
@@ -0,0 +1,124 @@
+"""Module Cost of kytos/pathfinder Kytos Network Application."""
+
+from fractions import Fraction
+from functools import reduce
+from math import gcd
+from numbers import Real
+
+# Metric name standing for the number of hops of a path
+HOPS = 'hops'
+
+# Largest denominator of the fractions metric values are read as, to find
+# the steps lexicographic costs must tell apart
+MAX_DENOMINATOR = 10 ** 6
+
+
+class Cost:
+    """Cost of a path combining several edge metrics.
+
+    A 'weights' cost is the weighted sum of its metrics, and a
+    'lexicographic' cost orders paths by its first metric, then by the
+    second one on ties, and so on. Either way the cost of an edge is a
+    linear combination of its metrics, so searches run on a single column
+    built once per cost and graph instead of calling back per edge.
+
+    Costs are immutable and hashable, so they can be used wherever a
+    metadata key is used as the search parameter.
+    """
+
+    def __init__(self, kind, metrics):
+        self.kind = kind
+        self.metrics = tuple(metrics)
+
+    def __eq__(self, other):
+        return isinstance(other, Cost) and \
+            (self.kind, self.metrics) == (other.kind, other.metrics)
+
+    def __hash__(self):
+        return hash((self.kind, self.metrics))
+
+    def __repr__(self):
+        return f'Cost({self.kind!r}, {self.metrics!r})'
+
+    @property
+    def keys(self):
+        """Return the metadata keys of the metrics, None standing for hops."""
+        if self.kind == 'weights':
+            return tuple(metric for metric, _ in self.metrics)
+        return self.metrics
+
+    @staticmethod
+    def _metric(name):
+        """Return the metadata key of a metric name, None for hops."""
+        if not isinstance(name, str) or not name:
+            raise ValueError('Cost metrics must be non-empty strings.')
+        return None if name == HOPS else name
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create a Cost from its request representation.
+
+        ``data`` is either {'weights': {metric: weight, ...}}, with
+        non-negative weights, or {'lexicographic': [metric, ...]}. The
+        'hops' metric is the number of hops. Raise ValueError if the data
+        is invalid.
+        """
+        if not isinstance(data, dict) or len(data) != 1:
+            raise ValueError("'cost' must have either 'weights' or "
+                             "'lexicographic'.")
+        kind, value = next(iter(data.items()))
+        if kind == 'weights':
+            if not isinstance(value, dict) or not value:
+                raise ValueError("'weights' must map metrics to weights.")
+            metrics = []
+            for name, weight in sorted(value.items()):
+                if not isinstance(weight, Real) or \
+                        isinstance(weight, bool) or weight < 0:
+                    raise ValueError('Cost weights must be non-negative '
+                                     'numbers.')
+                metrics.append((cls._metric(name), float(weight)))
+            return cls(kind, metrics)
+        if kind == 'lexicographic':
+            if not isinstance(value, list) or not value:
+                raise ValueError("'lexicographic' must be a list of "
+                                 "metrics.")
+            metrics = [cls._metric(name) for name in value]
+            if len(set(metrics)) != len(metrics):
+                raise ValueError("'lexicographic' metrics must be unique.")
+            return cls(kind, metrics)
+        raise ValueError("'cost' must have either 'weights' or "
+                         "'lexicographic'.")
+
+    def terms(self, graph):
+        """Return the (metric, factor) terms of the cost on a graph.
+
+        Lexicographic costs scale each metric so that its smallest step,
+        the largest value all its values are multiples of, weighs more than
+        the largest total the following metrics can reach on the graph.
+        """
+        if self.kind == 'weights':
+            return self.metrics
+        terms = []
+        total = 0
+        for metric in reversed(self.metrics):
+            column = graph.column(metric)
+            factor = (total + 1) / self._step(column) if terms else 1
+            terms.append((metric, float(factor)))
+            total += factor * Fraction(sum(column))
+        terms.reverse()
+        return tuple(terms)
+
+    @staticmethod
+    def _step(column):
+        """Return the smallest step between the values of a column.
+
+        That is the largest value all of them are multiples of, or 1 when
+        they are all 0.
+        """
+        values = {Fraction(value).limit_denominator(MAX_DENOMINATOR)
+                  for value in column if value}
+        denominator = reduce(lambda lcm, value: lcm * value.denominator //
+                             gcd(lcm, value.denominator), values, 1)
+        numerator = reduce(gcd, (int(value * denominator)
+                                 for value in values), 0)
+        return Fraction(numerator, denominator) if numerator else 1
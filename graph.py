@@ -1,7 +1,25 @@
 """Module Graph of kytos/pathfinder Kytos Network Application."""
 
+import os
+import pickle
+from itertools import islice, permutations, product
+from numbers import Real
+from threading import Lock
+
 from kytos.core import log
 
+# pylint: disable=import-error
+from napps.kytos.pathfinder import settings
+from napps.kytos.pathfinder.cache import PathCache
+from napps.kytos.pathfinder.compact import CompactGraph, SwitchGraph
+from napps.kytos.pathfinder.cost import Cost
+from napps.kytos.pathfinder.metrics import Metrics
+from napps.kytos.pathfinder.partitions import Partitions
+from napps.kytos.pathfinder.tables import TablesWorker
+from napps.kytos.pathfinder.workers import Cancelled
+
+# pylint: enable=import-error
+
 try:
     import networkx as nx
     from networkx.exception import NodeNotFound, NetworkXNoPath
@@ -9,60 +27,556 @@ except ImportError:
     PACKAGE = 'networkx>=2.2'
     log.error(f"Package {PACKAGE} not found. Please 'pip install {PACKAGE}'")
 
+# Version of the saved snapshots file format
+SNAPSHOT_FORMAT = 3
+
+
+class NetworkxSearch:
+    """Path searches over a networkx graph.
+
+    This is the search backend used when ``settings.GRAPH_BACKEND`` is
+    'networkx'. CompactGraph provides the same methods over CSR arrays.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def _view(self, hidden=(), undesired=None):
+        """Return a view of the graph without hidden nodes and links."""
+        if not hidden and not undesired:
+            return self.graph
+        return nx.restricted_view(self.graph, hidden, undesired or [])
+
+    def has_edge(self, endpoint_a, endpoint_b):
+        """Return True if there is an edge between the two nodes."""
+        return self.graph.has_edge(endpoint_a, endpoint_b)
+
+    def path_cost(self, path, parameter=None):
+        """Return the cost of a path, using hops when parameter is None."""
+        if parameter is None:
+            return len(path) - 1
+        return sum(self.graph[endpoint_a][endpoint_b].get(parameter, 1)
+                   for endpoint_a, endpoint_b in zip(path[:-1], path[1:]))
+
+    def shortest_simple_paths(self, source, destination, parameter=None,
+                              undesired=None):
+        """Yield the simple paths between two nodes, cheapest first.
+
+        Undesired (endpoint_a, endpoint_b) links are never used. Nothing is
+        yielded when a node is unknown or there is no path.
+        """
+        graph = self._view(undesired=undesired)
+        try:
+            yield from nx.shortest_simple_paths(graph, source, destination,
+                                                parameter)
+        except (NodeNotFound, NetworkXNoPath):
+            pass
+
+    # pylint: disable=too-many-arguments
+    def shortest_path(self, source, destination, parameter=None, hidden=(),
+                      undesired=None):
+        """Return a shortest path avoiding hidden nodes, or None."""
+        try:
+            return nx.shortest_path(self._view(hidden, undesired), source,
+                                    destination, parameter)
+        except (NodeNotFound, NetworkXNoPath):
+            return None
+
+    def shortest_path_tree(self, source, parameter=None, undesired=None):
+        """Return the shortest paths from source to every reachable node."""
+        graph = self._view(undesired=undesired)
+        try:
+            if parameter is None:
+                return nx.single_source_shortest_path(graph, source)
+            return nx.single_source_dijkstra_path(graph, source,
+                                                  weight=parameter)
+        except NodeNotFound:
+            return {}
+
+
+class GraphSnapshot:
+    """Topology graph published by KytosGraph.
+
+    A snapshot is never changed after being published: updates build a new
+    one off to the side, so queries can keep using the version they started
+    with. ``metrics`` maps every metric known in the graph to its default,
+    which the links without the metric carry. Edges between a switch and
+    its interfaces weigh zero for every metric. ``tables`` holds the
+    DistanceTables of the snapshot once they are built in background.
+    ``regions`` maps switches to their region, and ``partitions`` holds the
+    Partitions of the graph, when ``settings.PARTITION_ATTRIBUTE`` is set.
+
+    Snapshots can be pickled along with the compact graphs and tables built
+    for them.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, graph, version=0, switches=None, links=None,
+                 metrics=None, regions=None):
+        self.graph = graph
+        self.version = version
+        self.switches = switches or {}
+        self.links = links or {}
+        self.metrics = metrics or {}
+        self.regions = regions or {}
+        self.tables = None
+        self.partitions = None
+        self._compact = None
+        self._switch_graph = None
+        self._link_ids = None
+        self._compact_lock = Lock()
+
+    def reweight(self, previous, links):
+        """Share the graphs built for a snapshot differing only in weights.
+
+        ``previous`` must have the same nodes and edges, only the metadata
+        of the (endpoint_a, endpoint_b) ``links`` having changed. Its
+        compact graphs are copied with the new metadata instead of being
+        built again.
+        """
+        # pylint: disable=protected-access
+        if previous._compact is not None:
+            self._compact = previous._compact.reweighted(self.graph, links)
+        if previous._switch_graph is not None:
+            self._switch_graph = previous._switch_graph.reweighted(
+                self.graph, links)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_compact_lock']
+        state['_link_ids'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._link_ids = None
+        self._compact_lock = Lock()
+
+    @property
+    def compact(self):
+        """Return the CompactGraph of this snapshot, built on first use."""
+        if self._compact is None:
+            with self._compact_lock:
+                if self._compact is None:
+                    self._compact = CompactGraph.from_graph(self.graph)
+        return self._compact
+
+    @property
+    def switch_graph(self):
+        """Return the SwitchGraph of this snapshot, built on first use."""
+        if self._switch_graph is None:
+            with self._compact_lock:
+                if self._switch_graph is None:
+                    self._switch_graph = SwitchGraph(self.graph,
+                                                     self.switches)
+        return self._switch_graph
+
+    @property
+    def search(self):
+        """Return the search backend selected in the settings."""
+        if settings.GRAPH_BACKEND == 'compact':
+            return self.compact
+        return NetworkxSearch(self.graph)
+
+    def get_search(self, parameter=None):
+        """Return the search backend for a search parameter.
+
+        Cost parameters are only evaluated on the compact graph columns,
+        whatever backend is selected in the settings.
+        """
+        if isinstance(parameter, Cost):
+            return self.compact
+        return self.search
+
+    def get_links_endpoints(self, link_ids):
+        """Return the (endpoint_a, endpoint_b) pairs of the given links.
+
+        Links unknown or inactive in this snapshot are skipped.
+        """
+        endpoints = []
+        for link_id in link_ids or []:
+            try:
+                endpoints.append(self.links[link_id][0])
+            except KeyError:
+                continue
+        return endpoints
+
+    def get_path_links(self, path):
+        """Return the IDs of the links a path crosses, in order."""
+        if self._link_ids is None:
+            with self._compact_lock:
+                if self._link_ids is None:
+                    self._link_ids = {frozenset(endpoints): link_id
+                                      for link_id, (endpoints, _)
+                                      in self.links.items()}
+        link_ids = []
+        for hop in zip(path[:-1], path[1:]):
+            link_id = self._link_ids.get(frozenset(hop))
+            if link_id is not None:
+                link_ids.append(link_id)
+        return link_ids
+
+
+class GraphChanges:
+    """Nodes and links changed while building a snapshot.
+
+    ``added`` tells if any node or link was added, which may give new or
+    cheaper paths anywhere in the graph. ``metrics`` holds the metrics first
+    seen in this change, whose defaults changed the weights of every edge.
+    ``reweighted`` holds the links whose metadata changed while their
+    endpoints stayed the same, ``modified`` the metadata keys changed on
+    them and ``lighter`` the ones which did not just grow, which may give
+    cheaper paths elsewhere.
+    """
+
+    def __init__(self):
+        self.nodes = set()
+        self.links = set()
+        self.metrics = set()
+        self.reweighted = set()
+        self.modified = set()
+        self.lighter = set()
+        self.added = False
+
+    def __len__(self):
+        return len(self.nodes) + len(self.links)
+
+    @property
+    def weights_only(self):
+        """Tell if only the metadata of existing links changed."""
+        return bool(self.reweighted) and not self.nodes and \
+            not self.metrics and self.links == self.reweighted
+
 
 class KytosGraph:
     """Class responsible for the graph generation."""
 
     def __init__(self):
-        self.graph = nx.Graph()
+        self._snapshot = GraphSnapshot(
+            nx.Graph(), metrics=dict(settings.METRIC_DEFAULTS))
+        self._update_lock = Lock()
+        self.last_changes = 0
+        self.cache = PathCache(settings.PATH_CACHE_MAX_ENTRIES,
+                               settings.PATH_CACHE_MAX_BYTES,
+                               settings.PATH_CACHE_TTL)
+        self.tables_worker = TablesWorker()
+        self.metrics = Metrics()
+
+    @property
+    def graph(self):
+        """Return the graph of the current snapshot."""
+        return self._snapshot.graph
+
+    @property
+    def version(self):
+        """Return the version of the current snapshot."""
+        return self._snapshot.version
+
+    @property
+    def snapshot(self):
+        """Return the current snapshot."""
+        return self._snapshot
+
+    def _next_snapshot(self):
+        """Return a copy of the current snapshot to be changed.
+
+        Only the structure of the graph is copied: its edge metadata dicts
+        are shared with the current snapshot, so they are replaced with
+        ``_set_edge`` instead of being changed in place.
+        """
+        current = self._snapshot
+        graph = current.graph.__class__()
+        # pylint: disable=protected-access
+        graph.graph.update(current.graph.graph)
+        graph._node.update(current.graph._node)
+        graph._adj.update((node, dict(neighbors)) for node, neighbors
+                          in current.graph._adj.items())
+        return GraphSnapshot(graph, current.version + 1,
+                             dict(current.switches), dict(current.links),
+                             dict(current.metrics), dict(current.regions))
+
+    @staticmethod
+    def _set_edge(graph, endpoint_a, endpoint_b, metadata):
+        """Add an edge, or give an existing one a new metadata dict."""
+        graph.add_edge(endpoint_a, endpoint_b)
+        # pylint: disable=protected-access
+        graph._adj[endpoint_a][endpoint_b] = metadata
+        graph._adj[endpoint_b][endpoint_a] = metadata
+
+    def _publish(self, snapshot, changes):
+        """Make the snapshot current if it has any change.
+
+        Publishing is a single reference swap, so readers either get the
+        previous snapshot or the new one, never a partial graph. Cached paths
+        touching the changes, or which metadata changed on any link may beat,
+        are dropped right after. All of them are dropped when a node or link
+        was added, or a new metric changed the weights of every edge, as any
+        query may then have cheaper paths. Distance tables and landmarks of
+        the snapshot are then built in background, when enabled.
+
+        When only link weights changed, the compact graphs of the current
+        snapshot are reused with the new weights instead of being rebuilt.
+        """
+        self.last_changes = len(changes)
+        if changes:
+            if changes.weights_only:
+                snapshot.reweight(self._snapshot, changes.reweighted)
+                self.metrics.count('weight_updates')
+            if settings.GRAPH_BACKEND == 'compact':
+                snapshot.compact  # pylint: disable=pointless-statement
+            if settings.SWITCH_LEVEL_SEARCH:
+                snapshot.switch_graph  # pylint: disable=pointless-statement
+            if settings.PARTITION_ATTRIBUTE:
+                with self.metrics.timer('partition_graph'):
+                    snapshot.partitions = Partitions(
+                        snapshot, self._snapshot.partitions, changes)
+                self.metrics.count('partitions_rebuilt',
+                                   len(snapshot.partitions.rebuilt))
+            self._snapshot = snapshot
+            if changes.metrics or changes.added:
+                self.cache.clear(snapshot.version)
+            else:
+                self.cache.invalidate(
+                    snapshot.version, changes.nodes, changes.links,
+                    depends={('metadata', key) for key in changes.modified}
+                    | {('lighter', key) for key in changes.lighter})
+            if settings.DISTANCE_TABLES or settings.LANDMARK_METRICS:
+                self.tables_worker.submit(snapshot)
+
+    def save(self, path):
+        """Save the current snapshot and the artefacts built for it.
+
+        The file is written aside and renamed over ``path``, so a crash
+        never leaves a partial file behind. Return the saved version.
+        """
+        snapshot = self._snapshot
+        temporary = f'{path}.tmp'
+        with open(temporary, 'wb') as file:
+            pickle.dump({'format': SNAPSHOT_FORMAT, 'snapshot': snapshot},
+                        file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+        return snapshot.version
+
+    def load(self, path):
+        """Publish the snapshot saved in a file.
+
+        The next topology update is diffed against it, so only what changed
+        meanwhile is updated. Return False, keeping the current snapshot,
+        when the file is missing, cannot be unpickled or is from another
+        format.
+        """
+        try:
+            with open(path, 'rb') as file:
+                data = pickle.load(file)
+        except FileNotFoundError:
+            return False
+        except Exception as error:  # pylint: disable=broad-except
+            log.warning(f'Graph snapshot not loaded from {path}: {error}')
+            return False
+        if not isinstance(data, dict) or \
+                data.get('format') != SNAPSHOT_FORMAT or \
+                not isinstance(data.get('snapshot'), GraphSnapshot):
+            log.warning(f'Graph snapshot not loaded from {path}: '
+                        'unknown format.')
+            return False
+
+        snapshot = data['snapshot']
+        with self._update_lock:
+            self._snapshot = snapshot
+            self.cache.clear(snapshot.version)
+            self.tables_worker.tables = snapshot.tables
+        return True
 
     def clear(self):
         """Remove all nodes and links registered."""
-        self.graph.clear()
+        with self._update_lock:
+            self._snapshot = GraphSnapshot(
+                nx.Graph(), self.version + 1,
+                metrics=dict(settings.METRIC_DEFAULTS))
+            self.cache.clear(self.version)
 
     def update_topology(self, topology):
-        """Update all nodes and links inside the graph."""
-        self.graph.clear()
-        self.update_nodes(topology.switches)
-        self.update_links(topology.links)
+        """Update all nodes and links inside the graph.
+
+        Only the switches, interfaces and links that changed since the last
+        update are touched. Return how many of them were changed.
+        """
+        changes = GraphChanges()
+        with self.metrics.timer('update_topology'), self._update_lock:
+            snapshot = self._next_snapshot()
+            with self.metrics.timer('update_nodes'):
+                self._update_nodes(snapshot, topology.switches, changes)
+            with self.metrics.timer('update_links'):
+                self._update_links(snapshot, topology.links, changes)
+            self._publish(snapshot, changes)
+        return len(changes)
 
     def update_nodes(self, nodes):
-        """Update all nodes inside the graph."""
-        for node in nodes.values():
-            try:
-                self.graph.add_node(node.id)
+        """Update all nodes inside the graph.
 
-                for interface in node.interfaces.values():
-                    self.graph.add_node(interface.id)
-                    self.graph.add_edge(node.id, interface.id)
+        Return how many switches and interfaces were added or removed.
+        """
+        changes = GraphChanges()
+        with self._update_lock:
+            snapshot = self._next_snapshot()
+            with self.metrics.timer('update_nodes'):
+                self._update_nodes(snapshot, nodes, changes)
+            self._publish(snapshot, changes)
+        return len(changes)
+
+    def update_links(self, links):
+        """Update all links inside the graph.
+
+        Return how many links were added, removed or changed.
+        """
+        changes = GraphChanges()
+        with self._update_lock:
+            snapshot = self._next_snapshot()
+            with self.metrics.timer('update_links'):
+                self._update_links(snapshot, links, changes)
+            self._publish(snapshot, changes)
+        return len(changes)
 
+    @staticmethod
+    def _update_nodes(snapshot, nodes, changes):
+        """Update the nodes of a snapshot which is not published yet.
+
+        Switches and interfaces are diffed by ID against the snapshot. A
+        switch moved to another region changes along with its interfaces.
+        """
+        graph = snapshot.graph
+        switches, regions = {}, {}
+        attribute = settings.PARTITION_ATTRIBUTE
+        for node in nodes.values():
+            try:
+                switches[node.id] = dict.fromkeys(
+                    interface.id for interface in node.interfaces.values())
+                if attribute:
+                    regions[node.id] = node.metadata.get(attribute)
             except AttributeError:
                 pass
 
-    def update_links(self, links):
-        """Update all links inside the graph."""
-        keys = []
-        for link in links.values():
-            if link.is_active():
-                self.graph.add_edge(link.endpoint_a.id, link.endpoint_b.id)
-                for key, value in link.metadata.items():
-                    keys.extend(key)
-                    endpoint_a = link.endpoint_a.id
-                    endpoint_b = link.endpoint_b.id
-                    self.graph[endpoint_a][endpoint_b][key] = value
-
-        self._set_default_metadata(keys)
-
-    def _set_default_metadata(self, keys):
-        """Set metadata to all links.
-
-        Set the value to zero for inexistent metadata in a link to make those
-        irrelevant in pathfinding.
-        """
-        for key in keys:
-            for endpoint_a, endpoint_b in self.graph.edges:
-                if key not in self.graph[endpoint_a][endpoint_b]:
-                    self.graph[endpoint_a][endpoint_b][key] = 0
+        for switch_id in regions.keys() & snapshot.switches.keys():
+            if snapshot.regions.get(switch_id) != regions[switch_id]:
+                changes.nodes.add(switch_id)
+                changes.nodes.update(snapshot.switches[switch_id])
+        snapshot.regions = regions
+
+        for switch_id in snapshot.switches.keys() - switches.keys():
+            interfaces = snapshot.switches.pop(switch_id)
+            graph.remove_nodes_from(interfaces)
+            graph.remove_node(switch_id)
+            changes.nodes.add(switch_id)
+            changes.nodes.update(interfaces)
+
+        for switch_id, interfaces in switches.items():
+            current = snapshot.switches.get(switch_id)
+            if current is None:
+                graph.add_node(switch_id)
+                changes.nodes.add(switch_id)
+                changes.added = True
+                current = {}
+
+            for interface_id in current:
+                if interface_id not in interfaces:
+                    graph.remove_node(interface_id)
+                    changes.nodes.add(interface_id)
+
+            for interface_id in interfaces:
+                if interface_id not in current:
+                    graph.add_node(interface_id)
+                    graph.add_edge(switch_id, interface_id,
+                                   **dict.fromkeys(snapshot.metrics, 0))
+                    changes.nodes.add(interface_id)
+                    changes.added = True
+
+        snapshot.switches = switches
+
+    def _update_links(self, snapshot, links, changes):
+        """Update the links of a snapshot which is not published yet.
+
+        Active links are diffed by ID against the snapshot, and the metadata
+        of an edge is only rewritten when it has changed. Metrics a link does
+        not carry are set to their defaults.
+        """
+        graph = snapshot.graph
+        active = {link_id: link for link_id, link in links.items()
+                  if link.is_active()}
+
+        for link_id in snapshot.links.keys() - active.keys():
+            endpoints, _ = snapshot.links.pop(link_id)
+            if graph.has_edge(*endpoints):
+                graph.remove_edge(*endpoints)
+            changes.links.add(endpoints)
+
+        keys = set()
+        for link_id, link in active.items():
+            endpoints = (link.endpoint_a.id, link.endpoint_b.id)
+            metadata = dict(link.metadata)
+            keys.update(metadata)
+
+            current = snapshot.links.get(link_id)
+            snapshot.links[link_id] = (endpoints, metadata)
+            if current is not None and current[0] != endpoints:
+                if graph.has_edge(*current[0]):
+                    graph.remove_edge(*current[0])
+                changes.links.add(current[0])
+            elif current is not None and graph.has_edge(*endpoints):
+                if current[1] == metadata:
+                    continue
+                changes.reweighted.add(endpoints)
+
+            edge = {**snapshot.metrics, **metadata}
+            if endpoints in changes.reweighted:
+                previous = graph.edges[endpoints]
+                self._diff_metadata(previous, edge, changes)
+            else:
+                changes.added = True
+            self._set_edge(graph, *endpoints, edge)
+            changes.links.add(endpoints)
+
+        self._add_metrics(snapshot, keys, changes)
+
+    @staticmethod
+    def _diff_metadata(previous, metadata, changes):
+        """Record the metadata keys changed on a reweighted link."""
+        for key in previous.keys() | metadata.keys():
+            old, new = previous.get(key), metadata.get(key)
+            if old == new:
+                continue
+            changes.modified.add(key)
+            if not (isinstance(old, Real) and isinstance(new, Real) and
+                    new > old):
+                changes.lighter.add(key)
+
+    @staticmethod
+    def _add_metrics(snapshot, keys, changes):
+        """Set the metrics not known yet to every edge without them.
+
+        Links get the defaults declared in ``settings.METRIC_DEFAULTS``, and
+        undeclared metrics default to zero, which makes them irrelevant in
+        pathfinding on the links without them. Switch-interface edges always
+        get zero. Each new metric is filled in a single pass over the edges;
+        edges added later get every known metric when they are added.
+        """
+        metrics = {key: settings.METRIC_DEFAULTS.get(key, 0) for key in keys
+                   if key not in snapshot.metrics}
+        if not metrics:
+            return
+        graph = snapshot.graph
+        zeros = dict.fromkeys(metrics, 0)
+        for endpoints, _ in snapshot.links.values():
+            if graph.has_edge(*endpoints):
+                KytosGraph._set_edge(graph, *endpoints,
+                                     {**metrics, **graph.edges[endpoints]})
+        for switch_id, interfaces in snapshot.switches.items():
+            for interface_id in interfaces:
+                if graph.has_edge(switch_id, interface_id):
+                    KytosGraph._set_edge(
+                        graph, switch_id, interface_id,
+                        {**zeros, **graph.edges[switch_id, interface_id]})
+        snapshot.metrics.update(metrics)
+        changes.metrics.update(metrics)
 
     @staticmethod
     def _remove_switch_hops(circuit):
@@ -71,12 +585,416 @@ class KytosGraph:
             if len(hop.split(':')) == 8:
                 circuit['hops'].remove(hop)
 
-    def shortest_paths(self, source, destination, parameter=None):
-        """Calculate the shortest paths and return them."""
-        try:
-            paths = list(nx.shortest_simple_paths(self.graph,
-                                                  source,
-                                                  destination, parameter))
-        except (NodeNotFound, NetworkXNoPath):
+    @staticmethod
+    def _chain_segments(search, waypoints, parameter=None, undesired=None):
+        """Join the shortest segments between consecutive waypoint links.
+
+        ``waypoints`` is the hops list source, a1, b1, ..., an, bn,
+        destination, where each (ai, bi) is a link that must be crossed in
+        that direction. Nodes used by previous segments and the waypoints
+        still ahead are hidden from each segment search, so the resulting
+        path stays simple. Return None when there is no such path.
+        """
+        nodes = [node for index, node in enumerate(waypoints)
+                 if index % 2 or node != waypoints[index + 1]]
+        if len(set(nodes)) != len(nodes):
+            return None
+        path = [waypoints[0]]
+        for index in range(0, len(waypoints), 2):
+            start, end = waypoints[index], waypoints[index + 1]
+            if start != end:
+                hidden = set(path).union(waypoints[index + 2:])
+                hidden.discard(start)
+                segment = search.shortest_path(start, end, parameter, hidden,
+                                               undesired)
+                if segment is None:
+                    return None
+                path.extend(segment[1:])
+            if index + 2 < len(waypoints):
+                path.append(waypoints[index + 2])
+        return path
+
+    # pylint: disable=too-many-arguments,too-many-locals
+    def _waypoint_paths(self, search, source, destination, parameter,
+                        desired, undesired=None):
+        """Yield paths crossing all the desired links, cheapest first.
+
+        Simple paths are enumerated in cost order and the ones crossing
+        every desired link are yielded, which finds all of them in order.
+        Past ``settings.MAX_DESIRED_SEARCH_PATHS`` enumerated paths, the
+        remaining ones are solved with each desired link as a waypoint: for
+        every order and direction in which the links may be crossed, the
+        path is a chain of shortest segments between them. Those chains may
+        miss paths, but do not enumerate the paths without the links. The
+        number of combinations tried is bounded by
+        ``settings.MAX_WAYPOINT_COMBINATIONS``.
+        """
+        hidden_links = {frozenset(link) for link in undesired or ()}
+        if not all(search.has_edge(*link) and
+                   frozenset(link) not in hidden_links for link in desired):
+            return
+
+        wanted = {frozenset(link) for link in desired}
+        found = set()
+        enumerated = 0
+        last = None
+        for path in islice(search.shortest_simple_paths(
+                source, destination, parameter, undesired),
+                           settings.MAX_DESIRED_SEARCH_PATHS):
+            enumerated += 1
+            last = path
+            if wanted <= set(map(frozenset, zip(path[:-1], path[1:]))):
+                found.add(tuple(path))
+                yield path
+        if enumerated < settings.MAX_DESIRED_SEARCH_PATHS:
+            return
+
+        combinations = (
+            [link[::-1] if reverse else link
+             for link, reverse in zip(order, directions)]
+            for order in permutations(desired)
+            for directions in product((False, True), repeat=len(desired)))
+
+        bound = search.path_cost(last, parameter)
+        candidates = {}
+        for links in islice(combinations,
+                            settings.MAX_WAYPOINT_COMBINATIONS):
+            waypoints = [source]
+            for link in links:
+                waypoints.extend(link)
+            waypoints.append(destination)
+            path = self._chain_segments(search, waypoints, parameter,
+                                        undesired)
+            if path is not None and tuple(path) not in found:
+                cost = search.path_cost(path, parameter)
+                if cost >= bound:
+                    candidates[tuple(path)] = cost
+
+        for path in sorted(candidates, key=candidates.get):
+            yield list(path)
+
+    # pylint: disable=too-many-arguments
+    @staticmethod
+    def _cache_key(source, destination, parameter, max_paths, desired,
+                   undesired, constraints=None):
+        """Return the path cache key of a query."""
+        return (source, destination, parameter, max_paths,
+                tuple(desired or ()), tuple(undesired or ()), constraints)
+
+    @staticmethod
+    def _cache_depends(parameter, constraints=None):
+        """Return the cache tokens of the metadata a query depends on.
+
+        Any change of a threshold key on any link may give other paths, but
+        the keys paths are weighed or budgeted by only do when they get
+        lighter: a link off the cached paths getting heavier leaves them the
+        cheapest ones.
+        """
+        keys = set()
+        if isinstance(parameter, Cost):
+            keys.update(parameter.keys)
+        else:
+            keys.add(parameter)
+        thresholds = set()
+        if constraints:
+            keys.update(key for key, _ in constraints.budget)
+            thresholds.update(key for key, _ in constraints.minimum +
+                              constraints.maximum)
+        return {('lighter', key) for key in keys if key is not None} | \
+            {('metadata', key) for key in thresholds}
+
+    @staticmethod
+    def _filtered_links(snapshot, constraints):
+        """Return the endpoints of the links failing the thresholds."""
+        graph = snapshot.graph
+        return [endpoints for endpoints, _ in snapshot.links.values()
+                if graph.has_edge(*endpoints) and
+                not constraints.allows(graph.edges[endpoints])]
+
+    @staticmethod
+    def _within_budget(search, paths, budget):
+        """Yield the paths whose metric totals are within the budget."""
+        for path in paths:
+            if all(search.path_cost(path, key) <= limit
+                   for key, limit in budget):
+                yield path
+
+    @staticmethod
+    def _until_cancelled(paths, cancel):
+        """Yield the paths, raising Cancelled once the event is set."""
+        for path in paths:
+            if cancel.is_set():
+                raise Cancelled
+            yield path
+
+    @staticmethod
+    def _table_path(snapshot, source, destination, parameter):
+        """Return the shortest path read from the distance tables.
+
+        Return an empty list when there is no path, or None when the tables
+        of the snapshot are not built or do not cover the query.
+        """
+        tables = snapshot.tables
+        if tables is None or source == destination or \
+                not tables.has(parameter, source, destination):
+            return None
+        path = tables.path(source, destination, parameter)
+        if path is None:
             return []
+        return snapshot.switch_graph.expand(source, destination, *path)
+
+    # pylint: disable=too-many-arguments
+    def _search_paths(self, snapshot, source, destination, parameter,
+                      max_paths, desired, undesired, constraints):
+        """Return a generator of the paths of a query, cheapest first."""
+        search = snapshot.get_search(parameter)
+        budget = constraints.budget if constraints else ()
+        if constraints:
+            undesired = list(undesired or ())
+            undesired.extend(self._filtered_links(snapshot, constraints))
+
+        if desired:
+            paths = self._waypoint_paths(search, source, destination,
+                                         parameter, desired, undesired)
+            return self._within_budget(search, self._enumerated(paths),
+                                       budget)
+        if budget:
+            paths = snapshot.compact.constrained_paths(
+                source, destination, parameter, budget, undesired,
+                settings.MAX_CONSTRAINED_LABELS)
+        elif max_paths == 1 and not undesired and snapshot.partitions and \
+                snapshot.partitions.covers(source, destination, parameter):
+            paths = filter(None, [snapshot.partitions.shortest_path(
+                source, destination, parameter)])
+        elif settings.SWITCH_LEVEL_SEARCH and \
+                snapshot.switch_graph.contracts(source, destination,
+                                                max_paths):
+            paths = snapshot.switch_graph.shortest_simple_paths(
+                source, destination, parameter, undesired)
+        else:
+            paths = search.shortest_simple_paths(source, destination,
+                                                 parameter, undesired)
+        return self._enumerated(paths)
+
+    def _enumerated(self, paths):
+        """Yield the paths, counting how many the search enumerated."""
+        enumerated = 0
+        try:
+            for path in paths:
+                enumerated += 1
+                yield path
+        finally:
+            self.metrics.count('paths_enumerated', enumerated)
+
+    # pylint: disable=too-many-arguments
+    def shortest_paths(self, source, destination, parameter=None,
+                       max_paths=None, desired=None, undesired=None,
+                       constraints=None, snapshot=None, cancel=None):
+        """Calculate the shortest paths and return them.
+
+        Paths are consumed lazily from the k-shortest paths generator, so
+        the enumeration stops as soon as ``max_paths`` paths were found. When
+        ``max_paths`` is None all simple paths are returned.
+
+        ``parameter`` is the metadata key minimized, or a Cost combining
+        several of them. ``desired`` and ``undesired`` are lists of
+        (endpoint_a, endpoint_b) links. Undesired links are hidden from the
+        searched graph, and paths are enumerated in cost order until enough
+        of them cross every desired link, switching to solving the desired
+        links as waypoints past ``settings.MAX_DESIRED_SEARCH_PATHS``.
+
+        ``constraints`` hide the links failing their thresholds, and their
+        budgets are enforced by a label-setting search pruning the partial
+        paths that cannot stay within them.
+
+        When ``settings.SWITCH_LEVEL_SEARCH`` is True, queries without
+        desired links between different switches are searched on the
+        switch-level graph of the snapshot and expanded back to
+        interface-level hops, unless they want more than one path from or to
+        an interface, which may go back through its switch.
+
+        Single path queries without desired or undesired links are searched
+        on the Partitions set up by ``settings.PARTITION_ATTRIBUTE``.
+
+        The search runs on ``snapshot``, or on the current one when it is
+        None, even if a newer version is published meanwhile. Results are
+        kept in the path cache until the paths are touched by a topology
+        change or expire.
+
+        When the ``cancel`` Event is set, the search raises Cancelled at the
+        next path found and nothing is cached.
+        """
+        with self.metrics.timer('shortest_paths'):
+            return list(self.iter_shortest_paths(
+                source, destination, parameter, max_paths, desired,
+                undesired, constraints, snapshot, cancel))
+
+    # pylint: disable=too-many-arguments
+    def iter_shortest_paths(self, source, destination, parameter=None,
+                            max_paths=None, desired=None, undesired=None,
+                            constraints=None, snapshot=None, cancel=None):
+        """Yield the shortest paths of shortest_paths as they are found.
+
+        The search advances only as paths are consumed, and stops when the
+        generator is closed. Paths are cached once they were all yielded.
+        """
+        snapshot = snapshot or self._snapshot
+        key = self._cache_key(source, destination, parameter, max_paths,
+                              desired, undesired, constraints)
+        paths = self.cache.get(key, snapshot.version)
+        if paths is None and max_paths == 1 and \
+                not (desired or undesired or constraints):
+            path = self._table_path(snapshot, source, destination, parameter)
+            if path is not None:
+                paths = [path] if path else []
+                self.cache.put(key, snapshot.version, paths, bool(path),
+                               self._cache_depends(parameter))
+        if paths is not None:
+            self.metrics.count('paths_returned', len(paths))
+            yield from paths
+            return
+
+        paths = self._search_paths(snapshot, source, destination, parameter,
+                                   max_paths, desired, undesired,
+                                   constraints)
+        if cancel is not None:
+            paths = self._until_cancelled(paths, cancel)
+        found = []
+        try:
+            for path in islice(paths, max_paths):
+                found.append(path)
+                yield path
+        finally:
+            self.metrics.count('paths_returned', len(found))
+
+        complete = max_paths is not None and len(found) >= max_paths
+        self.cache.put(key, snapshot.version, found, complete,
+                       self._cache_depends(parameter, constraints))
+
+    # pylint: disable=too-many-arguments
+    def disjoint_paths(self, source, destination, parameter=None,
+                       undesired=None, constraints=None, node_disjoint=False,
+                       snapshot=None, cancel=None):
+        """Calculate two disjoint paths of least total cost.
+
+        The pair shares no link or, with ``node_disjoint``, no node but the
+        source and destination. It is found by Suurballe's algorithm on the
+        compact graph of the snapshot, so it is optimal even when the
+        shortest path is not part of any disjoint pair. ``undesired`` links
+        and the links failing the ``constraints`` thresholds are hidden.
+        Return the two paths, cheapest first, or an empty list when there
+        is no such pair. Cancelled is raised if the ``cancel`` Event is set
+        before the search starts.
+        """
+        snapshot = snapshot or self._snapshot
+        key = self._cache_key(source, destination, parameter, 2, (),
+                              undesired, constraints)
+        key = ('node' if node_disjoint else 'link',) + key
+        paths = self.cache.get(key, snapshot.version)
+        if paths is not None:
+            return paths
+
+        if cancel is not None and cancel.is_set():
+            raise Cancelled
+        if constraints:
+            undesired = list(undesired or ())
+            undesired.extend(self._filtered_links(snapshot, constraints))
+        compact = snapshot.compact
+        with self.metrics.timer('disjoint_paths'):
+            paths = compact.disjoint_paths(source, destination, parameter,
+                                           undesired, node_disjoint)
+        paths.sort(key=lambda path: compact.path_cost(path, parameter))
+
+        self.metrics.count('paths_returned', len(paths))
+        self.cache.put(key, snapshot.version, paths, bool(paths),
+                       self._cache_depends(parameter, constraints))
         return paths
+
+    # pylint: disable=too-many-arguments
+    def shortest_path_dag(self, source, destination, parameter=None,
+                          undesired=None, constraints=None, snapshot=None,
+                          cancel=None):
+        """Calculate the DAG of every shortest path between two nodes.
+
+        The DAG is found by a single Dijkstra pass on the compact graph of
+        the snapshot, instead of enumerating each equal-cost path. Among
+        the paths of least cost, only the ones with fewest hops are kept.
+        ``undesired`` links and the links failing the ``constraints``
+        thresholds are hidden. Return the 'nodes', 'links' and number of
+        'paths' of the DAG, all empty when there is no path. Cancelled is
+        raised if the ``cancel`` Event is set before the search starts.
+        """
+        snapshot = snapshot or self._snapshot
+        if cancel is not None and cancel.is_set():
+            raise Cancelled
+        if constraints:
+            undesired = list(undesired or ())
+            undesired.extend(self._filtered_links(snapshot, constraints))
+        with self.metrics.timer('shortest_path_dag'):
+            dag = snapshot.compact.shortest_path_dag(source, destination,
+                                                     parameter, undesired)
+        return dag or {'nodes': [], 'links': [], 'paths': 0}
+
+    def batch_shortest_paths(self, queries, snapshot=None, cancel=None):
+        """Calculate the shortest paths of many queries on one snapshot.
+
+        ``queries`` is a list of shortest_paths arguments tuples. Queries for
+        a single path without desired links or constraints share one
+        single-source search per distinct source, parameter and undesired
+        links; the others are solved by shortest_paths. Return the paths of
+        each query in order, or raise Cancelled when the ``cancel`` Event is
+        set before they are all solved.
+        """
+        snapshot = snapshot or self._snapshot
+        results = [None] * len(queries)
+        groups = {}
+        for index, query in enumerate(queries):
+            max_paths, desired, undesired = query[3:6]
+            if cancel is not None and cancel.is_set():
+                raise Cancelled
+            if max_paths != 1 or desired or any(query[6:]):
+                results[index] = self.shortest_paths(*query,
+                                                     snapshot=snapshot,
+                                                     cancel=cancel)
+                continue
+            results[index] = self.cache.get(self._cache_key(*query),
+                                            snapshot.version)
+            if results[index] is None:
+                group = (query[0], query[2], tuple(undesired or ()))
+                groups.setdefault(group, []).append(index)
+            else:
+                self.metrics.count('paths_returned', len(results[index]))
+
+        for group, indexes in groups.items():
+            if cancel is not None and cancel.is_set():
+                raise Cancelled
+            with self.metrics.timer('shortest_path_tree'):
+                group_paths = self._group_shortest_paths(
+                    snapshot, group, [queries[index] for index in indexes])
+            for index, paths in zip(indexes, group_paths):
+                results[index] = paths
+                self.metrics.count('paths_returned', len(paths))
+        return results
+
+    def _group_shortest_paths(self, snapshot, group, queries):
+        """Solve single path queries sharing one shortest path tree.
+
+        ``group`` is the (source, parameter, undesired) shared by the
+        queries. Return the paths of each query in order.
+        """
+        source, parameter, undesired = group
+        tree = None
+        results = []
+        for query in queries:
+            path = None if undesired else self._table_path(
+                snapshot, source, query[1], parameter)
+            if path is None:
+                if tree is None:
+                    tree = snapshot.get_search(parameter).shortest_path_tree(
+                        source, parameter, undesired)
+                path = tree.get(query[1])
+            paths = [path] if path else []
+            self.cache.put(self._cache_key(*query), snapshot.version, paths,
+                           bool(path), self._cache_depends(parameter))
+            results.append(paths)
+        return results
@@ -1,11 +1,22 @@
 """Main module of kytos/pathfinder Kytos Network Application."""
 
-from flask import jsonify, request
-from kytos.core import KytosNApp, log, rest
+import pickle
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from time import perf_counter
+
+from flask import Response, json, jsonify, request
+from kytos.core import KytosEvent, KytosNApp, log, rest
 from kytos.core.helpers import listen_to
+from werkzeug.exceptions import BadRequest, ServiceUnavailable
 
 # pylint: disable=import-error
+from napps.kytos.pathfinder import settings
+from napps.kytos.pathfinder.backups import BackupPaths
+from napps.kytos.pathfinder.constraints import Constraints
+from napps.kytos.pathfinder.cost import Cost
 from napps.kytos.pathfinder.graph import KytosGraph
+from napps.kytos.pathfinder.updates import TopologyUpdates
+from napps.kytos.pathfinder.workers import Overloaded, PathWorkers
 
 # pylint: enable=import-error
 
@@ -19,85 +30,403 @@ class Main(KytosNApp):
     def setup(self):
         """Create a graph to handle the nodes and edges."""
         self.graph = KytosGraph()
-        self._topology = None
+        self.workers = PathWorkers(settings.PATH_WORKERS,
+                                   settings.PATH_QUEUE_DEPTH)
+        self.updates = TopologyUpdates(self._apply_topology,
+                                       settings.TOPOLOGY_DEBOUNCE,
+                                       settings.TOPOLOGY_MAX_STALENESS)
+        self.backups = BackupPaths(self.graph, settings.BACKUP_PATHS)
+        self._saved_version = None
+        if settings.SNAPSHOT_FILE:
+            if self.graph.load(settings.SNAPSHOT_FILE):
+                self._saved_version = self.graph.version
+                log.info(f'Graph snapshot version {self.graph.version} '
+                         f'loaded from {settings.SNAPSHOT_FILE}.')
+            if settings.SNAPSHOT_SAVE_INTERVAL > 0:
+                self.execute_as_loop(settings.SNAPSHOT_SAVE_INTERVAL)
 
     def execute(self):
-        """Do nothing."""
+        """Save the graph snapshot if it changed since the last save."""
+        self._save_snapshot()
 
     def shutdown(self):
         """Shutdown the napp."""
+        self.workers.shutdown()
+        self.updates.wait(settings.TOPOLOGY_MAX_STALENESS)
+        self._save_snapshot()
 
-    def _filter_paths(self, paths, desired, undesired):
-        """Apply filters to the paths list.
+    def _save_snapshot(self):
+        """Save the graph snapshot to ``settings.SNAPSHOT_FILE``.
 
-        Make sure that each path in the list has all the desired links and none
-        of the undesired ones.
+        Nothing is saved when persistence is disabled or the graph did not
+        change since it was last saved or loaded.
         """
-        filtered_paths = []
+        if not settings.SNAPSHOT_FILE or \
+                self.graph.version in (0, self._saved_version):
+            return
+        try:
+            self._saved_version = self.graph.save(settings.SNAPSHOT_FILE)
+        except (OSError, pickle.PicklingError) as error:
+            log.error(f'Graph snapshot not saved to {settings.SNAPSHOT_FILE}:'
+                      f' {error}')
 
-        if desired:
-            for link_id in desired:
-                try:
-                    endpoint_a = self._topology.links[link_id].endpoint_a.id
-                    endpoint_b = self._topology.links[link_id].endpoint_b.id
-                except KeyError:
-                    return []
+    def _compute(self, function, *args, lazy=False, **kwargs):
+        """Run a path computation on the worker pool and return its result.
 
-                for path in paths:
-                    head = path['hops'][:-1]
-                    tail = path['hops'][1:]
-                    if (((endpoint_a, endpoint_b) in zip(head, tail)) or
-                            ((endpoint_b, endpoint_a) in zip(head, tail))):
-                        filtered_paths.append(path)
-        else:
-            filtered_paths = paths
-
-        if undesired:
-            for link_id in undesired:
-                try:
-                    endpoint_a = self._topology.links[link_id].endpoint_a.id
-                    endpoint_b = self._topology.links[link_id].endpoint_b.id
-                except KeyError:
-                    continue
+        Answer 503 when the pool is full or the computation takes longer
+        than ``settings.PATH_TIMEOUT`` seconds, which cancels it. With
+        ``lazy``, return a PathStream over the paths the computation yields
+        instead, holding a slot of the pool while it is read. A ``key``
+        makes the computation shared by the requests computing the same key
+        at the same time.
+        """
+        try:
+            if lazy:
+                return self.workers.stream(
+                    function, *args, timeout=settings.PATH_TIMEOUT, **kwargs)
+            return self.workers.run(function, *args,
+                                    timeout=settings.PATH_TIMEOUT, **kwargs)
+        except Overloaded as error:
+            raise ServiceUnavailable(str(error)) from error
+        except FutureTimeoutError as error:
+            raise ServiceUnavailable('Path computation timed out.') \
+                from error
+
+    @staticmethod
+    def _get_max_paths(data):
+        """Return how many paths must be calculated for a request.
+
+        Requests without 'max_paths' use the default from settings, and
+        values larger than the configured limit are capped to it.
+        """
+        max_paths = data.get('max_paths', settings.DEFAULT_MAX_PATHS)
+        if (not isinstance(max_paths, int) or isinstance(max_paths, bool)
+                or max_paths < 1):
+            raise BadRequest("'max_paths' must be a positive integer.")
+        return min(max_paths, settings.MAX_PATHS_LIMIT)
+
+    @staticmethod
+    def _get_parameter(data):
+        """Return the search parameter of a request.
+
+        It is either the metadata key in 'parameter' or the Cost described
+        by 'cost', which cannot be used together.
+        """
+        if 'cost' not in data:
+            return data.get('parameter')
+        if data.get('parameter') is not None:
+            raise BadRequest("'parameter' and 'cost' cannot be used "
+                             "together.")
+        try:
+            return Cost.from_dict(data['cost'])
+        except ValueError as error:
+            raise BadRequest(str(error)) from error
+
+    @staticmethod
+    def _get_constraints(data):
+        """Return the Constraints of a request, or None without them."""
+        if not data.get('constraints'):
+            return None
+        try:
+            return Constraints.from_dict(data['constraints'])
+        except ValueError as error:
+            raise BadRequest(str(error)) from error
+
+    @staticmethod
+    def _get_disjoint(data, query):
+        """Return the kind of disjoint pair of a request, or None.
+
+        Disjoint pairs are 'link' or 'node' disjoint, and cannot be combined
+        with desired links or budgets.
+        """
+        disjoint = data.get('disjoint')
+        if disjoint is None:
+            return None
+        if disjoint not in ('link', 'node'):
+            raise BadRequest("'disjoint' must be 'link' or 'node'.")
+        constraints = query[6] if query else None
+        if data.get('desired_links') or (constraints and constraints.budget):
+            raise BadRequest("'disjoint' cannot be used with "
+                             "'desired_links' or a 'budget'.")
+        return disjoint
 
+    def _get_ecmp(self, data, query):
+        """Return True if a request wants the DAG of its shortest paths.
+
+        The DAG cannot be combined with disjoint pairs, streams, desired
+        links or budgets.
+        """
+        ecmp = self._get_flag(data, 'ecmp')
+        constraints = query[6] if query else None
+        combined = [data.get(name) for name in ('disjoint', 'stream',
+                                                'desired_links')]
+        if ecmp and (any(combined) or (constraints and constraints.budget)):
+            raise BadRequest("'ecmp' cannot be used with 'disjoint', "
+                             "'stream', 'desired_links' or a 'budget'.")
+        return ecmp
+
+    @staticmethod
+    def _get_flag(data, name):
+        """Return the value of a boolean field, False when missing."""
+        value = data.get(name, False)
+        if not isinstance(value, bool):
+            raise BadRequest(f"'{name}' must be a boolean.")
+        return value
+
+    @staticmethod
+    def _stream(paths, version):
+        """Return an NDJSON response writing the paths as they are found.
+
+        The first line has the topology version and every following line
+        one path, or an error once the search took longer than
+        ``settings.PATH_TIMEOUT`` seconds. The server closes the response
+        when the client stops reading, which closes the paths and ends the
+        search.
+        """
+        def lines():
+            yield json.dumps({'version': version}) + '\n'
+            try:
                 for path in paths:
-                    head = path['hops'][:-1]
-                    tail = path['hops'][1:]
-                    if (((endpoint_a, endpoint_b) in zip(head, tail)) or
-                            ((endpoint_b, endpoint_a) in zip(head, tail))):
+                    yield json.dumps({'hops': path}) + '\n'
+            except FutureTimeoutError:
+                yield json.dumps({'error': 'Path computation timed '
+                                           'out.'}) + '\n'
+
+        response = Response(lines(), mimetype='application/x-ndjson')
+        if hasattr(paths, 'close'):
+            response.call_on_close(paths.close)
+        return response
+
+    def _get_query(self, data, snapshot):
+        """Return the shortest_paths arguments of a request.
+
+        Links are resolved against the given snapshot. Return None when a
+        desired link is unknown, as no path can contain it.
+        """
+        if not isinstance(data, dict) or 'source' not in data \
+                or 'destination' not in data:
+            raise BadRequest("'source' and 'destination' are required.")
+
+        parameter = self._get_parameter(data)
+        max_paths = self._get_max_paths(data)
+        constraints = self._get_constraints(data)
+
+        desired_links = data.get('desired_links') or []
+        desired = snapshot.get_links_endpoints(desired_links)
+        if len(desired) != len(desired_links):
+            return None
+        undesired = snapshot.get_links_endpoints(data.get('undesired_links'))
+
+        return (data['source'], data['destination'], parameter, max_paths,
+                desired, undesired, constraints)
 
-                        filtered_paths.remove(path)
+    def _flight_key(self, kind, query, snapshot):
+        """Return the key shared by the identical queries on a snapshot."""
+        # pylint: disable=protected-access
+        return (kind, snapshot.version) + self.graph._cache_key(*query)
 
-        return filtered_paths
+    def _find_paths(self, query, disjoint, snapshot, lazy=False):
+        """Return the paths of a v2/ request.
+
+        Shortest paths are computed on the worker pool, or returned as a
+        PathStream advancing as it is read when ``lazy`` is True. Identical
+        queries computed at the same time share their computation.
+        """
+        if query is None:
+            return []
+        if disjoint:
+            source, destination, parameter = query[:3]
+            return self._compute(self.graph.disjoint_paths, source,
+                                 destination, parameter, query[5], query[6],
+                                 disjoint == 'node', snapshot=snapshot,
+                                 key=self._flight_key(disjoint, query,
+                                                      snapshot))
+        if lazy:
+            return self._compute(self.graph.iter_shortest_paths, *query,
+                                 lazy=True, snapshot=snapshot)
+        return self._compute(self.graph.shortest_paths, *query,
+                             snapshot=snapshot,
+                             key=self._flight_key('paths', query, snapshot))
+
+    def _find_dag(self, query, snapshot):
+        """Return the shortest path DAG of a v2/ request.
+
+        It is computed on the worker pool, shared by the identical queries
+        computed at the same time.
+        """
+        source, destination, parameter = query[:3]
+        return self._compute(self.graph.shortest_path_dag, source,
+                             destination, parameter, query[5], query[6],
+                             snapshot=snapshot,
+                             key=self._flight_key('dag', query, snapshot))
+
+    def _track(self, query, paths, snapshot):
+        """Keep a backup of the best path served for a v2/ request.
+
+        Only paths of queries without desired links and constraints are
+        tracked.
+        """
+        if not paths or query[4] or query[6]:
+            return
+        source, destination, parameter = query[:3]
+        self.backups.register((source, destination, parameter,
+                               tuple(query[5])), paths[0], snapshot)
 
     @rest('v2/', methods=['POST'])
     def shortest_path(self):
-        """Calculate the best path between the source and destination."""
+        """Calculate the best path between the source and destination.
+
+        With 'stream', the paths are written as NDJSON lines while the
+        search finds them, instead of a single JSON document at the end.
+        With 'ecmp', the response has the DAG of every shortest path instead
+        of the paths. With 'profile', the response has the time spent in
+        each phase, the serialization of the response being timed without
+        the profile.
+        """
+        start = perf_counter()
+        data = request.get_json()
+
+        snapshot = self.graph.snapshot
+        query = self._get_query(data, snapshot)
+        disjoint = self._get_disjoint(data, query)
+        ecmp = self._get_ecmp(data, query)
+        stream = self._get_flag(data, 'stream')
+        profile = self._get_flag(data, 'profile')
+        if stream and profile:
+            raise BadRequest("'stream' and 'profile' cannot be used "
+                             "together.")
+        phases = {'parse': perf_counter() - start}
+
+        if stream:
+            return self._stream(
+                self._find_paths(query, disjoint, snapshot, lazy=True),
+                snapshot.version)
+        found = self._find_dag(query, snapshot) if ecmp else \
+            self._find_paths(query, disjoint, snapshot)
+        phases['search'] = perf_counter() - start - phases['parse']
+        if not (ecmp or disjoint):
+            self._track(query, found, snapshot)
+
+        response = {'dag': found} if ecmp else \
+            {'paths': [{'hops': path} for path in found]}
+        response['version'] = snapshot.version
+        body = json.dumps(response)
+        phases['serialize'] = perf_counter() - start - phases['parse'] - \
+            phases['search']
+
+        for phase, seconds in phases.items():
+            self.graph.metrics.observe(f'request_{phase}', seconds)
+        if profile:
+            response['profile'] = phases
+            body = json.dumps(response)
+        return Response(body, mimetype='application/json')
+
+    @rest('v2/batch', methods=['POST'])
+    def batch_shortest_paths(self):
+        """Calculate the best paths of many queries at once.
+
+        All the queries are solved on the same topology version. Results keep
+        the order of the queries, and invalid queries get an error message
+        instead of paths.
+        """
         data = request.get_json()
+        queries = data.get('queries') if isinstance(data, dict) else None
+        if not isinstance(queries, list):
+            raise BadRequest("'queries' must be a list.")
+        if len(queries) > settings.MAX_BATCH_QUERIES:
+            raise BadRequest(f"At most {settings.MAX_BATCH_QUERIES} queries "
+                             "are accepted.")
+
+        snapshot = self.graph.snapshot
+        results = [{'paths': []}] * len(queries)
+        indexes, valid_queries = [], []
+        for index, query_data in enumerate(queries):
+            try:
+                query = self._get_query(query_data, snapshot)
+            except BadRequest as error:
+                results[index] = {'error': error.description}
+                continue
+            if query is not None:
+                indexes.append(index)
+                valid_queries.append(query)
 
-        desired = data.get('desired_links')
-        undesired = data.get('undesired_links')
-        parameter = data.get('parameter')
+        all_paths = self._compute(self.graph.batch_shortest_paths,
+                                  valid_queries, snapshot)
+        for index, paths in zip(indexes, all_paths):
+            results[index] = {'paths': [{'hops': path} for path in paths]}
 
-        paths = []
-        for path in self.graph.shortest_paths(data['source'],
-                                              data['destination'],
-                                              parameter):
+        return jsonify({'results': results, 'version': snapshot.version})
 
-            paths.append({'hops': path})
+    @rest('v2/cache', methods=['GET'])
+    def cache_stats(self):
+        """Return the path cache hit, miss and eviction counters."""
+        return jsonify(self.graph.cache.get_stats())
 
-        paths = self._filter_paths(paths, desired, undesired)
-        return jsonify({'paths': paths})
+    @rest('v2/metrics', methods=['GET'])
+    def metrics(self):
+        """Return the timings and counters in Prometheus text format."""
+        snapshot = self.graph.snapshot
+        cache = self.graph.cache.get_stats()
+        workers = self.workers.get_stats()
+        updates = self.updates.get_stats()
+        counters = {f'cache_{name}': cache[name] for name in
+                    ('hits', 'misses', 'evictions', 'expirations',
+                     'invalidations')}
+        counters.update({f'workers_{name}': workers[name] for name in
+                         ('completed', 'rejected', 'timeouts', 'cancelled',
+                          'coalesced')})
+        counters.update({f'topology_events_{name}': updates[name]
+                         for name in ('received', 'applied', 'failed')})
+        counters['topology_rebuild_seconds'] = updates['rebuild_seconds']
+        gauges = {'graph_version': snapshot.version,
+                  'graph_nodes': snapshot.graph.number_of_nodes(),
+                  'graph_edges': snapshot.graph.number_of_edges(),
+                  'graph_switches': len(snapshot.switches),
+                  'graph_links': len(snapshot.links),
+                  'cache_entries': cache['entries'],
+                  'cache_bytes': cache['bytes'],
+                  'workers_pending': workers['pending']}
+        text = self.graph.metrics.render(counters, gauges)
+        content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        return Response(text, content_type=content_type)
+
+    @rest('v2/stats', methods=['GET'])
+    def stats(self):
+        """Return the counters of the path cache, workers and updates."""
+        return jsonify({'cache': self.graph.cache.get_stats(),
+                        'workers': self.workers.get_stats(),
+                        'topology_updates': self.updates.get_stats()})
 
     @listen_to('kytos.topology.updated')
     def update_topology(self, event):
         """Update the graph when the network topology was updated.
 
-        Clear the current graph and create a new with the most topoly updated.
+        Bursts of events are coalesced, so only the last topology of a
+        burst is applied to the graph.
         """
         if 'topology' not in event.content:
             return
-        topology = event.content['topology']
-        self._topology = topology
-        self.graph.update_topology(topology)
-        log.debug('Topology graph updated.')
+        self.updates.submit(event.content['topology'])
+
+    def _apply_topology(self, topology):
+        """Apply a topology to the graph.
+
+        Only the switches, interfaces and links changed since the last
+        applied topology are updated in the graph.
+        """
+        previous = self.graph.snapshot
+        changes = self.graph.update_topology(topology)
+        log.debug(f'Topology graph updated ({changes} elements changed).')
+        if changes and len(self.backups):
+            self._reroute(previous, self.graph.snapshot)
+
+    def _reroute(self, previous, snapshot):
+        """Publish the backups of the served paths crossing failed links."""
+        rerouted = self.backups.reroute(previous, snapshot)
+        if not rerouted:
+            return
+        self.graph.metrics.count('paths_rerouted', len(rerouted))
+        event = KytosEvent(name='kytos/pathfinder.paths_rerouted',
+                           content={'paths': rerouted,
+                                    'version': snapshot.version})
+        self.controller.buffers.app.put(event)
@@ -0,0 +1,85 @@
+"""Module Metrics of kytos/pathfinder Kytos Network Application."""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+from time import perf_counter
+
+# Upper bounds, in seconds, of the timing histogram buckets
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1, 2.5, 5, 10)
+
+# Prefix of every exposed metric name
+PREFIX = 'pathfinder_'
+
+
+class Metrics:
+    """Timing histograms and counters, rendered in Prometheus text format.
+
+    Histograms are named after the operation they time and exposed as
+    ``pathfinder_<name>_seconds``; counters are exposed as
+    ``pathfinder_<name>_total``. Both are created on first use.
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._sums = {}
+        self._counters = {}
+        self._lock = Lock()
+
+    def observe(self, name, seconds):
+        """Add a duration to the histogram of an operation."""
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = [0] * (len(BUCKETS) + 1)
+                self._sums[name] = 0.0
+            self._histograms[name][bisect_left(BUCKETS, seconds)] += 1
+            self._sums[name] += seconds
+
+    @contextmanager
+    def timer(self, name):
+        """Time the enclosed block into the histogram of an operation."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, perf_counter() - start)
+
+    def count(self, name, value=1):
+        """Increase a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def get_counter(self, name):
+        """Return the value of a counter."""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def render(self, counters=None, gauges=None):
+        """Return the metrics in Prometheus text exposition format.
+
+        ``counters`` and ``gauges`` map names to values kept elsewhere,
+        exposed along with the ones of this object.
+        """
+        with self._lock:
+            histograms = {name: (list(buckets), self._sums[name])
+                          for name, buckets in self._histograms.items()}
+            counters = {**self._counters, **(counters or {})}
+
+        lines = []
+        for name, (buckets, total) in sorted(histograms.items()):
+            metric = f'{PREFIX}{name}_seconds'
+            lines.append(f'# TYPE {metric} histogram')
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), buckets):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum {total}')
+            lines.append(f'{metric}_count {cumulative}')
+        for name, value in sorted(counters.items()):
+            lines.append(f'# TYPE {PREFIX}{name}_total counter')
+            lines.append(f'{PREFIX}{name}_total {value}')
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f'# TYPE {PREFIX}{name} gauge')
+            lines.append(f'{PREFIX}{name} {value}')
+        return '\n'.join(lines) + '\n'
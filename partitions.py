@@ -0,0 +1,271 @@
+"""Module Partitions of kytos/pathfinder Kytos Network Application."""
+
+from heapq import heapify, heappop, heappush
+from math import inf
+from threading import Lock
+
+# pylint: disable=import-error
+from napps.kytos.pathfinder.compact import CompactGraph
+from napps.kytos.pathfinder.cost import Cost
+
+# pylint: enable=import-error
+
+
+class Partition:
+    """Compact graph of the nodes of a region and the links among them.
+
+    ``borders`` are the nodes of the region linked to other regions. The
+    distances between every two of them inside the region are computed once
+    per metric, on first use.
+    """
+
+    def __init__(self, compact, borders):
+        self.compact = compact
+        self.borders = borders
+        self._distances = {}
+        self._lock = Lock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_lock']
+        with self._lock:
+            state['_distances'] = dict(self._distances)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = Lock()
+
+    def with_borders(self, borders):
+        """Return this partition with other borders, sharing its graph."""
+        if borders == self.borders:
+            return self
+        return Partition(self.compact, borders)
+
+    def border_distances(self, parameter=None):
+        """Return the distances inside the region between its borders."""
+        distances = self._distances.get(parameter)
+        if distances is None:
+            distances = {}
+            for border in self.borders:
+                reached = self.compact.shortest_distances(border, parameter)
+                distances[border] = {other: reached[other]
+                                     for other in self.borders
+                                     if other != border and other in reached}
+            with self._lock:
+                distances = self._distances.setdefault(parameter, distances)
+        return distances
+
+
+class Partitions:
+    """Graph of a snapshot split into regions, with an overlay of borders.
+
+    Every switch belongs to the region named by its metadata attribute,
+    along with its interfaces, and switches without it make the None region.
+    Each region is a Partition, and the links between regions join their
+    borders in an overlay where the borders of a region are also joined by
+    their distances inside it. The overlay of a metric is built on first
+    use.
+
+    Partitions are never changed after being built. A new snapshot reuses
+    the partitions of the previous one which its changes did not touch, only
+    giving them new borders when the links between regions changed, and
+    ``rebuilt`` holds the regions built again.
+    """
+
+    def __init__(self, snapshot, previous=None, changes=None):
+        self.region_of = {}
+        for switch_id, interfaces in snapshot.switches.items():
+            region = snapshot.regions.get(switch_id)
+            self.region_of[switch_id] = region
+            self.region_of.update(dict.fromkeys(interfaces, region))
+        touched = self._touched(previous, changes)
+        self.crossings = []
+        nodes, edges, borders = self._split(snapshot.graph, touched)
+
+        self.partitions = {}
+        self.rebuilt = set()
+        for region, members in nodes.items():
+            region_borders = frozenset(borders.get(region, ()))
+            partition = None
+            if touched is not None and region not in touched:
+                partition = previous.partitions.get(region)
+            if partition is None or \
+                    len(partition.compact.nodes) != len(members):
+                partition = Partition(
+                    CompactGraph(members, edges.get(region, ())),
+                    region_borders)
+                self.rebuilt.add(region)
+            self.partitions[region] = partition.with_borders(region_borders)
+        self._overlays = {}
+        self._lock = Lock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_lock']
+        with self._lock:
+            state['_overlays'] = dict(self._overlays)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = Lock()
+
+    def _split(self, graph, touched):
+        """Return the nodes, edges and borders of each region of a graph.
+
+        Edges are only returned for the ``touched`` regions, or for all of
+        them when it is None, and the links between regions are kept in
+        ``crossings``.
+        """
+        nodes, edges, borders = {}, {}, {}
+        for node in graph:
+            nodes.setdefault(self.region(node), []).append(node)
+        for endpoint_a, endpoint_b, metadata in graph.edges(data=True):
+            region_a, region_b = self.region(endpoint_a), \
+                self.region(endpoint_b)
+            if region_a != region_b:
+                self.crossings.append((endpoint_a, endpoint_b, metadata))
+                borders.setdefault(region_a, set()).add(endpoint_a)
+                borders.setdefault(region_b, set()).add(endpoint_b)
+            elif touched is None or region_a in touched:
+                edges.setdefault(region_a, []).append(
+                    (endpoint_a, endpoint_b, (metadata,)))
+        return nodes, edges, borders
+
+    def region(self, node):
+        """Return the region of a node, None for nodes without a switch."""
+        return self.region_of.get(node)
+
+    def _touched(self, previous, changes):
+        """Return the regions the changes touched, or None for all of them.
+
+        A change touches the regions of its nodes, before and after it, and
+        the region of its links when both of their endpoints are there.
+        """
+        if previous is None or changes is None or changes.metrics:
+            return None
+        touched = set()
+        for region_of in (previous.region_of, self.region_of):
+            touched.update(region_of.get(node) for node in changes.nodes)
+            for endpoint_a, endpoint_b in changes.links:
+                region = region_of.get(endpoint_a)
+                if region == region_of.get(endpoint_b):
+                    touched.add(region)
+        return touched
+
+    def overlay(self, parameter=None):
+        """Return the weighted adjacency of the borders for a metric."""
+        overlay = self._overlays.get(parameter)
+        if overlay is None:
+            overlay = {}
+            for endpoint_a, endpoint_b, metadata in self.crossings:
+                weight = 1 if parameter is None else \
+                    metadata.get(parameter, 1)
+                for node_a, node_b in ((endpoint_a, endpoint_b),
+                                       (endpoint_b, endpoint_a)):
+                    neighbors = overlay.setdefault(node_a, {})
+                    neighbors[node_b] = min(weight,
+                                            neighbors.get(node_b, inf))
+            for partition in self.partitions.values():
+                for border, distances in partition.border_distances(
+                        parameter).items():
+                    neighbors = overlay.setdefault(border, {})
+                    for other, distance in distances.items():
+                        neighbors[other] = min(distance,
+                                               neighbors.get(other, inf))
+            with self._lock:
+                overlay = self._overlays.setdefault(parameter, overlay)
+        return overlay
+
+    def covers(self, source, destination, parameter=None):
+        """Return True if paths between the two nodes can be searched here.
+
+        Both nodes must be known and different, and the search parameter a
+        metadata key or None: Cost factors depend on the columns of the
+        graph they weigh, which differ between partitions.
+        """
+        if source == destination or isinstance(parameter, Cost):
+            return False
+        for node in (source, destination):
+            partition = self.partitions.get(self.region(node))
+            if partition is None or node not in partition.compact.index:
+                return False
+        return True
+
+    # pylint: disable=too-many-locals
+    def shortest_path(self, source, destination, parameter=None):
+        """Return a shortest path between two nodes, or None.
+
+        The distances from the source to the borders of its region and from
+        the borders of the destination region to the destination are found
+        in their partitions, then joined by a Dijkstra search over the
+        overlay, which stops once no border left is closer than the best
+        path found. Between nodes of the same region, the path staying in it
+        is the first candidate. Only the partitions the path crosses are
+        searched again to expand it to hops.
+        """
+        partition_a = self.partitions[self.region(source)]
+        partition_b = self.partitions[self.region(destination)]
+        from_source = partition_a.compact.shortest_distances(source,
+                                                             parameter)
+        to_destination = partition_b.compact.shortest_distances(destination,
+                                                                parameter)
+        best, last = from_source.get(destination, inf), None
+        overlay = self.overlay(parameter)
+        distances = {border: from_source[border]
+                     for border in partition_a.borders
+                     if border in from_source}
+        heap = [(distance, border) for border, distance in distances.items()]
+        heapify(heap)
+        previous, settled = {}, set()
+        while heap:
+            distance, node = heappop(heap)
+            if distance >= best:
+                break
+            if node in settled:
+                continue
+            settled.add(node)
+            if distance + to_destination.get(node, inf) < best:
+                best, last = distance + to_destination[node], node
+            for neighbor, weight in overlay.get(node, {}).items():
+                if distance + weight < distances.get(neighbor, inf):
+                    distances[neighbor] = distance + weight
+                    previous[neighbor] = node
+                    heappush(heap, (distance + weight, neighbor))
+        if best == inf:
+            return None
+        if last is None:
+            return partition_a.compact.shortest_path(source, destination,
+                                                     parameter)
+
+        borders = [last]
+        while borders[-1] in previous:
+            borders.append(previous[borders[-1]])
+        borders.reverse()
+        path = partition_a.compact.shortest_path(source, borders[0],
+                                                 parameter)
+        for node_a, node_b in zip(borders[:-1], borders[1:]):
+            region = self.region(node_a)
+            if region != self.region(node_b):
+                path.append(node_b)
+                continue
+            path.extend(self.partitions[region].compact.shortest_path(
+                node_a, node_b, parameter)[1:])
+        path.extend(partition_b.compact.shortest_path(
+            borders[-1], destination, parameter)[1:])
+        return self._simple(path)
+
+    @staticmethod
+    def _simple(path):
+        """Return a path without the cycles edges weighing 0 may close."""
+        hops, positions = [], {}
+        for node in path:
+            if node in positions:
+                for removed in hops[positions[node] + 1:]:
+                    del positions[removed]
+                del hops[positions[node] + 1:]
+            else:
+                positions[node] = len(hops)
+                hops.append(node)
+        return hops
@@ -1 +1,101 @@
 """Settings for the pathfinder NApp."""
+
+# Number of paths returned when a request does not set 'max_paths'
+DEFAULT_MAX_PATHS = 10
+
+# Largest 'max_paths' value accepted in a request
+MAX_PATHS_LIMIT = 100
+
+# Largest number of simple paths enumerated in cost order looking for the
+# ones crossing every desired link. Past it, the paths left are solved with
+# the desired links as waypoints, joining shortest segments between them,
+# which may miss some paths.
+MAX_DESIRED_SEARCH_PATHS = 1000
+
+# Largest number of (order, direction) combinations of desired links tried
+# when solving them as waypoints
+MAX_WAYPOINT_COMBINATIONS = 256
+
+# Largest number of partial paths expanded by a search with 'budget'
+# constraints. Searches stop there, returning the paths found so far.
+MAX_CONSTRAINED_LABELS = 100000
+
+# Path cache limits. Setting PATH_CACHE_MAX_ENTRIES to 0 disables the cache.
+# Entries expire after PATH_CACHE_TTL seconds.
+PATH_CACHE_MAX_ENTRIES = 1024
+PATH_CACHE_MAX_BYTES = 16 * 1024 * 1024
+PATH_CACHE_TTL = 60
+
+# Value of a metric on the links without it in their metadata. Metrics not
+# declared here default to 0, which makes them irrelevant in pathfinding on
+# those links. Edges between a switch and its interfaces weigh 0 for every
+# metric, and searches by a metric no link has count hops instead.
+METRIC_DEFAULTS = {}
+
+# Largest number of queries accepted by a single v2/batch request
+MAX_BATCH_QUERIES = 1000
+
+# Search backend: 'networkx' searches the networkx graph directly, while
+# 'compact' interns node IDs to integers and searches CSR adjacency arrays
+GRAPH_BACKEND = 'networkx'
+
+# Search paths between different switches on a graph where each switch and
+# its interfaces are a single node, expanding them back to interface hops
+SWITCH_LEVEL_SEARCH = True
+
+# Metrics with all-pairs distance and next hop tables, built in background
+# after each topology update for the switch-level graph. None stands for the
+# hop count. Single path queries between switches are then answered with
+# table lookups. Tables are not built for graphs larger than
+# DISTANCE_TABLES_MAX_NODES switches.
+DISTANCE_TABLES = []
+DISTANCE_TABLES_MAX_NODES = 500
+
+# Metrics whose searches on the compact and switch-level graphs are guided
+# by A* with landmark lower bounds (ALT) instead of bidirectional Dijkstra.
+# The distances from LANDMARKS nodes are computed in background after each
+# topology update. None stands for the hop count, though switch-level
+# searches between interfaces weigh their hops with discounted star edges,
+# which the landmark bounds do not cover, and keep bidirectional Dijkstra.
+LANDMARK_METRICS = []
+LANDMARKS = 16
+
+# Switch metadata key splitting the graph into regions, e.g. 'region'. Each
+# region gets its own graph, and an overlay joins the borders of all of them
+# by their distances, computed once per metric on first use. Single path
+# queries without desired or undesired links then only search the regions of
+# their source and destination and the overlay. A topology change only
+# rebuilds the regions it touches. Switches without the key make a region of
+# their own. None disables it.
+PARTITION_ATTRIBUTE = None
+
+# Most recently served v2/ paths, without desired links or constraints, kept
+# with a backup path searched in background. When links fail, the paths
+# crossing them are rerouted to their backups and published in a
+# kytos/pathfinder.paths_rerouted event. 0 disables it.
+BACKUP_PATHS = 0
+
+# Threads running the path computations of REST requests, and how many more
+# computations may wait for one before requests are answered with 503
+PATH_WORKERS = 4
+PATH_QUEUE_DEPTH = 64
+
+# Seconds a request waits for its paths before being answered with 503. The
+# computation is then cancelled at the next path it finds. Streamed searches
+# end with an error line instead.
+PATH_TIMEOUT = 10
+
+# Topology events are coalesced: the graph is updated with the last topology
+# received once no event arrived for TOPOLOGY_DEBOUNCE seconds, and at most
+# TOPOLOGY_MAX_STALENESS seconds after the first event of a burst. Setting
+# TOPOLOGY_DEBOUNCE to 0 updates the graph on every event.
+TOPOLOGY_DEBOUNCE = 0.1
+TOPOLOGY_MAX_STALENESS = 1
+
+# File where the graph snapshot, with its compact graphs and distance
+# tables, is saved every SNAPSHOT_SAVE_INTERVAL seconds when it changed and
+# on shutdown. It is loaded on startup so paths are served before the first
+# topology event, which then only updates what changed. The file is a
+# pickle, so it must only be writable by the controller. None disables it.
+SNAPSHOT_FILE = None
+SNAPSHOT_SAVE_INTERVAL = 300
@@ -153,7 +153,7 @@ class Linter(SimpleCommand):
         """Run Yala."""
         print('Yala is running. It may take several seconds...')
         try:
-            check_call('yala *.py tests', shell=True)
+            check_call('yala *.py tests benchmarks', shell=True)
             print('No linter error found.')
         except RuntimeError as error:
             print('Linter check failed. Fix the error(s) above and try again.')
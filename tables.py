@@ -0,0 +1,363 @@
+"""Module Tables of kytos/pathfinder Kytos Network Application."""
+
+from array import array
+from heapq import heappop, heappush
+from math import inf
+from threading import Condition, Thread
+
+from kytos.core import log
+
+# pylint: disable=import-error
+from napps.kytos.pathfinder import settings
+
+# pylint: enable=import-error
+
+
+class DistanceTables:
+    """All-pairs distances and next hops of a SwitchGraph.
+
+    For every metric and target node, ``distances`` holds the distance of
+    every node to the target and ``parents`` the edge leading from every
+    node towards it, or -1, both as rows indexed by interned node IDs.
+    Following the parents of a target row never loops, so a shortest path
+    is read with one lookup per hop.
+
+    Tables built from the ones of a previous graph with the same nodes and
+    edges only repair the rows of the targets whose shortest paths may have
+    changed with the edge weights, searching again the subtrees cut off by
+    the heavier edges instead of the whole graph.
+    """
+
+    def __init__(self, graph, parameters, previous=None):
+        self.graph = graph
+        self.distances = {}
+        self.parents = {}
+        self.rebuilt_rows = 0
+        self.repaired_rows = 0
+        if previous is not None and not previous.same_structure(graph):
+            previous = None
+        for parameter in parameters:
+            self._build(parameter, previous)
+
+    def same_structure(self, graph):
+        """Return True if the graph has the same nodes and edges."""
+        if self.graph.endpoints_a is graph.endpoints_a and \
+                self.graph.endpoints_b is graph.endpoints_b:
+            return self.graph.nodes is graph.nodes or \
+                self.graph.nodes == graph.nodes
+        return self.graph.nodes == graph.nodes and \
+            self.graph.endpoints_a == graph.endpoints_a and \
+            self.graph.endpoints_b == graph.endpoints_b
+
+    def _row(self, weights, target):
+        """Return the distance and parent rows of a target."""
+        size = len(self.graph.nodes)
+        distances = array('d', [inf]) * size
+        parents = array('i', [-1]) * size
+        # pylint: disable=protected-access
+        found, previous = self.graph._dijkstra(target, weights)
+        for node, distance in found.items():
+            distances[node] = distance
+        for node, edge in previous.items():
+            parents[node] = edge
+        self.rebuilt_rows += 1
+        return distances, parents
+
+    def _subtrees(self, parents, roots):
+        """Return the nodes of a row whose path to the target crosses a root.
+
+        Those are the roots and every node below them in the shortest path
+        tree given by the parents row.
+        """
+        endpoints_a = self.graph.endpoints_a
+        endpoints_b = self.graph.endpoints_b
+        children = {}
+        for node, edge in enumerate(parents):
+            if edge >= 0:
+                parent = endpoints_a[edge]
+                if parent == node:
+                    parent = endpoints_b[edge]
+                children.setdefault(parent, []).append(node)
+        nodes = set()
+        stack = list(roots)
+        while stack:
+            node = stack.pop()
+            if node not in nodes:
+                nodes.add(node)
+                stack.extend(children.get(node, ()))
+        return nodes
+
+    # pylint: disable=too-many-locals,too-many-branches
+    def _repair(self, weights, distances, parents, changed):
+        """Return the rows of a target updated to changed edge weights.
+
+        Nodes reaching the target through an edge which got heavier lose
+        their distance, and get it back from their neighbors outside that
+        subtree; edges which got lighter are relaxed. Only the nodes whose
+        distance improves are then searched again. Rows no change affects
+        are returned as they are.
+        """
+        graph = self.graph
+        roots, lighter = [], []
+        for edge, old, new in changed:
+            node_a = graph.endpoints_a[edge]
+            node_b = graph.endpoints_b[edge]
+            if new > old:
+                roots.extend(node for node in (node_a, node_b)
+                             if parents[node] == edge)
+            elif distances[node_a] + new < distances[node_b] or \
+                    distances[node_b] + new < distances[node_a]:
+                lighter.append(edge)
+        if not roots and not lighter:
+            return distances, parents
+
+        distances, parents = array('d', distances), array('i', parents)
+        offsets, targets, edges = graph.offsets, graph.targets, graph.edges
+        heap = []
+        if roots:
+            cut = self._subtrees(parents, roots)
+            for node in cut:
+                distances[node] = inf
+                parents[node] = -1
+            for node in cut:
+                for position in range(offsets[node], offsets[node + 1]):
+                    edge = edges[position]
+                    distance = distances[targets[position]] + weights[edge]
+                    if distance < distances[node]:
+                        distances[node] = distance
+                        parents[node] = edge
+                if distances[node] < inf:
+                    heappush(heap, (distances[node], node))
+        for edge in lighter:
+            node_a = graph.endpoints_a[edge]
+            node_b = graph.endpoints_b[edge]
+            for node, neighbor in ((node_a, node_b), (node_b, node_a)):
+                distance = distances[neighbor] + weights[edge]
+                if distance < distances[node]:
+                    distances[node] = distance
+                    parents[node] = edge
+                    heappush(heap, (distance, node))
+
+        while heap:
+            distance, node = heappop(heap)
+            if distance > distances[node]:
+                continue
+            for position in range(offsets[node], offsets[node + 1]):
+                neighbor = targets[position]
+                edge = edges[position]
+                candidate = distance + weights[edge]
+                if candidate < distances[neighbor]:
+                    distances[neighbor] = candidate
+                    parents[neighbor] = edge
+                    heappush(heap, (candidate, neighbor))
+        self.repaired_rows += 1
+        return distances, parents
+
+    def _build(self, parameter, previous):
+        """Build the rows of a metric, repairing the previous ones."""
+        weights = self.graph.column(parameter)
+        targets = range(len(self.graph.nodes))
+        if previous is None or parameter not in previous.distances:
+            rows = [self._row(weights, target) for target in targets]
+        else:
+            old_weights = previous.graph.column(parameter)
+            changed = [(edge, old, new) for edge, (old, new)
+                       in enumerate(zip(old_weights, weights)) if old != new]
+            rows = [(previous.distances[parameter][target],
+                     previous.parents[parameter][target])
+                    for target in targets]
+            if changed:
+                rows = [self._repair(weights, distances, parents, changed)
+                        for distances, parents in rows]
+        self.distances[parameter] = [distances for distances, _ in rows]
+        self.parents[parameter] = [parents for _, parents in rows]
+
+    def has(self, parameter, source, destination):
+        """Return True if the tables can answer a query."""
+        return parameter in self.distances and \
+            source in self.graph.index and destination in self.graph.index
+
+    def path(self, source, destination, parameter=None):
+        """Return the nodes and edges of a shortest path, or None."""
+        node = self.graph.index[source]
+        target = self.graph.index[destination]
+        if self.distances[parameter][target][node] == inf:
+            return None
+        parents = self.parents[parameter][target]
+        nodes, edges = [node], []
+        while node != target:
+            edge = parents[node]
+            node_a = self.graph.endpoints_a[edge]
+            node = node_a if node_a != node else self.graph.endpoints_b[edge]
+            nodes.append(node)
+            edges.append(edge)
+        return nodes, edges
+
+
+class Landmarks:
+    """Distances from a few landmark nodes of a CompactGraph to every node.
+
+    By the triangle inequality, ``|d(L, t) - d(L, v)|`` is a lower bound of
+    the distance between nodes v and t for every landmark L, which guides A*
+    searches towards t (ALT). Landmarks are picked one by one as the node
+    farthest from the ones already picked, so they sit on the edges of the
+    graph. The bounds hold for the ``weights`` column they were computed
+    with, and for any search hiding nodes or edges from it.
+
+    Landmarks built from the ones of a previous graph with the same nodes
+    keep its landmark nodes, only computing their distances again.
+    """
+
+    def __init__(self, graph, parameter, count, previous=None):
+        self.graph = graph
+        self.parameter = parameter
+        self.weights = graph.column(parameter)
+        self.nodes = []
+        self.rows = []
+        if previous is not None and (previous.graph.nodes is graph.nodes or
+                                     previous.graph.nodes == graph.nodes):
+            for node in previous.nodes[:count]:
+                self._add(node)
+        else:
+            self._select(count)
+
+    def _add(self, node):
+        """Add a landmark and return its distances to every node."""
+        row = array('d', [inf]) * len(self.graph.nodes)
+        # pylint: disable=protected-access
+        found, _ = self.graph._dijkstra(node, self.weights)
+        for other, distance in found.items():
+            row[other] = distance
+        self.nodes.append(node)
+        self.rows.append(row)
+        return row
+
+    def _select(self, count):
+        """Pick the landmarks, each the farthest node from the others.
+
+        Unreachable nodes count as the farthest, so every connected
+        component gets a landmark while there are landmarks left.
+        """
+        size = len(self.graph.nodes)
+        if not size:
+            return
+        # pylint: disable=protected-access
+        found, _ = self.graph._dijkstra(0, self.weights)
+        node = max(range(size), key=lambda other: found.get(other, inf))
+        nearest = array('d', [inf]) * size
+        while len(self.nodes) < min(count, size):
+            row = self._add(node)
+            for other, distance in enumerate(row):
+                if distance < nearest[other]:
+                    nearest[other] = distance
+            node = max(range(size), key=nearest.__getitem__)
+            if not nearest[node]:
+                break
+
+    def heuristic(self, target):
+        """Return a function giving the lower bound of a node to a target.
+
+        The bound is infinite for nodes the landmarks tell are disconnected
+        from the target.
+        """
+        pairs = [(row, row[target]) for row in self.rows]
+        bounds = {}
+
+        def bound(node):
+            value = bounds.get(node)
+            if value is None:
+                value = 0
+                for row, distance in pairs:
+                    if row[node] != distance:
+                        value = max(value, abs(row[node] - distance))
+                bounds[node] = value
+            return value
+        return bound
+
+
+class TablesWorker:
+    """Background thread building the DistanceTables of snapshots.
+
+    Tables are built for the metrics in ``settings.DISTANCE_TABLES``, and
+    Landmarks of the searched compact graphs for the metrics in
+    ``settings.LANDMARK_METRICS``. Only the latest submitted snapshot is
+    built, so snapshots published while a build runs are skipped. Each build
+    starts from the tables and landmarks of the previous one.
+    """
+
+    def __init__(self):
+        self.tables = None
+        self.landmarks = {}
+        self._pending = None
+        self._busy = False
+        self._condition = Condition()
+        self._thread = None
+
+    def submit(self, snapshot):
+        """Schedule the tables of a snapshot to be built."""
+        with self._condition:
+            self._pending = snapshot
+            if self._thread is None:
+                self._thread = Thread(target=self._run, daemon=True,
+                                      name='pathfinder-tables')
+                self._thread.start()
+            self._condition.notify_all()
+
+    def wait(self, timeout=None):
+        """Wait until every submitted snapshot was built.
+
+        Return False if the timeout expired first.
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._pending is None and not self._busy, timeout)
+
+    def _run(self):
+        """Build the tables of the pending snapshots forever."""
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending is not None)
+                snapshot, self._pending = self._pending, None
+                self._busy = True
+            try:
+                self._build(snapshot)
+            except Exception as error:  # pylint: disable=broad-except
+                log.error(f'Distance tables not built: {error}')
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
+
+    def _build(self, snapshot):
+        """Build the tables and landmarks of a snapshot."""
+        if settings.LANDMARK_METRICS:
+            self._build_landmarks(snapshot)
+        if settings.DISTANCE_TABLES:
+            self._build_tables(snapshot)
+
+    def _build_landmarks(self, snapshot):
+        """Set landmarks on the compact graphs searched in a snapshot."""
+        graphs = {}
+        if settings.SWITCH_LEVEL_SEARCH:
+            graphs['switch'] = snapshot.switch_graph
+        if settings.GRAPH_BACKEND == 'compact':
+            graphs['compact'] = snapshot.compact
+        for name, graph in graphs.items():
+            for parameter in settings.LANDMARK_METRICS:
+                landmarks = Landmarks(graph, parameter, settings.LANDMARKS,
+                                      self.landmarks.get((name, parameter)))
+                graph.set_landmarks(landmarks)
+                self.landmarks[(name, parameter)] = landmarks
+        log.debug(f'Landmarks set for version {snapshot.version}.')
+
+    def _build_tables(self, snapshot):
+        """Build the tables of a snapshot and attach them to it."""
+        graph = snapshot.switch_graph
+        if len(graph.nodes) > settings.DISTANCE_TABLES_MAX_NODES:
+            log.debug(f'Distance tables skipped: {len(graph.nodes)} nodes.')
+            return
+        tables = DistanceTables(graph, settings.DISTANCE_TABLES, self.tables)
+        snapshot.tables = tables
+        self.tables = tables
+        log.debug(f'Distance tables built for version {snapshot.version} '
+                  f'({tables.rebuilt_rows} rows computed, '
+                  f'{tables.repaired_rows} repaired).')
@@ -37,3 +37,35 @@ def get_topology_mock():
                          switch_b.dpid: switch_b,
                          switch_c.dpid: switch_c}
     return topology
+
+
+def get_mesh_topology_mock(switches, links):
+    """Create a topology of switches joined by the given links.
+
+    ``links`` is a list of (switch_a, switch_b, delay) tuples, with switches
+    numbered from 1. Each link uses a new interface on both switches.
+    """
+    switch_mocks = {}
+    for number in range(1, switches + 1):
+        dpid = f"00:00:00:00:00:00:00:{number:02x}"
+        switch = get_switch_mock(dpid)
+        switch.id = dpid
+        switch.interfaces = {}
+        switch_mocks[number] = switch
+
+    def new_interface(switch):
+        port = len(switch.interfaces) + 1
+        interface = get_interface_mock(f"eth{port}", port, switch)
+        switch.interfaces[interface.id] = interface
+        return interface
+
+    topology = MagicMock()
+    topology.links = {}
+    for switch_a, switch_b, delay in links:
+        link = get_link_mock(new_interface(switch_mocks[switch_a]),
+                             new_interface(switch_mocks[switch_b]))
+        link.metadata = {"delay": delay}
+        topology.links[str(len(topology.links) + 1)] = link
+    topology.switches = {switch.dpid: switch
+                         for switch in switch_mocks.values()}
+    return topology
@@ -0,0 +1,77 @@
+"""Test Backups methods."""
+from unittest import TestCase
+
+from napps.kytos.pathfinder.backups import BackupPaths
+from napps.kytos.pathfinder.graph import KytosGraph
+from tests.helpers import get_mesh_topology_mock
+
+
+class TestBackupPaths(TestCase):
+    """Tests for the BackupPaths class."""
+
+    def setUp(self):
+        """Build a square of switches with two halves, the first cheaper."""
+        self.topology = get_mesh_topology_mock(4, [(1, 2, 1), (2, 4, 1),
+                                                   (1, 3, 2), (3, 4, 2)])
+        self.kytos_graph = KytosGraph()
+        self.kytos_graph.update_topology(self.topology)
+        self.backups = BackupPaths(self.kytos_graph, 2)
+        self.query = ("00:00:00:00:00:00:00:01", "00:00:00:00:00:00:00:04",
+                      "delay", ())
+        self.path = self.kytos_graph.shortest_paths(*self.query[:3],
+                                                    max_paths=1)[0]
+
+    def _update(self):
+        """Apply the topology and return the previous snapshot."""
+        previous = self.kytos_graph.snapshot
+        self.kytos_graph.update_topology(self.topology)
+        return previous
+
+    def test_register(self):
+        """Test backups share no link with their paths."""
+        snapshot = self.kytos_graph.snapshot
+        self.backups.register(self.query, self.path, snapshot)
+        self.assertTrue(self.backups.wait(5))
+
+        path, backup = self.backups.get(self.query)
+        self.assertEqual(path, self.path)
+        self.assertIn("00:00:00:00:00:00:00:03", backup)
+        self.assertFalse(set(snapshot.get_path_links(path)) &
+                         set(snapshot.get_path_links(backup)))
+        self.assertEqual(self.backups.affected(["1"]), {self.query})
+        self.assertEqual(self.backups.affected(["3"]), set())
+
+        for number in (2, 3):
+            query = (f"00:00:00:00:00:00:00:0{number}",) + self.query[1:]
+            self.backups.register(query, self.path, snapshot)
+        self.assertEqual(len(self.backups), 2)
+        self.assertIsNone(self.backups.get(self.query))
+
+    def test_reroute(self):
+        """Test paths crossing failed links are moved to their backups."""
+        self.backups.register(self.query, self.path,
+                              self.kytos_graph.snapshot)
+        self.assertTrue(self.backups.wait(5))
+        _, backup = self.backups.get(self.query)
+
+        self.topology.links["4"].metadata = {"delay": 3}
+        self.assertEqual(self.backups.reroute(
+            self._update(), self.kytos_graph.snapshot), [])
+        self.topology.links["1"].is_active.return_value = False
+        rerouted = self.backups.reroute(self._update(),
+                                        self.kytos_graph.snapshot)
+
+        self.assertEqual(rerouted, [{'source': self.query[0],
+                                     'destination': self.query[1],
+                                     'parameter': "delay",
+                                     'path': self.path, 'backup': backup}])
+        self.assertEqual(self.kytos_graph.metrics.get_counter(
+            'backup_paths_used'), 1)
+        self.assertTrue(self.backups.wait(5))
+        self.assertEqual(self.backups.get(self.query), (backup, []))
+
+        self.topology.links["3"].is_active.return_value = False
+        rerouted = self.backups.reroute(self._update(),
+                                        self.kytos_graph.snapshot)
+        self.assertEqual(rerouted[0]['backup'], [])
+        self.assertIsNone(self.backups.get(self.query))
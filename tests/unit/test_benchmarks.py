@@ -0,0 +1,98 @@
+"""Test the benchmark topologies and runner."""
+import json
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+import networkx as nx
+
+from napps.kytos.pathfinder.graph import KytosGraph
+
+from benchmarks import run
+from benchmarks.topologies import fat_tree, generate, mesh, random_graph, ring
+
+
+class TestTopologies(TestCase):
+    """Tests for the synthetic topologies."""
+
+    def _switch_graph(self, topology):
+        """Return the nx.Graph of the switches of a topology."""
+        graph = nx.MultiGraph()
+        graph.add_nodes_from(topology.switches)
+        graph.add_edges_from((link.endpoint_a.switch.id,
+                              link.endpoint_b.switch.id)
+                             for link in topology.links.values())
+        return graph
+
+    def test_fat_tree(self):
+        """Test the switches and links of a fat-tree."""
+        topology = fat_tree(4)
+        self.assertEqual(len(topology.switches), 20)
+        self.assertEqual(len(topology.links), 32)
+        self.assertEqual(topology.interfaces, 64)
+        self.assertTrue(nx.is_connected(self._switch_graph(topology)))
+
+    def test_shapes(self):
+        """Test the ring, mesh and random topologies are connected."""
+        for topology, switches, links in ((ring(10), 10, 10),
+                                          (mesh(3, 4), 12, 17),
+                                          (random_graph(50), 50, 100)):
+            self.assertEqual(len(topology.switches), switches)
+            self.assertEqual(len(topology.links), links)
+            self.assertTrue(nx.is_connected(self._switch_graph(topology)))
+
+    def test_generate(self):
+        """Test topologies are reproducible from their seed."""
+        first, second = generate('random', 30, 7), generate('random', 30, 7)
+        self.assertEqual([link.metadata for link in first.links.values()],
+                         [link.metadata for link in second.links.values()])
+        self.assertEqual(len(generate('fat-tree', 100).switches), 80)
+        with self.assertRaises(ValueError):
+            generate('star', 10)
+
+    def test_update_topology(self):
+        """Test KytosGraph reads the topologies and their changes."""
+        topology = mesh(3)
+        kytos_graph = KytosGraph()
+        kytos_graph.update_topology(topology)
+        self.assertEqual(kytos_graph.graph.number_of_nodes(),
+                         len(topology.switches) + topology.interfaces)
+
+        changed = topology.change_links(0.5)
+        self.assertLessEqual(kytos_graph.update_topology(topology), changed)
+        source, destination = topology.interface_pairs(1)[0]
+        self.assertEqual(len(kytos_graph.shortest_paths(source, destination,
+                                                        max_paths=1)), 1)
+
+
+class TestRun(TestCase):
+    """Tests for the benchmark runner."""
+
+    @patch.multiple('napps.kytos.pathfinder.settings',
+                    GRAPH_BACKEND='networkx', SWITCH_LEVEL_SEARCH=True)
+    def test_main(self):
+        """Test the results are written and compared with a baseline."""
+        with TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            arguments = ['--topology', 'ring', 'fat-tree', '--size', '20',
+                         '--queries', '5', '--repeat', '1', '--output',
+                         output]
+            self.assertEqual(run.main(arguments), 0)
+            with open(output, encoding='utf-8') as file:
+                results = json.load(file)
+
+        self.assertEqual([result['topology'] for result in results['results']],
+                         ['ring-20', 'fat-tree-4'])
+        for result in results['results']:
+            for measure in ('build', 'incremental_update', 'single_pair',
+                            'k_shortest', 'constrained', 'batch'):
+                self.assertGreater(result[measure]['p50'], 0)
+            self.assertGreater(result['memory']['graph_bytes'], 0)
+
+        baseline = json.loads(json.dumps(results))
+        baseline['results'][0]['build']['p50'] *= 0.5
+        regressions = run.compare(results, baseline, 0.1)
+        self.assertEqual([regression[:2] for regression in regressions],
+                         [('ring-20', 'build')])
+        self.assertAlmostEqual(regressions[0][2], 2)
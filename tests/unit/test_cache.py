@@ -0,0 +1,99 @@
+"""Test PathCache methods."""
+from unittest import TestCase
+from unittest.mock import patch
+
+from napps.kytos.pathfinder.cache import PathCache
+
+
+class TestPathCache(TestCase):
+    """Tests for the PathCache class."""
+
+    def setUp(self):
+        """Execute steps before each tests."""
+        self.cache = PathCache(max_entries=2, max_bytes=10 ** 6, ttl=60)
+        self.paths = [["s1:1", "s1", "s1:2", "s2:1"]]
+
+    def test_get_put(self):
+        """Test a stored entry is returned and counted as a hit."""
+        self.assertIsNone(self.cache.get("key", 0))
+        self.cache.put("key", 0, self.paths)
+
+        self.assertEqual(self.cache.get("key", 0), self.paths)
+        self.assertEqual(self.cache.get_stats()['hits'], 1)
+        self.assertEqual(self.cache.get_stats()['misses'], 1)
+
+    def test_put_outdated_version(self):
+        """Test paths calculated on an old version are not stored."""
+        self.cache.invalidate(1)
+        self.cache.put("key", 0, self.paths)
+
+        self.assertEqual(len(self.cache), 0)
+        self.assertIsNone(self.cache.get("key", 0))
+
+    def test_evictions(self):
+        """Test the least recently used entry is evicted."""
+        self.cache.put("first", 0, self.paths)
+        self.cache.put("second", 0, self.paths)
+        self.cache.get("first", 0)
+        self.cache.put("third", 0, self.paths)
+
+        self.assertIsNone(self.cache.get("second", 0))
+        self.assertIsNotNone(self.cache.get("first", 0))
+        self.assertEqual(self.cache.get_stats()['evictions'], 1)
+
+    def test_max_bytes(self):
+        """Test entries are evicted when the cache is too big."""
+        self.cache.max_bytes = 1
+        self.cache.put("key", 0, self.paths)
+
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.size, 0)
+
+    @patch('napps.kytos.pathfinder.cache.monotonic')
+    def test_expiration(self, mock_monotonic):
+        """Test entries expire after the ttl."""
+        mock_monotonic.return_value = 0
+        self.cache.put("key", 0, self.paths)
+        mock_monotonic.return_value = 61
+
+        self.assertIsNone(self.cache.get("key", 0))
+        self.assertEqual(self.cache.get_stats()['expirations'], 1)
+
+    def test_invalidate(self):
+        """Test only the entries touching the changes are dropped."""
+        self.cache.put("link", 0, self.paths)
+        self.cache.put("other", 0, [["s3:1", "s3", "s3:2"]])
+
+        dropped = self.cache.invalidate(1, links=[("s2:1", "s1:2")])
+        self.assertEqual(dropped, 1)
+        self.assertIsNone(self.cache.get("link", 1))
+        self.assertIsNotNone(self.cache.get("other", 1))
+
+        self.assertEqual(self.cache.invalidate(2, nodes=["s3"]), 1)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_invalidate_incomplete(self):
+        """Test incomplete entries are dropped when something is added."""
+        self.cache.put("complete", 0, self.paths)
+        self.cache.put("incomplete", 0, [], complete=False)
+
+        self.assertEqual(self.cache.invalidate(1), 0)
+        self.assertEqual(self.cache.invalidate(2, added=True), 1)
+        self.assertIsNotNone(self.cache.get("complete", 2))
+
+    def test_invalidate_depends(self):
+        """Test entries are dropped with the tokens they depend on."""
+        self.cache.put("delay", 0, self.paths, depends=["delay"])
+        self.cache.put("hops", 0, self.paths)
+
+        self.assertEqual(self.cache.invalidate(1, depends=["bandwidth"]), 0)
+        self.assertEqual(self.cache.invalidate(2, depends=["delay"]), 1)
+        self.assertIsNotNone(self.cache.get("hops", 2))
+
+    def test_clear(self):
+        """Test clear drops every entry."""
+        self.cache.put("key", 0, self.paths)
+        self.cache.clear(1)
+
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.version, 1)
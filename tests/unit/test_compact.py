@@ -0,0 +1,239 @@
+"""Test CompactGraph methods."""
+from itertools import islice
+from random import Random
+from unittest import TestCase
+
+import networkx as nx
+
+from napps.kytos.pathfinder.compact import CompactGraph
+
+
+class TestCompactGraph(TestCase):
+    """Tests for the CompactGraph class."""
+
+    def setUp(self):
+        """Create a weighted random graph and its compact copy."""
+        self.graph = nx.gnm_random_graph(40, 90, seed=7)
+        random = Random(7)
+        for endpoint_a, endpoint_b in self.graph.edges:
+            self.graph.edges[endpoint_a, endpoint_b]['delay'] = \
+                random.randint(1, 20)
+        del self.graph.edges[0, next(iter(self.graph[0]))]['delay']
+        self.compact = CompactGraph.from_graph(self.graph)
+
+    def _cost(self, path, weight):
+        """Return the cost of a path in the networkx graph."""
+        if weight is None:
+            return len(path) - 1
+        return sum(self.graph.edges[hop].get(weight, 1)
+                   for hop in zip(path[:-1], path[1:]))
+
+    def test_csr_arrays(self):
+        """Test the adjacency arrays match the networkx graph."""
+        self.assertEqual(self.compact.number_of_edges,
+                         self.graph.number_of_edges())
+        for node in self.graph:
+            position = self.compact.index[node]
+            neighbors = self.compact.targets[
+                self.compact.offsets[position]:
+                self.compact.offsets[position + 1]]
+            self.assertEqual({self.compact.nodes[neighbor]
+                              for neighbor in neighbors},
+                             set(self.graph[node]))
+
+    def test_column(self):
+        """Test missing metadata weighs 1 and columns are reused."""
+        column = self.compact.column('delay')
+        self.assertIs(column, self.compact.column('delay'))
+        self.assertEqual(list(self.compact.column('unknown')),
+                         [1.0] * self.compact.number_of_edges)
+        self.assertEqual(sorted(column), sorted(
+            self.graph.edges[edge].get('delay', 1)
+            for edge in self.graph.edges))
+
+    def test_reweighted(self):
+        """Test reweighted graphs share the arrays and patch the columns."""
+        self.compact.column('delay')
+        self.compact.column(None)
+        links = list(self.graph.edges)[:5]
+        for endpoint_a, endpoint_b in links:
+            self.graph.add_edge(endpoint_a, endpoint_b, delay=50)
+
+        compact = self.compact.reweighted(self.graph, links)
+        self.assertIs(compact.targets, self.compact.targets)
+        self.assertIs(compact.offsets, self.compact.offsets)
+        expected = CompactGraph.from_graph(self.graph)
+        for parameter in ('delay', None):
+            self.assertEqual(compact.column(parameter),
+                             expected.column(parameter))
+        self.assertNotEqual(self.compact.column('delay'),
+                            compact.column('delay'))
+
+    def test_shortest_simple_paths(self):
+        """Test Yen's paths have the same costs as the networkx ones."""
+        for weight in (None, 'delay'):
+            expected = islice(nx.shortest_simple_paths(self.graph, 0, 39,
+                                                       weight), 15)
+            paths = list(islice(self.compact.shortest_simple_paths(
+                0, 39, weight), 15))
+
+            self.assertEqual([self._cost(path, weight) for path in paths],
+                             [self._cost(path, weight) for path in expected])
+            self.assertEqual(len({tuple(path) for path in paths}), 15)
+            for path in paths:
+                self.assertEqual(len(set(path)), len(path))
+                self.assertTrue(nx.is_path(self.graph, path))
+
+    def test_shortest_simple_paths_undesired(self):
+        """Test undesired links are never used."""
+        first = next(self.compact.shortest_simple_paths(0, 39, 'delay'))
+        undesired = [(first[0], first[1])]
+        for path in islice(self.compact.shortest_simple_paths(
+                0, 39, 'delay', undesired), 10):
+            self.assertNotEqual(path[:2], first[:2])
+
+    def test_shortest_simple_paths_unknown_node(self):
+        """Test nothing is yielded for unknown nodes."""
+        self.assertEqual(list(self.compact.shortest_simple_paths(0, 99)), [])
+
+    def test_shortest_path_hidden(self):
+        """Test hidden nodes are avoided."""
+        path = self.compact.shortest_path(0, 39, 'delay')
+        self.assertEqual(self._cost(path, 'delay'),
+                         nx.shortest_path_length(self.graph, 0, 39, 'delay'))
+
+        hidden = set(path[1:-1])
+        path = self.compact.shortest_path(0, 39, 'delay', hidden)
+        self.assertFalse(hidden.intersection(path))
+        self.assertIsNone(self.compact.shortest_path(0, 39, hidden={39}))
+
+    def test_shortest_path_tree(self):
+        """Test the tree has a shortest path to every reachable node."""
+        tree = self.compact.shortest_path_tree(0, 'delay')
+        lengths = nx.single_source_dijkstra_path_length(self.graph, 0,
+                                                        weight='delay')
+
+        self.assertEqual(set(tree), set(lengths))
+        for node, path in tree.items():
+            self.assertEqual(path[0], 0)
+            self.assertEqual(path[-1], node)
+            self.assertEqual(self._cost(path, 'delay'), lengths[node])
+        self.assertEqual(self.compact.shortest_distances(0, 'delay'),
+                         lengths)
+        self.assertEqual(self.compact.shortest_distances(-1), {})
+
+        graph = nx.Graph([(0, 1, {'delay': 10}), (0, 2, {'delay': 1}),
+                          (2, 1, {'delay': 0})])
+        tree = CompactGraph.from_graph(graph).shortest_path_tree(0, 'delay')
+        self.assertEqual(tree[1], [0, 2, 1])
+
+    def test_shortest_path_dag(self):
+        """Test the DAG holds every shortest path with fewest hops."""
+        for weight in (None, 'delay'):
+            paths = list(nx.all_shortest_paths(self.graph, 0, 39, weight))
+            hops = min(map(len, paths))
+            paths = [path for path in paths if len(path) == hops]
+            dag = self.compact.shortest_path_dag(0, 39, weight)
+
+            self.assertEqual(dag['paths'], len(paths))
+            self.assertEqual(set(dag['nodes']),
+                             {node for path in paths for node in path})
+            self.assertEqual(set(dag['links']),
+                             {link for path in paths
+                              for link in zip(path[:-1], path[1:])})
+            self.assertEqual(dag['nodes'][0], 0)
+            self.assertEqual(dag['nodes'][-1], 39)
+
+        grid = nx.grid_2d_graph(4, 4)
+        nx.set_edge_attributes(grid, 0.1, 'delay')
+        grid.add_edge((0, 0), (-1, -1), delay=0)
+        grid.add_edge((-1, -1), (3, 3), delay=0.6)
+        compact = CompactGraph.from_graph(grid)
+        dag = compact.shortest_path_dag((0, 0), (3, 3), 'delay')
+        self.assertEqual(dag['links'], [((0, 0), (-1, -1)),
+                                        ((-1, -1), (3, 3))])
+        dag = compact.shortest_path_dag((0, 0), (3, 3), 'delay',
+                                        [((-1, -1), (3, 3))])
+        self.assertEqual(dag['paths'], 20)
+        self.assertEqual(len(dag['links']), 24)
+
+        graph = nx.Graph([(0, 1, {'delay': 0.1}), (1, 3, {'delay': 0.2}),
+                          (0, 2, {'delay': 0.3}), (2, 3, {'delay': 0})])
+        dag = CompactGraph.from_graph(graph).shortest_path_dag(0, 3, 'delay')
+        self.assertEqual(dag['paths'], 2)
+
+        self.assertIsNone(self.compact.shortest_path_dag(0, 'unknown'))
+
+    def test_constrained_paths(self):
+        """Test paths within budgets come in cost order."""
+        expected = sorted(nx.all_simple_paths(self.graph, 0, 39, cutoff=5),
+                          key=lambda path: self._cost(path, 'delay'))
+        expected = [path for path in expected
+                    if self._cost(path, None) <= 5]
+        paths = list(self.compact.constrained_paths(0, 39, 'delay',
+                                                    [(None, 5)]))
+
+        self.assertEqual([self._cost(path, 'delay') for path in paths],
+                         [self._cost(path, 'delay') for path in expected])
+        self.assertEqual(sorted(paths), sorted(expected))
+
+    def test_constrained_paths_limits(self):
+        """Test impossible budgets and the label limit stop the search."""
+        delay = nx.shortest_path_length(self.graph, 0, 39, 'delay')
+        self.assertEqual(list(self.compact.constrained_paths(
+            0, 39, None, [('delay', delay - 1)])), [])
+        self.assertEqual(len(list(self.compact.constrained_paths(
+            0, 39, None, [('delay', delay)]))), 1)
+        self.assertEqual(list(self.compact.constrained_paths(
+            0, 39, None, max_labels=1)), [])
+
+    def test_disjoint_paths(self):
+        """Test disjoint pairs have the least total cost."""
+        graph = nx.gnm_random_graph(10, 22, seed=4)
+        random = Random(4)
+        for edge in graph.edges:
+            graph.edges[edge]['delay'] = random.randint(1, 9)
+        compact = CompactGraph.from_graph(graph)
+        paths = list(nx.all_simple_paths(graph, 0, 9))
+
+        def cost(path):
+            return sum(graph.edges[hop]['delay']
+                       for hop in zip(path[:-1], path[1:]))
+
+        def links(path):
+            return {frozenset(hop) for hop in zip(path[:-1], path[1:])}
+
+        for node_disjoint in (False, True):
+            pair = compact.disjoint_paths(0, 9, 'delay',
+                                          node_disjoint=node_disjoint)
+            best = min(cost(first) + cost(second)
+                       for index, first in enumerate(paths)
+                       for second in paths[index + 1:]
+                       if not links(first) & links(second) and
+                       (not node_disjoint or
+                        not set(first[1:-1]) & set(second[1:-1])))
+
+            self.assertEqual(cost(pair[0]) + cost(pair[1]), best)
+            self.assertFalse(links(pair[0]) & links(pair[1]))
+            for path in pair:
+                self.assertEqual((path[0], path[-1]), (0, 9))
+                self.assertTrue(nx.is_path(graph, path))
+            if node_disjoint:
+                self.assertFalse(set(pair[0][1:-1]) & set(pair[1][1:-1]))
+
+    def test_disjoint_paths_missing(self):
+        """Test no pair is returned without two disjoint paths."""
+        graph = nx.path_graph(4)
+        compact = CompactGraph.from_graph(graph)
+
+        self.assertEqual(compact.disjoint_paths(0, 3), [])
+        self.assertEqual(compact.disjoint_paths(0, 99), [])
+        graph.add_edge(0, 2)
+        compact = CompactGraph.from_graph(graph)
+        self.assertEqual(len(compact.disjoint_paths(0, 3)), 0)
+        graph.add_edge(1, 3)
+        compact = CompactGraph.from_graph(graph)
+        self.assertEqual(sorted(compact.disjoint_paths(0, 3)),
+                         [[0, 1, 3], [0, 2, 3]])
+        self.assertEqual(compact.disjoint_paths(0, 3, undesired=[(0, 2)]),
+                         [])
@@ -0,0 +1,45 @@
+"""Test Constraints methods."""
+from unittest import TestCase
+
+from napps.kytos.pathfinder.constraints import Constraints
+
+
+class TestConstraints(TestCase):
+    """Tests for the Constraints class."""
+
+    def test_from_dict(self):
+        """Test constraints are parsed and equal ones are the same key."""
+        constraints = Constraints.from_dict({
+            'minimum': {'bandwidth': 100}, 'maximum': {'utilization': 0.8},
+            'budget': {'delay': 50, 'hops': 4}})
+
+        self.assertEqual(constraints.minimum, (('bandwidth', 100),))
+        self.assertEqual(constraints.maximum, (('utilization', 0.8),))
+        self.assertEqual(dict(constraints.budget), {'delay': 50, None: 4})
+        self.assertEqual(len({constraints, Constraints(
+            {'bandwidth': 100}, {'utilization': 0.8},
+            {None: 4, 'delay': 50})}), 1)
+        self.assertEqual(Constraints.from_dict({}), Constraints())
+
+    def test_from_dict_invalid(self):
+        """Test invalid constraints raise ValueError."""
+        for data in [None, [], {'unknown': {}}, {'minimum': 100},
+                     {'minimum': {'bandwidth': '100'}},
+                     {'maximum': {'delay': True}}, {'budget': {'': 1}},
+                     {'budget': {'delay': -1}}]:
+            with self.assertRaises(ValueError):
+                Constraints.from_dict(data)
+
+    def test_allows(self):
+        """Test links must meet every threshold."""
+        constraints = Constraints({'bandwidth': 100}, {'utilization': 0.8})
+
+        self.assertTrue(constraints.allows({'bandwidth': 100,
+                                            'utilization': 0.8}))
+        self.assertFalse(constraints.allows({'bandwidth': 99,
+                                             'utilization': 0.1}))
+        self.assertFalse(constraints.allows({'bandwidth': 200,
+                                             'utilization': 0.9}))
+        self.assertFalse(constraints.allows({'utilization': 0.1}))
+        self.assertFalse(constraints.allows({'bandwidth': 'high',
+                                             'utilization': 0.1}))
@@ -0,0 +1,95 @@
+"""Test Cost methods."""
+from itertools import islice
+from random import Random
+from unittest import TestCase
+
+import networkx as nx
+
+from napps.kytos.pathfinder.compact import CompactGraph
+from napps.kytos.pathfinder.cost import Cost
+
+
+class TestCost(TestCase):
+    """Tests for the Cost class."""
+
+    def setUp(self):
+        """Create a random graph with two integer metrics."""
+        self.graph = nx.gnm_random_graph(30, 70, seed=3)
+        random = Random(3)
+        for endpoint_a, endpoint_b in self.graph.edges:
+            edge = self.graph.edges[endpoint_a, endpoint_b]
+            edge['delay'] = random.randint(1, 3)
+            edge['utilization'] = random.randint(0, 10)
+        self.compact = CompactGraph.from_graph(self.graph)
+
+    def _metric(self, path, metric):
+        """Return the total of a metric along a path."""
+        if metric is None:
+            return len(path) - 1
+        return sum(self.graph.edges[hop][metric]
+                   for hop in zip(path[:-1], path[1:]))
+
+    def test_from_dict(self):
+        """Test costs are parsed and equal costs are the same key."""
+        cost = Cost.from_dict({'weights': {'utilization': 0.3, 'delay': 0.7}})
+        self.assertEqual(cost.metrics, (('delay', 0.7), ('utilization', 0.3)))
+        self.assertEqual(cost, Cost.from_dict(
+            {'weights': {'delay': 0.7, 'utilization': 0.3}}))
+        self.assertEqual(len({cost, Cost('weights', cost.metrics)}), 1)
+
+        cost = Cost.from_dict({'lexicographic': ['delay', 'hops']})
+        self.assertEqual(cost.metrics, ('delay', None))
+
+    def test_from_dict_invalid(self):
+        """Test invalid costs raise ValueError."""
+        for data in [None, {}, {'weights': {}}, {'weights': {'delay': -1}},
+                     {'weights': {'delay': '1'}}, {'weights': {'': 1}},
+                     {'lexicographic': []}, {'lexicographic': 'delay'},
+                     {'lexicographic': ['delay', 'delay']},
+                     {'weights': {'delay': 1}, 'lexicographic': ['hops']},
+                     {'unknown': ['delay']}]:
+            with self.assertRaises(ValueError):
+                Cost.from_dict(data)
+
+    def test_weights_column(self):
+        """Test a weighted sum column is built once per cost."""
+        cost = Cost.from_dict({'weights': {'delay': 0.7, 'utilization': 0.3,
+                                           'hops': 1}})
+        column = self.compact.column(cost)
+
+        self.assertIs(column, self.compact.column(Cost('weights',
+                                                       cost.metrics)))
+        delay = self.compact.column('delay')
+        utilization = self.compact.column('utilization')
+        for edge, weight in enumerate(column):
+            self.assertAlmostEqual(
+                weight, 0.7 * delay[edge] + 0.3 * utilization[edge] + 1)
+
+    def test_lexicographic_fractions(self):
+        """Test lexicographic costs tell apart fractional metric totals."""
+        graph = nx.Graph()
+        nx.add_path(graph, range(12), delay=0.1)
+        graph.add_edge(0, 11, delay=1.2)
+        compact = CompactGraph.from_graph(graph)
+
+        cost = Cost.from_dict({'lexicographic': ['delay', 'hops']})
+        paths = list(compact.shortest_simple_paths(0, 11, cost))
+        self.assertEqual(paths, [list(range(12)), [0, 11]])
+
+        cost = Cost.from_dict({'lexicographic': ['hops', 'delay']})
+        paths = list(compact.shortest_simple_paths(0, 11, cost))
+        self.assertEqual(paths, [[0, 11], list(range(12))])
+
+    def test_lexicographic_paths(self):
+        """Test lexicographic paths are ordered by delay, then hops."""
+        cost = Cost.from_dict({'lexicographic': ['delay', 'hops']})
+        paths = list(islice(self.compact.shortest_simple_paths(0, 29, cost),
+                            20))
+
+        keys = [(self._metric(path, 'delay'), self._metric(path, None))
+                for path in paths]
+        self.assertEqual(keys, sorted(keys))
+        best = nx.shortest_path(self.graph, 0, 29,
+                                lambda _, __, edge: edge['delay'] * 1000 + 1)
+        self.assertEqual(keys[0], (self._metric(best, 'delay'),
+                                   self._metric(best, None)))
@@ -1,9 +1,21 @@
 """Test Graph methods."""
+import os
+import pickle
+from tempfile import TemporaryDirectory
+from threading import Event
 from unittest import TestCase
 from unittest.mock import call, patch
 
-from napps.kytos.pathfinder.graph import KytosGraph
-from tests.helpers import get_topology_mock
+import networkx as nx
+from kytos.lib.helpers import get_interface_mock
+
+from napps.kytos.pathfinder.constraints import Constraints
+from napps.kytos.pathfinder.cost import Cost
+from napps.kytos.pathfinder.compact import CompactGraph
+from napps.kytos.pathfinder.graph import (SNAPSHOT_FORMAT, KytosGraph,
+                                          NetworkxSearch)
+from napps.kytos.pathfinder.workers import Cancelled
+from tests.helpers import get_mesh_topology_mock, get_topology_mock
 
 
 # pylint: disable=arguments-differ, protected-access
@@ -20,46 +32,73 @@ class TestGraph(TestCase):
         """Test clear."""
         self.kytos_graph.clear()
 
-        self.mock_graph.clear.assert_called()
+        self.assertEqual(self.kytos_graph.graph.number_of_nodes(), 0)
+        self.assertIsNot(self.kytos_graph.graph, self.mock_graph)
+        self.assertEqual(self.kytos_graph.version, 1)
 
-    @patch('napps.kytos.pathfinder.graph.KytosGraph.update_links')
-    @patch('napps.kytos.pathfinder.graph.KytosGraph.update_nodes')
+    @patch('napps.kytos.pathfinder.graph.KytosGraph._update_links')
+    @patch('napps.kytos.pathfinder.graph.KytosGraph._update_nodes')
     def test_update_topology(self, *args):
         """Test update topology."""
         (mock_update_nodes, mock_update_links) = args
         topology = get_topology_mock()
-        self.kytos_graph.update_topology(topology)
+        mock_update_nodes.side_effect = lambda _, __, changes: \
+            changes.nodes.update(["switch", "interface"])
+        mock_update_links.side_effect = lambda _, __, changes: \
+            changes.links.add(("interface", "other"))
+        changes = self.kytos_graph.update_topology(topology)
+
+        self.mock_graph.clear.assert_not_called()
+        self.assertEqual(changes, 3)
+        self.assertEqual(self.kytos_graph.last_changes, 3)
+        snapshot = self.kytos_graph.snapshot
+        self.assertEqual(snapshot.version, 1)
+        self.assertIsNot(snapshot.graph, self.mock_graph)
+        self.assertEqual(mock_update_nodes.call_args[0][:2],
+                         (snapshot, topology.switches))
+        self.assertEqual(mock_update_links.call_args[0][:2],
+                         (snapshot, topology.links))
 
-        self.mock_graph.clear.assert_called()
-        mock_update_nodes.assert_called_with(topology.switches)
-        mock_update_links.assert_called_with(topology.links)
+    @patch('napps.kytos.pathfinder.graph.KytosGraph._update_links')
+    @patch('napps.kytos.pathfinder.graph.KytosGraph._update_nodes')
+    def test_update_topology_unchanged(self, *args):
+        """Test update topology does not publish a version without changes."""
+        self.kytos_graph.update_topology(get_topology_mock())
+
+        for mock in args:
+            mock.assert_called()
+        self.assertEqual(self.kytos_graph.version, 0)
+        self.assertIs(self.kytos_graph.graph, self.mock_graph)
 
     def test_update_nodes(self):
         """Test update nodes."""
         topology = get_topology_mock()
         self.kytos_graph.update_nodes(topology.switches)
         switch = topology.switches["00:00:00:00:00:00:00:01"]
+        new_graph = self.kytos_graph.graph
 
         calls = [call(switch.id)]
         calls += [call(interface.id)
                   for interface in switch.interfaces.values()]
-        self.mock_graph.add_node.assert_has_calls(calls)
+        new_graph.add_node.assert_has_calls(calls)
 
         calls = [call(switch.id, interface.id)
                  for interface in switch.interfaces.values()]
-        self.mock_graph.add_edge.assert_has_calls(calls)
+        new_graph.add_edge.assert_has_calls(calls)
+        self.mock_graph.add_node.assert_not_called()
 
-    @patch('napps.kytos.pathfinder.graph.KytosGraph._set_default_metadata')
-    def test_update_links(self, mock_set_default_metadata):
-        """Test update nodes."""
+    def test_update_links(self):
+        """Test update links declares the metrics of the links."""
         topology = get_topology_mock()
-        self.kytos_graph.update_links(topology.links)
+        changes = self.kytos_graph.update_links(topology.links)
 
-        keys = []
-        all_metadata = [link.metadata for link in topology.links.values()]
-        for metadata in all_metadata:
-            keys.extend(key for key in metadata.keys())
-        mock_set_default_metadata.assert_called_with(keys)
+        self.assertEqual(changes, 3)
+        snapshot = self.kytos_graph.snapshot
+        self.assertEqual(snapshot.metrics, {"A": 0, "BB": 0, "CCC": 0})
+        new_graph = self.kytos_graph.graph
+        calls = [call(link.endpoint_a.id, link.endpoint_b.id)
+                 for link in topology.links.values()]
+        new_graph.add_edge.assert_has_calls(calls)
 
     def test_remove_switch_hops(self):
         """Test remove switch hops."""
@@ -82,3 +121,692 @@ class TestGraph(TestCase):
         mock_shortest_simple_paths.assert_called_with(self.kytos_graph.graph,
                                                       source, dest, None)
         self.assertEqual(shortest_paths, ["any"])
+
+    @patch('networkx.shortest_simple_paths')
+    def test_shortest_paths_max_paths(self, mock_shortest_simple_paths):
+        """Test shortest paths stops the enumeration after max_paths."""
+        generated = []
+
+        def paths_generator(*_):
+            for index in range(100):
+                generated.append(index)
+                yield [index]
+
+        mock_shortest_simple_paths.side_effect = paths_generator
+        source, dest = "00:00:00:00:00:00:00:01:1", "00:00:00:00:00:00:00:02:2"
+        shortest_paths = self.kytos_graph.shortest_paths(source, dest,
+                                                         max_paths=2)
+
+        self.assertEqual(shortest_paths, [[0], [1]])
+        self.assertEqual(generated, [0, 1])
+
+
+class TestGraphSearch(TestCase):
+    """Tests for the KytosGraph searches over a real graph."""
+
+    def setUp(self):
+        """Build the graph of the default topology.
+
+        s1:1 ------ s2:1
+        s1:2 --+  +-- s2:2
+               |  |
+            s3:1  s3:2
+        """
+        self.topology = get_topology_mock()
+        self.kytos_graph = KytosGraph()
+        self.kytos_graph.update_nodes(self.topology.switches)
+        self.kytos_graph.update_links(self.topology.links)
+        self.source = "00:00:00:00:00:00:00:01:1"
+        self.destination = "00:00:00:00:00:00:00:02:1"
+
+    def _link(self, link_id):
+        """Return the endpoints of a link from the topology."""
+        link = self.topology.links[link_id]
+        return (link.endpoint_a.id, link.endpoint_b.id)
+
+    def _hops(self, path):
+        """Return the interface hops of a path, skipping switches."""
+        return [hop for hop in path if isinstance(hop, str)]
+
+    def test_shortest_paths_undesired(self):
+        """Test undesired links are never part of a path."""
+        paths = self.kytos_graph.shortest_paths(self.source, self.destination,
+                                                undesired=[self._link("1")])
+
+        self.assertEqual(len(paths), 1)
+        self.assertEqual(self._hops(paths[0]),
+                         ["00:00:00:00:00:00:00:01:1",
+                          "00:00:00:00:00:00:00:01:2",
+                          "00:00:00:00:00:00:00:03:1",
+                          "00:00:00:00:00:00:00:03:2",
+                          "00:00:00:00:00:00:00:02:2",
+                          "00:00:00:00:00:00:00:02:1"])
+
+    def test_shortest_paths_desired(self):
+        """Test desired links are part of every path."""
+        endpoint_b, endpoint_a = self._link("3")
+        paths = self.kytos_graph.shortest_paths(self.source, self.destination,
+                                                desired=[self._link("3")])
+
+        self.assertEqual(len(paths), 1)
+        hops = self._hops(paths[0])
+        self.assertIn((endpoint_a, endpoint_b), zip(hops[:-1], hops[1:]))
+
+    def test_shortest_paths_desired_from_source(self):
+        """Test a desired link starting at the source."""
+        paths = self.kytos_graph.shortest_paths(self.source, self.destination,
+                                                desired=[self._link("1")])
+
+        self.assertEqual(paths, [[self.source, self.destination]])
+
+    def test_shortest_paths_desired_and_undesired(self):
+        """Test a desired link which is also undesired gives no path."""
+        paths = self.kytos_graph.shortest_paths(self.source, self.destination,
+                                                desired=[self._link("2")],
+                                                undesired=[self._link("2")])
+
+        self.assertEqual(paths, [])
+
+    def test_shortest_paths_constraints(self):
+        """Test links failing thresholds or budgets are never used."""
+        self.topology.links["2"].metadata = {"bandwidth": 100}
+        self.topology.links["3"].metadata = {"bandwidth": 100}
+        self.kytos_graph.update_topology(self.topology)
+
+        constraints = Constraints({"bandwidth": 50})
+        paths = self.kytos_graph.shortest_paths(self.source, self.destination,
+                                                constraints=constraints)
+        self.assertEqual(len(paths), 1)
+        self.assertEqual(len(self._hops(paths[0])), 6)
+
+        constraints = Constraints(budget={None: 1})
+        paths = self.kytos_graph.shortest_paths(self.source, self.destination,
+                                                constraints=constraints)
+        self.assertEqual(paths, [[self.source, self.destination]])
+
+        paths = self.kytos_graph.shortest_paths(self.source, self.destination,
+                                                desired=[self._link("3")],
+                                                constraints=constraints)
+        self.assertEqual(paths, [])
+
+    def test_disjoint_paths(self):
+        """Test the disjoint pair goes through both sides of the ring."""
+        for node_disjoint in (False, True):
+            paths = self.kytos_graph.disjoint_paths(
+                self.source, self.destination, node_disjoint=node_disjoint)
+
+            self.assertEqual(len(paths), 2)
+            self.assertEqual(paths[0], [self.source, self.destination])
+            self.assertEqual(self._hops(paths[1]),
+                             ["00:00:00:00:00:00:00:01:1",
+                              "00:00:00:00:00:00:00:01:2",
+                              "00:00:00:00:00:00:00:03:1",
+                              "00:00:00:00:00:00:00:03:2",
+                              "00:00:00:00:00:00:00:02:2",
+                              "00:00:00:00:00:00:00:02:1"])
+
+        paths = self.kytos_graph.disjoint_paths(self.source, self.destination,
+                                                undesired=[self._link("2")])
+        self.assertEqual(paths, [])
+
+    @patch('napps.kytos.pathfinder.settings.GRAPH_BACKEND', 'compact')
+    def test_shortest_paths_compact(self):
+        """Test the compact backend gives the same paths as networkx."""
+        expected = self.kytos_graph.shortest_paths(
+            self.source, self.destination, undesired=[self._link("1")])
+        self.kytos_graph.cache.clear(self.kytos_graph.version)
+        self.topology.links["2"].metadata = {"delay": 10}
+        self.kytos_graph.update_topology(self.topology)
+
+        self.assertIsNotNone(self.kytos_graph.snapshot._compact)
+        paths = self.kytos_graph.shortest_paths(
+            self.source, self.destination, undesired=[self._link("1")])
+        self.assertEqual(paths, expected)
+
+        paths = self.kytos_graph.shortest_paths(
+            self.source, self.destination, desired=[self._link("3")])
+        self.assertEqual(len(paths), 1)
+
+        results = self.kytos_graph.batch_shortest_paths(
+            [(self.source, self.destination, None, 1, [], [])])
+        self.assertEqual(results, [[[self.source, self.destination]]])
+
+    def test_update_topology_unchanged(self):
+        """Test an update with the same topology changes nothing."""
+        self.assertEqual(self.kytos_graph.update_topology(self.topology), 0)
+        self.assertEqual(self.kytos_graph.graph.number_of_nodes(), 9)
+        self.assertEqual(self.kytos_graph.graph.number_of_edges(), 9)
+
+    def test_update_topology_link_changes(self):
+        """Test only the changed links are updated."""
+        self.topology.links["1"].is_active.return_value = False
+        self.topology.links["2"].metadata = {"delay": 10}
+
+        self.assertEqual(self.kytos_graph.update_topology(self.topology), 2)
+        self.assertFalse(self.kytos_graph.graph.has_edge(*self._link("1")))
+        edge = self.kytos_graph.graph.edges[self._link("2")]
+        self.assertEqual(edge, {"delay": 10, "A": 0, "BB": 0, "CCC": 0})
+
+        self.topology.links["1"].is_active.return_value = True
+        self.assertEqual(self.kytos_graph.update_topology(self.topology), 1)
+        self.assertTrue(self.kytos_graph.graph.has_edge(*self._link("1")))
+
+    @patch.dict('napps.kytos.pathfinder.settings.METRIC_DEFAULTS',
+                {"delay": 100})
+    def test_update_topology_metric_defaults(self):
+        """Test edges without a metric get its default."""
+        self.kytos_graph.cache.put(("key",), self.kytos_graph.version, [])
+        self.topology.links["2"].metadata = {"delay": 10}
+        self.topology.links["3"].metadata = {"delay": 10}
+
+        self.kytos_graph.update_topology(self.topology)
+        graph = self.kytos_graph.graph
+        self.assertEqual(len(self.kytos_graph.cache), 0)
+        self.assertEqual(graph.edges[self._link("1")]["delay"], 100)
+        self.assertEqual(graph.edges[self._link("2")]["delay"], 10)
+        switch = self.topology.switches["00:00:00:00:00:00:00:01"]
+        self.assertEqual(graph.edges[switch.id, self.source],
+                         {"A": 0, "BB": 0, "CCC": 0, "delay": 0})
+
+        paths = self.kytos_graph.shortest_paths(self.source, self.destination,
+                                                "delay", max_paths=1)
+        self.assertEqual(self._hops(paths[0])[1], "00:00:00:00:00:00:00:01:2")
+
+    def test_update_topology_switch_removed(self):
+        """Test removing a switch removes its interfaces and links."""
+        switch = self.topology.switches.pop("00:00:00:00:00:00:00:03")
+        del self.topology.links["2"]
+        del self.topology.links["3"]
+
+        self.assertEqual(self.kytos_graph.update_topology(self.topology), 5)
+        self.assertNotIn(switch.id, self.kytos_graph.graph)
+        self.assertEqual(self.kytos_graph.graph.number_of_nodes(), 6)
+        self.assertEqual(self.kytos_graph.graph.number_of_edges(), 5)
+
+    def test_update_topology_interface_removed(self):
+        """Test removing an interface restores its link when it is back."""
+        switch = self.topology.switches["00:00:00:00:00:00:00:01"]
+        interfaces = dict(switch.interfaces)
+        del switch.interfaces["00:00:00:00:00:00:00:01:1"]
+        self.kytos_graph.update_nodes(self.topology.switches)
+        self.assertFalse(self.kytos_graph.graph.has_edge(*self._link("1")))
+
+        switch.interfaces = interfaces
+        self.assertEqual(self.kytos_graph.update_topology(self.topology), 2)
+        self.assertTrue(self.kytos_graph.graph.has_edge(*self._link("1")))
+
+    def test_shortest_paths_snapshot(self):
+        """Test a search keeps using the snapshot it was given."""
+        snapshot = self.kytos_graph.snapshot
+        self.topology.links["1"].is_active.return_value = False
+        self.kytos_graph.update_topology(self.topology)
+
+        self.assertEqual(self.kytos_graph.version, snapshot.version + 1)
+        self.assertTrue(snapshot.graph.has_edge(*self._link("1")))
+        paths = self.kytos_graph.shortest_paths(self.source, self.destination,
+                                                max_paths=1,
+                                                snapshot=snapshot)
+        self.assertEqual(paths, [[self.source, self.destination]])
+
+    def test_iter_shortest_paths(self):
+        """Test paths are only cached once they were all yielded."""
+        paths = self.kytos_graph.iter_shortest_paths(self.source,
+                                                     self.destination)
+        self.assertEqual(next(paths), [self.source, self.destination])
+        paths.close()
+        self.assertEqual(len(self.kytos_graph.cache), 0)
+
+        paths = list(self.kytos_graph.iter_shortest_paths(self.source,
+                                                          self.destination))
+        self.assertEqual(len(paths), 2)
+        self.assertEqual(self.kytos_graph.shortest_paths(self.source,
+                                                         self.destination),
+                         paths)
+        self.assertEqual(self.kytos_graph.cache.get_stats()['hits'], 1)
+
+    def test_shortest_paths_cancelled(self):
+        """Test a cancelled search raises Cancelled and caches nothing."""
+        cancel = Event()
+        cancel.set()
+        with self.assertRaises(Cancelled):
+            self.kytos_graph.shortest_paths(self.source, self.destination,
+                                            cancel=cancel)
+        with self.assertRaises(Cancelled):
+            self.kytos_graph.batch_shortest_paths(
+                [(self.source, self.destination, None, 1, [], [])],
+                cancel=cancel)
+        self.assertEqual(len(self.kytos_graph.cache), 0)
+
+    @patch('napps.kytos.pathfinder.settings.SWITCH_LEVEL_SEARCH', False)
+    @patch('networkx.shortest_simple_paths')
+    def test_shortest_paths_cached(self, mock_shortest_simple_paths):
+        """Test cached paths are only dropped when the changes touch them."""
+        path = [self.source, self.destination]
+        mock_shortest_simple_paths.return_value = iter([path])
+        paths = self.kytos_graph.shortest_paths(self.source, self.destination,
+                                                max_paths=1)
+        self.assertEqual(paths, [path])
+        self.assertEqual(self.kytos_graph.shortest_paths(
+            self.source, self.destination, max_paths=1), [path])
+        mock_shortest_simple_paths.assert_called_once()
+
+        self.topology.links["2"].metadata = {"A": 10}
+        self.kytos_graph.update_topology(self.topology)
+        self.kytos_graph.shortest_paths(self.source, self.destination,
+                                        max_paths=1)
+        mock_shortest_simple_paths.assert_called_once()
+
+        self.topology.links["1"].is_active.return_value = False
+        self.kytos_graph.update_topology(self.topology)
+        self.kytos_graph.shortest_paths(self.source, self.destination,
+                                        max_paths=1)
+        self.assertEqual(mock_shortest_simple_paths.call_count, 2)
+
+    def test_get_links_endpoints(self):
+        """Test get links endpoints from a snapshot."""
+        snapshot = self.kytos_graph.snapshot
+
+        endpoints = snapshot.get_links_endpoints(["1", "unknown"])
+        self.assertEqual(endpoints, [self._link("1")])
+        self.assertEqual(snapshot.get_links_endpoints(None), [])
+
+    def test_shortest_paths_unknown_node(self):
+        """Test waypoint search with an unknown source."""
+        paths = self.kytos_graph.shortest_paths("unknown", self.destination,
+                                                desired=[self._link("1")])
+
+        self.assertEqual(paths, [])
+
+    @patch('networkx.single_source_shortest_path',
+           wraps=nx.single_source_shortest_path)
+    def test_batch_shortest_paths(self, mock_single_source):
+        """Test batch queries from the same source share one search."""
+        other = "00:00:00:00:00:00:00:03:1"
+        queries = [(self.source, self.destination, None, 1, [], []),
+                   (self.source, other, None, 1, [], []),
+                   (self.source, "unknown", None, 1, [], []),
+                   ("unknown", other, None, 1, [], []),
+                   (self.source, self.destination, None, 2, [], [])]
+        results = self.kytos_graph.batch_shortest_paths(queries)
+
+        self.assertEqual(results[0], [[self.source, self.destination]])
+        path = next(iter(results[1]))
+        self.assertEqual((path[0], path[-1]), (self.source, other))
+        self.assertEqual(results[2], [])
+        self.assertEqual(results[3], [])
+        self.assertEqual(len(results[4]), 2)
+        self.assertEqual(mock_single_source.call_count, 2)
+
+
+class TestGraphMetrics(TestCase):
+    """Tests for the counters and timings of the KytosGraph searches."""
+
+    def setUp(self):
+        """Build the graph of the default topology."""
+        self.topology = get_topology_mock()
+        self.kytos_graph = KytosGraph()
+        self.kytos_graph.update_topology(self.topology)
+        self.source = "00:00:00:00:00:00:00:01:1"
+        self.destination = "00:00:00:00:00:00:00:02:1"
+
+    def test_shortest_paths_metrics(self):
+        """Test paths enumerated and returned are counted."""
+        metrics = self.kytos_graph.metrics
+        self.kytos_graph.shortest_paths(self.source, self.destination,
+                                        max_paths=1)
+        self.kytos_graph.shortest_paths(self.source, self.destination,
+                                        max_paths=1)
+        self.assertEqual(metrics.get_counter('paths_enumerated'), 1)
+        self.assertEqual(metrics.get_counter('paths_returned'), 2)
+
+        constraints = Constraints(budget={None: 1})
+        link = self.topology.links["3"]
+        self.kytos_graph.shortest_paths(
+            self.source, self.destination,
+            desired=[(link.endpoint_a.id, link.endpoint_b.id)],
+            constraints=constraints)
+        self.assertEqual(metrics.get_counter('paths_enumerated'), 2)
+        self.assertEqual(metrics.get_counter('paths_returned'), 2)
+        self.assertIn('pathfinder_shortest_paths_seconds_count 3',
+                      metrics.render())
+
+
+class TestShortestPathDag(TestCase):
+    """Tests for the shortest path DAG of KytosGraph."""
+
+    def setUp(self):
+        """Build a square of switches with two equal-cost halves."""
+        self.topology = get_mesh_topology_mock(4, [(1, 2, 1), (2, 4, 1),
+                                                   (1, 3, 1), (3, 4, 5)])
+        self.kytos_graph = KytosGraph()
+        self.kytos_graph.update_topology(self.topology)
+        self.source, self.destination = "00:00:00:00:00:00:00:01", \
+            "00:00:00:00:00:00:00:04"
+
+    def test_shortest_path_dag(self):
+        """Test the DAG holds the paths of both halves of the square."""
+        dag = self.kytos_graph.shortest_path_dag(self.source,
+                                                 self.destination)
+        self.assertEqual(dag['paths'], 2)
+        self.assertEqual(len(dag['nodes']), 12)
+        self.assertEqual(len(dag['links']), 12)
+        self.assertEqual(self.kytos_graph.shortest_path_dag(
+            self.source, self.destination, "delay")['paths'], 1)
+
+        dag = self.kytos_graph.shortest_path_dag(
+            self.source, self.destination,
+            constraints=Constraints(maximum={"delay": 2}))
+        self.assertEqual(dag['paths'], 1)
+        self.assertIn("00:00:00:00:00:00:00:02", dag['nodes'])
+
+        self.assertEqual(self.kytos_graph.shortest_path_dag(
+            self.source, "unknown"), {'nodes': [], 'links': [], 'paths': 0})
+
+    def test_shortest_path_dag_cancelled(self):
+        """Test a cancelled DAG search raises Cancelled."""
+        cancel = Event()
+        cancel.set()
+        with self.assertRaises(Cancelled):
+            self.kytos_graph.shortest_path_dag(self.source, self.destination,
+                                               cancel=cancel)
+
+
+class TestWaypointPaths(TestCase):
+    """Tests for the paths crossing desired links."""
+
+    def setUp(self):
+        """Create an empty graph to call the waypoint searches on."""
+        self.kytos_graph = KytosGraph()
+
+    def test_waypoint_paths(self):
+        """Test every path with the desired links is found, cheapest first."""
+        graph = nx.grid_2d_graph(4, 4)
+        desired = [((1, 1), (1, 2))]
+        expected = [path for path in nx.all_simple_paths(graph, (0, 0),
+                                                         (3, 3))
+                    if frozenset(desired[0]) in
+                    map(frozenset, zip(path[:-1], path[1:]))]
+        blocked = nx.Graph([("S", "x"), ("x", "a"), ("S", "y1"),
+                            ("y1", "y2"), ("y2", "a"), ("a", "b"),
+                            ("b", "x"), ("x", "D")])
+        for search in (NetworkxSearch(graph), CompactGraph.from_graph(graph)):
+            paths = list(self.kytos_graph._waypoint_paths(
+                search, (0, 0), (3, 3), None, desired))
+            self.assertEqual(sorted(paths), sorted(expected))
+            self.assertEqual([len(path) for path in paths],
+                             sorted(len(path) for path in paths))
+        for search in (NetworkxSearch(blocked),
+                       CompactGraph.from_graph(blocked)):
+            paths = list(self.kytos_graph._waypoint_paths(
+                search, "S", "D", None, [("a", "b")]))
+            self.assertEqual(paths, [["S", "y1", "y2", "a", "b", "x", "D"]])
+
+    @patch('napps.kytos.pathfinder.settings.MAX_DESIRED_SEARCH_PATHS', 1)
+    def test_waypoint_paths_bounded(self):
+        """Test waypoint chains are used past the enumeration bound."""
+        graph = nx.grid_2d_graph(4, 4)
+        link = ((1, 1), (1, 2))
+        paths = list(self.kytos_graph._waypoint_paths(
+            NetworkxSearch(graph), (0, 0), (3, 3), None, [link]))
+
+        self.assertTrue(paths)
+        self.assertEqual(len(paths[0]), 7)
+        for path in paths:
+            self.assertIn(frozenset(link),
+                          set(map(frozenset, zip(path[:-1], path[1:]))))
+
+
+class TestSwitchLevelSearch(TestCase):
+    """Tests for the searches on the switch-level graph."""
+
+    def setUp(self):
+        """Build a mesh with parallel links and an unlinked interface."""
+        self.topology = get_mesh_topology_mock(6, [
+            (1, 2, 5), (1, 2, 1), (1, 3, 2), (2, 3, 1), (2, 4, 4),
+            (3, 4, 1), (3, 5, 7), (4, 5, 2), (4, 6, 3), (5, 6, 1),
+            (1, 6, 20)])
+        switch = self.topology.switches["00:00:00:00:00:00:00:06"]
+        interface = get_interface_mock("eth9", 9, switch)
+        switch.interfaces[interface.id] = interface
+        self.kytos_graph = KytosGraph()
+        self.kytos_graph.update_topology(self.topology)
+        self.interfaces = sorted(
+            interface for switch in self.topology.switches.values()
+            for interface in switch.interfaces)
+
+    def _search(self, switch_level, *args, **kwargs):
+        """Return the paths found with or without the switch-level graph."""
+        self.kytos_graph.cache.clear(self.kytos_graph.version)
+        with patch('napps.kytos.pathfinder.settings.SWITCH_LEVEL_SEARCH',
+                   switch_level):
+            return self.kytos_graph.shortest_paths(*args, **kwargs)
+
+    def _switch_simple(self, path):
+        """Return True if the path never goes back through a switch."""
+        switch_of = self.kytos_graph.snapshot.switch_graph.switch_of
+        nodes = [switch_of.get(hop, hop) for hop in path]
+        nodes = [node for index, node in enumerate(nodes)
+                 if not index or node != nodes[index - 1]]
+        return len(nodes) == len(set(nodes))
+
+    def test_same_costs(self):
+        """Test the switch-level paths cost the same as interface ones."""
+        search = self.kytos_graph.snapshot.search
+        source, destination = "00:00:00:00:00:00:00:01", \
+            "00:00:00:00:00:00:00:05"
+        for parameter in (None, "delay"):
+            expected = self._search(False, source, destination, parameter)
+            paths = self._search(True, source, destination, parameter)
+
+            self.assertEqual(
+                [search.path_cost(path, parameter) for path in paths],
+                [search.path_cost(path, parameter) for path in expected])
+            self.assertEqual(sorted(paths), sorted(expected))
+
+    def test_interface_paths(self):
+        """Test interface searches keep the paths back through a switch."""
+        search = self.kytos_graph.snapshot.search
+        for source, destination in [(self.interfaces[0], self.interfaces[-1]),
+                                    (self.interfaces[3], self.interfaces[8]),
+                                    ("00:00:00:00:00:00:00:01",
+                                     self.interfaces[-2])]:
+            for parameter in (None, "delay"):
+                expected = self._search(False, source, destination,
+                                        parameter)
+                with patch.object(self.kytos_graph.snapshot.switch_graph,
+                                  'shortest_simple_paths') as mock_search:
+                    paths = self._search(True, source, destination,
+                                         parameter)
+                mock_search.assert_not_called()
+                self.assertEqual(paths, expected)
+
+                paths = self._search(True, source, destination, parameter,
+                                     1)
+                self.assertTrue(self._switch_simple(paths[0]))
+                self.assertEqual(search.path_cost(paths[0], parameter),
+                                 search.path_cost(expected[0], parameter))
+
+        hairpins = self._search(False, self.interfaces[0],
+                                self.interfaces[-1])
+        self.assertFalse(all(map(self._switch_simple, hairpins)))
+
+    def test_cost(self):
+        """Test cost searches give the same costs on both graphs."""
+        compact = self.kytos_graph.snapshot.compact
+        cost = Cost.from_dict({'weights': {'delay': 0.5, 'hops': 1}})
+        source, destination = "00:00:00:00:00:00:00:01", \
+            "00:00:00:00:00:00:00:06"
+
+        expected = self._search(False, source, destination, cost)
+        paths = self._search(True, source, destination, cost)
+        self.assertEqual([compact.path_cost(path, cost) for path in paths],
+                         [compact.path_cost(path, cost) for path in expected])
+        paths = self._search(True, self.interfaces[0], self.interfaces[-1],
+                             cost, 1)
+        expected = self._search(False, self.interfaces[0],
+                                self.interfaces[-1], cost, 1)
+        self.assertEqual(compact.path_cost(paths[0], cost),
+                         compact.path_cost(expected[0], cost))
+
+    @patch('napps.kytos.pathfinder.settings.DISTANCE_TABLES', [None])
+    def test_distance_tables(self):
+        """Test single path queries between switches read the tables."""
+        source, destination = "00:00:00:00:00:00:00:01", \
+            "00:00:00:00:00:00:00:05"
+        expected = self._search(True, source, destination, max_paths=1)
+        self.topology.links["1"].metadata = {"delay": 6}
+        self.kytos_graph.update_topology(self.topology)
+        self.assertTrue(self.kytos_graph.tables_worker.wait(5))
+
+        snapshot = self.kytos_graph.snapshot
+        self.assertIsNotNone(snapshot.tables)
+        with patch.object(snapshot.switch_graph, 'shortest_simple_paths') \
+                as mock_search:
+            paths = self._search(True, source, destination, max_paths=1)
+            results = self.kytos_graph.batch_shortest_paths(
+                [(source, destination, None, 1, [], [])])
+        mock_search.assert_not_called()
+        self.assertEqual(len(paths[0]), len(expected[0]))
+        self.assertEqual(results, [paths])
+        self.assertEqual(paths[0][0], source)
+        self.assertEqual(paths[0][-1], destination)
+
+    def test_cache_cheaper_links(self):
+        """Test cached paths are dropped when other paths may be cheaper."""
+        source, destination = "00:00:00:00:00:00:00:01", \
+            "00:00:00:00:00:00:00:05"
+        search = self.kytos_graph.snapshot.search
+        paths = self.kytos_graph.shortest_paths(source, destination, "delay",
+                                                1)
+        self.assertEqual(search.path_cost(paths[0], "delay"), 5)
+        hops = self.kytos_graph.shortest_paths(source, destination,
+                                               max_paths=1)
+
+        self.topology.links["11"].metadata = {"delay": 20}
+        self.kytos_graph.update_topology(self.topology)
+        hits = self.kytos_graph.cache.get_stats()["hits"]
+        self.assertEqual(self.kytos_graph.shortest_paths(
+            source, destination, "delay", 1), paths)
+        self.assertEqual(self.kytos_graph.cache.get_stats()["hits"],
+                         hits + 1)
+
+        self.topology.links["11"].metadata = {"delay": 0}
+        self.kytos_graph.update_topology(self.topology)
+        hits = self.kytos_graph.cache.get_stats()["hits"]
+        self.assertEqual(self.kytos_graph.shortest_paths(
+            source, destination, max_paths=1), hops)
+        self.assertEqual(self.kytos_graph.cache.get_stats()["hits"],
+                         hits + 1)
+        paths = self.kytos_graph.shortest_paths(source, destination, "delay",
+                                                1)
+        search = self.kytos_graph.snapshot.search
+        self.assertEqual(search.path_cost(paths[0], "delay"), 1)
+
+        self.topology = get_mesh_topology_mock(6, [(1, 2, 5), (1, 5, 9),
+                                                   (2, 5, 1)])
+        self.kytos_graph.update_topology(self.topology)
+        self.assertEqual(len(self.kytos_graph.cache), 0)
+
+    def test_update_topology_weights_only(self):
+        """Test weight changes reuse the graphs of the previous snapshot."""
+        previous = self.kytos_graph.snapshot
+        previous.compact  # pylint: disable=pointless-statement
+        source, destination = self.interfaces[0], self.interfaces[-2]
+        self.topology.links["5"].metadata = {"delay": 1}
+        self.topology.links["7"].metadata = {"delay": 1}
+        self.assertEqual(self.kytos_graph.update_topology(self.topology), 2)
+
+        snapshot = self.kytos_graph.snapshot
+        self.assertEqual(self.kytos_graph.metrics.get_counter(
+            "weight_updates"), 1)
+        self.assertIs(snapshot.switch_graph.targets,
+                      previous.switch_graph.targets)
+        self.assertIs(snapshot.compact.edges, previous.compact.edges)
+        link = self.topology.links["5"]
+        endpoints = (link.endpoint_a.id, link.endpoint_b.id)
+        self.assertEqual(snapshot.graph.edges[endpoints]["delay"], 1)
+        self.assertEqual(previous.graph.edges[endpoints]["delay"], 4)
+        for switch_level in (True, False):
+            paths = self._search(switch_level, source, destination, "delay")
+            self.assertEqual(
+                snapshot.compact.path_cost(paths[0], "delay"),
+                nx.shortest_path_length(snapshot.graph, source, destination,
+                                        "delay"))
+
+        self.topology.links["5"].metadata = {"delay": 1, "bandwidth": 10}
+        self.kytos_graph.update_topology(self.topology)
+        self.assertIsNot(self.kytos_graph.snapshot.compact.edges,
+                         previous.compact.edges)
+
+    def test_undesired(self):
+        """Test undesired links are hidden from the switch-level graph."""
+        link = self.topology.links["2"]
+        undesired = [(link.endpoint_a.id, link.endpoint_b.id)]
+        source, destination = "00:00:00:00:00:00:00:01:1", \
+            "00:00:00:00:00:00:00:02:1"
+
+        expected = self._search(False, source, destination, "delay", 5,
+                                undesired=undesired)
+        paths = self._search(True, source, destination, "delay", 5,
+                             undesired=undesired)
+        self.assertEqual(paths, expected)
+        for path in paths:
+            self.assertNotIn(frozenset(undesired[0]),
+                             map(frozenset, zip(path[:-1], path[1:])))
+
+    def test_same_switch(self):
+        """Test paths between interfaces of one switch are still found."""
+        source, destination = "00:00:00:00:00:00:00:01:1", \
+            "00:00:00:00:00:00:00:01:2"
+        snapshot = self.kytos_graph.snapshot
+
+        self.assertFalse(snapshot.switch_graph.contracts(source,
+                                                         destination))
+        paths = self._search(True, source, destination, max_paths=1)
+        self.assertEqual(paths, [[source, "00:00:00:00:00:00:00:01",
+                                  destination]])
+
+    @patch('napps.kytos.pathfinder.settings.DISTANCE_TABLES', [None])
+    def test_save_load(self):
+        """Test a saved snapshot serves the same paths once loaded."""
+        self.kytos_graph.tables_worker.submit(self.kytos_graph.snapshot)
+        self.assertTrue(self.kytos_graph.tables_worker.wait(5))
+        source, destination = self.interfaces[0], self.interfaces[-2]
+        expected = self.kytos_graph.shortest_paths(source, destination,
+                                                   "delay", 3)
+
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "snapshot")
+            self.assertEqual(self.kytos_graph.save(path), 1)
+            kytos_graph = KytosGraph()
+            self.assertTrue(kytos_graph.load(path))
+
+        snapshot = kytos_graph.snapshot
+        self.assertEqual(snapshot.version, 1)
+        self.assertIsNotNone(snapshot._switch_graph)
+        self.assertIsNotNone(snapshot.tables)
+        self.assertEqual(kytos_graph.shortest_paths(source, destination,
+                                                    "delay", 3), expected)
+        self.assertEqual(kytos_graph.update_topology(self.topology), 0)
+
+    def test_load_invalid(self):
+        """Test missing or invalid files keep the current snapshot."""
+        snapshot = self.kytos_graph.snapshot
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "snapshot")
+            self.assertFalse(self.kytos_graph.load(path))
+            with open(path, "wb") as file:
+                pickle.dump({"format": 0}, file)
+            self.assertFalse(self.kytos_graph.load(path))
+            with open(path, "wb") as file:
+                file.write(b"invalid")
+            self.assertFalse(self.kytos_graph.load(path))
+            with open(path, "wb") as file:
+                pickle.dump({"format": SNAPSHOT_FORMAT, "snapshot": None},
+                            file)
+            self.assertFalse(self.kytos_graph.load(path))
+            with open(path, "wb") as file:
+                file.write(b"cbuiltins\nint\n(S'x'\ntR.")
+            self.assertFalse(self.kytos_graph.load(path))
+
+        self.assertIs(self.kytos_graph.snapshot, snapshot)
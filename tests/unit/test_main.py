@@ -1,12 +1,20 @@
 """Test Main methods."""
+import json
+import os
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from tempfile import TemporaryDirectory
 from unittest import TestCase
-from unittest.mock import patch
+from unittest.mock import ANY, patch
 
 from kytos.core.events import KytosEvent
 from kytos.lib.helpers import get_controller_mock, get_test_client
 
+from napps.kytos.pathfinder import settings
+from napps.kytos.pathfinder.constraints import Constraints
+from napps.kytos.pathfinder.cost import Cost
 from napps.kytos.pathfinder.main import Main
-from tests.helpers import get_topology_mock
+from napps.kytos.pathfinder.workers import Overloaded
+from tests.helpers import get_mesh_topology_mock, get_topology_mock
 
 
 # pylint: disable=protected-access
@@ -24,19 +32,23 @@ class TestMain(TestCase):
                            content={'topology': topology})
         self.napp.update_topology(event)
 
-        self.assertEqual(self.napp._topology, topology)
+        self.assertTrue(self.napp.updates.wait(5))
+        self.assertEqual(len(self.napp.graph.snapshot.switches),
+                         len(topology.switches))
+        self.assertEqual(self.napp.graph.version, 1)
 
     def test_update_topology_failure_case(self):
         """Test update topology method to failure case."""
         event = KytosEvent(name='kytos.topology.updated')
         self.napp.update_topology(event)
 
-        self.assertIsNone(self.napp._topology)
+        self.assertEqual(self.napp.updates.get_stats()['received'], 0)
+        self.assertEqual(self.napp.graph.version, 0)
 
     @patch('napps.kytos.pathfinder.graph.KytosGraph.shortest_paths')
     def test_shortest_path(self, mock_shortest_paths):
         """Test shortest path."""
-        self.napp._topology = get_topology_mock()
+        self.napp.graph.update_topology(get_topology_mock())
         path = ["00:00:00:00:00:00:00:01:1", "00:00:00:00:00:00:00:02:1"]
         mock_shortest_paths.return_value = [path]
 
@@ -48,22 +60,397 @@ class TestMain(TestCase):
                 "undesired_links": None}
         response = api.open(url, method='POST', json=data)
 
-        expected_response = {'paths': [{'hops': path}]}
+        expected_response = {'paths': [{'hops': path}], 'version': 1}
         self.assertEqual(response.json, expected_response)
         self.assertEqual(response.status_code, 200)
 
-    def test_filter_paths(self):
-        """Test filter paths."""
-        self.napp._topology = get_topology_mock()
-        paths = [{"hops": ["00:00:00:00:00:00:00:01:1",
-                           "00:00:00:00:00:00:00:02:1"]}]
-        desired, undesired = ["1"], None
-
-        filtered_paths = self.napp._filter_paths(paths, desired, undesired)
-        self.assertEqual(filtered_paths, paths)
-
-        paths = [{"hops": ["00:00:00:00:00:00:00:01:2",
-                           "00:00:00:00:00:00:00:03:1"]}]
-        desired, undesired = None, ["2"]
-        filtered_paths = self.napp._filter_paths(paths, desired, undesired)
-        self.assertEqual(filtered_paths, [])
+    @patch('napps.kytos.pathfinder.graph.KytosGraph.shortest_paths')
+    def test_shortest_path_max_paths(self, mock_shortest_paths):
+        """Test shortest path forwards max_paths to the graph."""
+        mock_shortest_paths.return_value = []
+
+        api = get_test_client(self.napp.controller, self.napp)
+        url = "http://127.0.0.1:8181/api/kytos/pathfinder/v2"
+        data = {"source": "00:00:00:00:00:00:00:01:1",
+                "destination": "00:00:00:00:00:00:00:02:1"}
+        snapshot = self.napp.graph.snapshot
+        api.open(url, method='POST', json=data)
+        mock_shortest_paths.assert_called_with(data['source'],
+                                               data['destination'], None,
+                                               settings.DEFAULT_MAX_PATHS,
+                                               [], [], None, snapshot=snapshot,
+                                               cancel=ANY)
+
+        data['max_paths'] = 2
+        api.open(url, method='POST', json=data)
+        mock_shortest_paths.assert_called_with(data['source'],
+                                               data['destination'], None, 2,
+                                               [], [], None, snapshot=snapshot,
+                                               cancel=ANY)
+
+        data['max_paths'] = settings.MAX_PATHS_LIMIT + 1
+        api.open(url, method='POST', json=data)
+        mock_shortest_paths.assert_called_with(data['source'],
+                                               data['destination'], None,
+                                               settings.MAX_PATHS_LIMIT,
+                                               [], [], None, snapshot=snapshot,
+                                               cancel=ANY)
+
+    def test_shortest_path_invalid_max_paths(self):
+        """Test shortest path with an invalid max_paths."""
+        api = get_test_client(self.napp.controller, self.napp)
+        url = "http://127.0.0.1:8181/api/kytos/pathfinder/v2"
+        data = {"source": "00:00:00:00:00:00:00:01:1",
+                "destination": "00:00:00:00:00:00:00:02:1",
+                "max_paths": 0}
+        response = api.open(url, method='POST', json=data)
+
+        self.assertEqual(response.status_code, 400)
+
+    @patch('napps.kytos.pathfinder.graph.KytosGraph.shortest_paths')
+    def test_shortest_path_constraints(self, mock_shortest_paths):
+        """Test shortest path forwards the links endpoints to the graph."""
+        self.napp.graph.update_topology(get_topology_mock())
+        mock_shortest_paths.return_value = []
+
+        api = get_test_client(self.napp.controller, self.napp)
+        url = "http://127.0.0.1:8181/api/kytos/pathfinder/v2"
+        data = {"source": "00:00:00:00:00:00:00:01:1",
+                "destination": "00:00:00:00:00:00:00:02:1",
+                "desired_links": ["1"],
+                "undesired_links": ["2", "unknown"],
+                "max_paths": 1}
+        api.open(url, method='POST', json=data)
+
+        desired = [("00:00:00:00:00:00:00:01:1", "00:00:00:00:00:00:00:02:1")]
+        undesired = [("00:00:00:00:00:00:00:01:2",
+                      "00:00:00:00:00:00:00:03:1")]
+        snapshot = self.napp.graph.snapshot
+        mock_shortest_paths.assert_called_with(data['source'],
+                                               data['destination'], None, 1,
+                                               desired, undesired, None,
+                                               snapshot=snapshot, cancel=ANY)
+
+    @patch('napps.kytos.pathfinder.graph.KytosGraph.shortest_paths')
+    def test_shortest_path_cost(self, mock_shortest_paths):
+        """Test shortest path forwards the cost to the graph."""
+        mock_shortest_paths.return_value = []
+
+        api = get_test_client(self.napp.controller, self.napp)
+        url = "http://127.0.0.1:8181/api/kytos/pathfinder/v2"
+        data = {"source": "00:00:00:00:00:00:00:01:1",
+                "destination": "00:00:00:00:00:00:00:02:1",
+                "cost": {"lexicographic": ["delay", "hops"]}}
+        response = api.open(url, method='POST', json=data)
+
+        self.assertEqual(response.status_code, 200)
+        cost = mock_shortest_paths.call_args[0][2]
+        self.assertEqual(cost, Cost('lexicographic', ['delay', None]))
+
+        for cost in ({"weights": {"delay": -1}},
+                     {"lexicographic": ["delay"], "weights": {}}):
+            data["cost"] = cost
+            response = api.open(url, method='POST', json=data)
+            self.assertEqual(response.status_code, 400)
+
+        data["cost"] = {"weights": {"delay": 1}}
+        data["parameter"] = "delay"
+        response = api.open(url, method='POST', json=data)
+        self.assertEqual(response.status_code, 400)
+
+    @patch('napps.kytos.pathfinder.graph.KytosGraph.shortest_paths')
+    def test_shortest_path_path_constraints(self, mock_shortest_paths):
+        """Test shortest path forwards the constraints to the graph."""
+        mock_shortest_paths.return_value = []
+
+        api = get_test_client(self.napp.controller, self.napp)
+        url = "http://127.0.0.1:8181/api/kytos/pathfinder/v2"
+        data = {"source": "00:00:00:00:00:00:00:01:1",
+                "destination": "00:00:00:00:00:00:00:02:1",
+                "constraints": {"minimum": {"bandwidth": 100},
+                                "budget": {"delay": 50}}}
+        response = api.open(url, method='POST', json=data)
+
+        self.assertEqual(response.status_code, 200)
+        constraints = mock_shortest_paths.call_args[0][6]
+        self.assertEqual(constraints, Constraints({"bandwidth": 100},
+                                                  budget={"delay": 50}))
+
+        data["constraints"] = {"budget": {"delay": -1}}
+        response = api.open(url, method='POST', json=data)
+        self.assertEqual(response.status_code, 400)
+
+    @patch('napps.kytos.pathfinder.graph.KytosGraph.disjoint_paths')
+    def test_shortest_path_disjoint(self, mock_disjoint_paths):
+        """Test shortest path forwards disjoint pair requests to the graph."""
+        mock_disjoint_paths.return_value = [["a", "b"], ["a", "c", "b"]]
+
+        api = get_test_client(self.napp.controller, self.napp)
+        url = "http://127.0.0.1:8181/api/kytos/pathfinder/v2"
+        data = {"source": "00:00:00:00:00:00:00:01:1",
+                "destination": "00:00:00:00:00:00:00:02:1",
+                "parameter": "delay",
+                "disjoint": "node"}
+        response = api.open(url, method='POST', json=data)
+
+        self.assertEqual(response.json['paths'],
+                         [{'hops': ["a", "b"]}, {'hops': ["a", "c", "b"]}])
+        snapshot = self.napp.graph.snapshot
+        mock_disjoint_paths.assert_called_with(data['source'],
+                                               data['destination'], "delay",
+                                               [], None, True,
+                                               snapshot=snapshot, cancel=ANY)
+
+        for invalid in ({"disjoint": "path"},
+                        {"disjoint": "link", "desired_links": ["1"]},
+                        {"disjoint": "link",
+                         "constraints": {"budget": {"delay": 5}}}):
+            response = api.open(url, method='POST', json={**data, **invalid})
+            self.assertEqual(response.status_code, 400)
+
+    @patch('napps.kytos.pathfinder.graph.KytosGraph.shortest_path_dag')
+    def test_shortest_path_ecmp(self, mock_shortest_path_dag):
+        """Test the shortest path DAG is returned instead of the paths."""
+        dag = {'nodes': ["a", "b"], 'links': [["a", "b"]], 'paths': 1}
+        mock_shortest_path_dag.return_value = dag
+        api = get_test_client(self.napp.controller, self.napp)
+        url = "http://127.0.0.1:8181/api/kytos/pathfinder/v2"
+        data = {"source": "00:00:00:00:00:00:00:01:1",
+                "destination": "00:00:00:00:00:00:00:02:1",
+                "parameter": "delay", "ecmp": True}
+        response = api.open(url, method='POST', json=data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {'dag': dag, 'version': 0})
+        snapshot = self.napp.graph.snapshot
+        mock_shortest_path_dag.assert_called_with(
+            data['source'], data['destination'], "delay", [], None,
+            snapshot=snapshot, cancel=ANY)
+
+        for invalid in ({"ecmp": 1}, {"disjoint": "link"}, {"stream": True},
+                        {"desired_links": ["1"]},
+                        {"constraints": {"budget": {"delay": 5}}}):
+            response = api.open(url, method='POST', json={**data, **invalid})
+            self.assertEqual(response.status_code, 400)
+
+    @patch('napps.kytos.pathfinder.graph.KytosGraph.iter_shortest_paths')
+    def test_shortest_path_stream(self, mock_iter_shortest_paths):
+        """Test streamed paths are written as NDJSON lines.
+
+        Streams are refused when the workers are busy, and end with an error
+        past the timeout.
+        """
+        paths = [["a", "b"], ["a", "c", "b"]]
+        mock_iter_shortest_paths.return_value = iter(paths)
+
+        api = get_test_client(self.napp.controller, self.napp)
+        url = "http://127.0.0.1:8181/api/kytos/pathfinder/v2"
+        data = {"source": "00:00:00:00:00:00:00:01:1",
+                "destination": "00:00:00:00:00:00:00:02:1",
+                "stream": True}
+        response = api.open(url, method='POST', json=data)
+
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = [json.loads(line) for line in response.data.splitlines()]
+        self.assertEqual(lines, [{'version': 0}, {'hops': paths[0]},
+                                 {'hops': paths[1]}])
+
+        stats = self.napp.workers.get_stats()
+        self.assertEqual(stats['pending'], 0)
+        self.assertEqual(stats['completed'], 1)
+
+        mock_iter_shortest_paths.return_value = iter(paths)
+        with patch('napps.kytos.pathfinder.settings.PATH_TIMEOUT', -1):
+            response = api.open(url, method='POST', json=data)
+        lines = [json.loads(line) for line in response.data.splitlines()]
+        self.assertEqual(lines, [{'version': 0},
+                                 {'error': 'Path computation timed out.'}])
+
+        with patch.object(self.napp.workers, 'max_pending', 0):
+            response = api.open(url, method='POST', json=data)
+        self.assertEqual(response.status_code, 503)
+
+        data['stream'] = 'yes'
+        response = api.open(url, method='POST', json=data)
+        self.assertEqual(response.status_code, 400)
+
+    @patch('napps.kytos.pathfinder.workers.PathWorkers.run')
+    def test_shortest_path_unavailable(self, mock_run):
+        """Test shortest path answers 503 when the workers cannot serve."""
+        api = get_test_client(self.napp.controller, self.napp)
+        url = "http://127.0.0.1:8181/api/kytos/pathfinder/v2"
+        data = {"source": "00:00:00:00:00:00:00:01:1",
+                "destination": "00:00:00:00:00:00:00:02:1"}
+
+        for error in (Overloaded(), FutureTimeoutError()):
+            mock_run.side_effect = error
+            response = api.open(url, method='POST', json=data)
+            self.assertEqual(response.status_code, 503)
+        self.assertEqual(mock_run.call_args[1]['timeout'],
+                         settings.PATH_TIMEOUT)
+
+    @patch('napps.kytos.pathfinder.graph.KytosGraph.shortest_paths')
+    def test_shortest_path_unknown_desired_link(self, mock_shortest_paths):
+        """Test shortest path when a desired link does not exist."""
+        self.napp.graph.update_topology(get_topology_mock())
+
+        api = get_test_client(self.napp.controller, self.napp)
+        url = "http://127.0.0.1:8181/api/kytos/pathfinder/v2"
+        data = {"source": "00:00:00:00:00:00:00:01:1",
+                "destination": "00:00:00:00:00:00:00:02:1",
+                "desired_links": ["unknown"]}
+        response = api.open(url, method='POST', json=data)
+
+        self.assertEqual(response.json, {'paths': [], 'version': 1})
+        mock_shortest_paths.assert_not_called()
+
+    def test_backup_paths(self):
+        """Test served paths crossing failed links are rerouted."""
+        topology = get_mesh_topology_mock(4, [(1, 2, 1), (2, 4, 1),
+                                              (1, 3, 2), (3, 4, 2)])
+        self.napp.graph.update_topology(topology)
+        self.napp.backups.max_paths = 10
+        api = get_test_client(self.napp.controller, self.napp)
+        url = "http://127.0.0.1:8181/api/kytos/pathfinder/v2"
+        data = {"source": "00:00:00:00:00:00:00:01",
+                "destination": "00:00:00:00:00:00:00:04",
+                "parameter": "delay", "max_paths": 1}
+        path = api.open(url, method='POST', json=data).json['paths'][0]
+        self.assertTrue(self.napp.backups.wait(5))
+
+        topology.links["1"].is_active.return_value = False
+        self.napp._apply_topology(topology)
+        event = self.napp.controller.buffers.app.get()
+        self.assertEqual(event.name, 'kytos/pathfinder.paths_rerouted')
+        self.assertEqual(event.content['version'], 2)
+        rerouted = event.content['paths']
+        self.assertEqual(rerouted[0]['path'], path['hops'])
+        self.assertIn("00:00:00:00:00:00:00:03", rerouted[0]['backup'])
+
+    def test_snapshot_persistence(self):
+        """Test the snapshot saved on shutdown is loaded on setup."""
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "snapshot")
+            with patch('napps.kytos.pathfinder.settings.SNAPSHOT_FILE', path):
+                self.napp.graph.update_topology(
+                    get_mesh_topology_mock(2, [(1, 2, 1)]))
+                self.napp.shutdown()
+                self.assertTrue(os.path.exists(path))
+
+                napp = Main(get_controller_mock())
+                self.assertEqual(napp.graph.version, 1)
+                self.assertEqual(napp.graph.graph.number_of_edges(), 3)
+                with patch.object(napp.graph, 'save') as mock_save:
+                    napp.execute()
+                mock_save.assert_not_called()
+
+    @patch('napps.kytos.pathfinder.graph.KytosGraph.batch_shortest_paths')
+    def test_batch_shortest_paths(self, mock_batch_shortest_paths):
+        """Test batch shortest paths keeps the order of the queries."""
+        self.napp.graph.update_topology(get_topology_mock())
+        path = ["00:00:00:00:00:00:00:01:1", "00:00:00:00:00:00:00:02:1"]
+        mock_batch_shortest_paths.return_value = [[path], []]
+
+        api = get_test_client(self.napp.controller, self.napp)
+        url = "http://127.0.0.1:8181/api/kytos/pathfinder/v2/batch"
+        queries = [{"source": path[0], "destination": path[1],
+                    "max_paths": 1},
+                   {"source": path[0]},
+                   {"source": path[0], "destination": path[1],
+                    "desired_links": ["unknown"]},
+                   {"source": path[1], "destination": path[0],
+                    "max_paths": -1},
+                   {"source": path[1], "destination": path[0]}]
+        response = api.open(url, method='POST', json={"queries": queries})
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json['results']
+        self.assertEqual(results[0], {'paths': [{'hops': path}]})
+        self.assertIn('error', results[1])
+        self.assertEqual(results[2], {'paths': []})
+        self.assertIn('error', results[3])
+        self.assertEqual(results[4], {'paths': []})
+        self.assertEqual(response.json['version'], 1)
+
+        snapshot = self.napp.graph.snapshot
+        expected = [(path[0], path[1], None, 1, [], [], None),
+                    (path[1], path[0], None, settings.DEFAULT_MAX_PATHS,
+                     [], [], None)]
+        mock_batch_shortest_paths.assert_called_with(expected, snapshot,
+                                                     cancel=ANY)
+
+    def test_batch_shortest_paths_invalid(self):
+        """Test batch shortest paths without a list of queries."""
+        api = get_test_client(self.napp.controller, self.napp)
+        url = "http://127.0.0.1:8181/api/kytos/pathfinder/v2/batch"
+        response = api.open(url, method='POST', json={"queries": "any"})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class TestMainMetrics(TestCase):
+    """Tests for the counters and timings served by the Main class."""
+
+    def setUp(self):
+        """Execute steps before each tests."""
+        self.napp = Main(get_controller_mock())
+
+    def test_cache_stats(self):
+        """Test the path cache counters endpoint."""
+        api = get_test_client(self.napp.controller, self.napp)
+        url = "http://127.0.0.1:8181/api/kytos/pathfinder/v2/cache"
+        response = api.open(url, method='GET')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, self.napp.graph.cache.get_stats())
+
+    def test_metrics(self):
+        """Test the metrics endpoint in Prometheus text format."""
+        self.napp.graph.update_topology(get_topology_mock())
+        api = get_test_client(self.napp.controller, self.napp)
+        url = "http://127.0.0.1:8181/api/kytos/pathfinder/v2/metrics"
+        response = api.open(url, method='GET')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/plain')
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertIn('pathfinder_update_topology_seconds_count 1', lines)
+        self.assertIn('pathfinder_cache_hits_total 0', lines)
+        self.assertIn('pathfinder_workers_coalesced_total 0', lines)
+        self.assertIn('pathfinder_graph_nodes 9', lines)
+        self.assertIn('pathfinder_graph_version 1', lines)
+
+    @patch('napps.kytos.pathfinder.graph.KytosGraph.shortest_paths')
+    def test_shortest_path_profile(self, mock_shortest_paths):
+        """Test the phases of a profiled request are returned."""
+        mock_shortest_paths.return_value = [["a", "b"]]
+        api = get_test_client(self.napp.controller, self.napp)
+        url = "http://127.0.0.1:8181/api/kytos/pathfinder/v2"
+        data = {"source": "00:00:00:00:00:00:00:01:1",
+                "destination": "00:00:00:00:00:00:00:02:1"}
+        response = api.open(url, method='POST', json=data)
+        self.assertNotIn('profile', response.json)
+
+        response = api.open(url, method='POST', json={**data,
+                                                      'profile': True})
+        self.assertEqual(set(response.json['profile']),
+                         {'parse', 'search', 'serialize'})
+        self.assertIn('pathfinder_request_search_seconds_count 2',
+                      self.napp.graph.metrics.render())
+
+        response = api.open(url, method='POST',
+                            json={**data, 'profile': True, 'stream': True})
+        self.assertEqual(response.status_code, 400)
+
+    def test_stats(self):
+        """Test the counters endpoint."""
+        self.napp.updates.submit(get_topology_mock())
+        self.napp.updates.wait(5)
+        api = get_test_client(self.napp.controller, self.napp)
+        url = "http://127.0.0.1:8181/api/kytos/pathfinder/v2/stats"
+        response = api.open(url, method='GET')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json),
+                         {'cache', 'workers', 'topology_updates'})
+        self.assertEqual(response.json['topology_updates']['applied'], 1)
@@ -0,0 +1,49 @@
+"""Test Metrics methods."""
+from unittest import TestCase
+
+from napps.kytos.pathfinder.metrics import BUCKETS, Metrics
+
+
+class TestMetrics(TestCase):
+    """Tests for the Metrics class."""
+
+    def setUp(self):
+        """Create empty metrics."""
+        self.metrics = Metrics()
+
+    def test_render_histogram(self):
+        """Test histogram buckets are cumulative."""
+        for seconds in (BUCKETS[0], 0.003, 100):
+            self.metrics.observe('search', seconds)
+        lines = self.metrics.render().splitlines()
+
+        self.assertEqual(lines[0],
+                         '# TYPE pathfinder_search_seconds histogram')
+        self.assertIn('pathfinder_search_seconds_bucket'
+                      f'{{le="{BUCKETS[0]}"}} 1', lines)
+        self.assertIn('pathfinder_search_seconds_bucket{le="0.005"} 2', lines)
+        self.assertIn('pathfinder_search_seconds_bucket{le="+Inf"} 3', lines)
+        self.assertIn('pathfinder_search_seconds_count 3', lines)
+        self.assertEqual(lines[-2], 'pathfinder_search_seconds_sum '
+                         f'{BUCKETS[0] + 0.003 + 100}')
+
+    def test_timer(self):
+        """Test the timer observes even when the block raises."""
+        with self.assertRaises(ValueError), self.metrics.timer('update'):
+            raise ValueError
+        self.assertIn('pathfinder_update_seconds_count 1',
+                      self.metrics.render())
+
+    def test_render_counters_and_gauges(self):
+        """Test counters get a _total suffix and gauges are kept as is."""
+        self.metrics.count('paths_returned', 2)
+        self.metrics.count('paths_returned')
+        self.assertEqual(self.metrics.get_counter('paths_returned'), 3)
+
+        text = self.metrics.render({'cache_hits': 5}, {'graph_nodes': 9})
+        self.assertEqual(text, '# TYPE pathfinder_cache_hits_total counter\n'
+                         'pathfinder_cache_hits_total 5\n'
+                         '# TYPE pathfinder_paths_returned_total counter\n'
+                         'pathfinder_paths_returned_total 3\n'
+                         '# TYPE pathfinder_graph_nodes gauge\n'
+                         'pathfinder_graph_nodes 9\n')
@@ -0,0 +1,92 @@
+"""Test Partitions methods."""
+from itertools import permutations
+from unittest import TestCase
+from unittest.mock import patch
+
+from napps.kytos.pathfinder.graph import KytosGraph, NetworkxSearch
+from tests.helpers import get_mesh_topology_mock
+
+
+@patch('napps.kytos.pathfinder.settings.PARTITION_ATTRIBUTE', 'region')
+class TestPartitions(TestCase):
+    """Tests for the Partitions class."""
+
+    def setUp(self):
+        """Build two regions of three switches with links between them.
+
+        The cheapest path between switches 1 and 3, both in region "a",
+        goes through region "b".
+        """
+        self.topology = get_mesh_topology_mock(
+            6, [(1, 2, 1), (2, 3, 20), (1, 3, 5), (4, 5, 1), (5, 6, 1),
+                (4, 6, 5), (3, 4, 1), (1, 6, 1), (2, 5, 4)])
+        for number, switch in enumerate(self.topology.switches.values()):
+            switch.metadata = {"region": "a" if number < 3 else "b"}
+        self.kytos_graph = KytosGraph()
+        with patch('napps.kytos.pathfinder.settings.PARTITION_ATTRIBUTE',
+                   'region'):
+            self.kytos_graph.update_topology(self.topology)
+
+    def _update(self):
+        """Apply the topology and return the partitions of the graph."""
+        self.kytos_graph.update_topology(self.topology)
+        return self.kytos_graph.snapshot.partitions
+
+    def _assert_shortest(self, parameter):
+        """Assert every path costs the same as on the whole graph."""
+        snapshot = self.kytos_graph.snapshot
+        partitions = snapshot.partitions
+        search = NetworkxSearch(snapshot.graph)
+        nodes = list(snapshot.switches) + \
+            [next(iter(interfaces))
+             for interfaces in snapshot.switches.values()]
+        for source, destination in permutations(nodes, 2):
+            self.assertTrue(partitions.covers(source, destination,
+                                              parameter))
+            path = partitions.shortest_path(source, destination, parameter)
+            expected = search.shortest_path(source, destination, parameter)
+            self.assertEqual((path[0], path[-1]), (source, destination))
+            self.assertEqual(len(set(path)), len(path))
+            self.assertEqual(search.path_cost(path, parameter),
+                             search.path_cost(expected, parameter))
+
+    def test_shortest_path(self):
+        """Test paths through the overlay are the shortest ones."""
+        partitions = self.kytos_graph.snapshot.partitions
+        self.assertEqual(set(partitions.partitions), {"a", "b"})
+        self._assert_shortest("delay")
+        self._assert_shortest(None)
+
+        path = self.kytos_graph.shortest_paths(
+            "00:00:00:00:00:00:00:01", "00:00:00:00:00:00:00:03", "delay",
+            max_paths=1)[0]
+        self.assertIn("00:00:00:00:00:00:00:06", path)
+        self.assertFalse(partitions.covers("00:00:00:00:00:00:00:01",
+                                           "00:00:00:00:00:00:00:07"))
+
+    def test_rebuild(self):
+        """Test only the regions the changes touched are rebuilt."""
+        partitions = self.kytos_graph.snapshot.partitions
+        self.assertEqual(partitions.rebuilt, {"a", "b"})
+
+        self.topology.links["5"].metadata = {"delay": 30}
+        rebuilt = self._update()
+        self.assertEqual(rebuilt.rebuilt, {"b"})
+        self.assertIs(rebuilt.partitions["a"], partitions.partitions["a"])
+        self._assert_shortest("delay")
+
+        self.topology.links["8"].is_active.return_value = False
+        rebuilt = self._update()
+        self.assertEqual(rebuilt.rebuilt, set())
+        self.assertIs(rebuilt.partitions["a"].compact,
+                      partitions.partitions["a"].compact)
+        self._assert_shortest("delay")
+
+        switch = self.topology.switches["00:00:00:00:00:00:00:03"]
+        switch.metadata = {"region": "b"}
+        rebuilt = self._update()
+        self.assertEqual(rebuilt.rebuilt, {"a", "b"})
+        self.assertEqual(rebuilt.region("00:00:00:00:00:00:00:03"), "b")
+        self._assert_shortest("delay")
+        self.assertEqual(self.kytos_graph.metrics.get_counter(
+            'partitions_rebuilt'), 5)
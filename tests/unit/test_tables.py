@@ -0,0 +1,187 @@
+"""Test DistanceTables and TablesWorker methods."""
+from itertools import islice
+from math import inf
+from random import Random
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+import networkx as nx
+
+from napps.kytos.pathfinder.compact import CompactGraph
+from napps.kytos.pathfinder.tables import (DistanceTables, Landmarks,
+                                           TablesWorker)
+
+
+class TestDistanceTables(TestCase):
+    """Tests for the DistanceTables class."""
+
+    def setUp(self):
+        """Create a weighted random graph and its tables."""
+        self.graph = nx.gnm_random_graph(30, 60, seed=5)
+        self.random = Random(5)
+        for edge in self.graph.edges:
+            self.graph.edges[edge]['delay'] = self.random.randint(1, 20)
+        self.compact = CompactGraph.from_graph(self.graph)
+        self.tables = DistanceTables(self.compact, [None, 'delay'])
+
+    def _assert_shortest(self, tables, graph):
+        """Assert every table path is a shortest path of the graph."""
+        lengths = dict(nx.all_pairs_dijkstra_path_length(graph,
+                                                         weight='delay'))
+        for source in graph:
+            for destination in graph:
+                if destination not in lengths[source]:
+                    self.assertIsNone(tables.path(source, destination,
+                                                  'delay'))
+                    continue
+                nodes, _ = tables.path(source, destination, 'delay')
+                path = [tables.graph.nodes[node] for node in nodes]
+                self.assertEqual(sum(graph.edges[hop]['delay']
+                                     for hop in zip(path[:-1], path[1:])),
+                                 lengths[source][destination])
+
+    def test_path(self):
+        """Test table paths are shortest paths for every pair."""
+        self.assertEqual(self.tables.rebuilt_rows, 60)
+        self.assertTrue(self.tables.has('delay', 0, 29))
+        self.assertFalse(self.tables.has('unknown', 0, 29))
+        self.assertFalse(self.tables.has('delay', 0, 99))
+        nodes, edges = self.tables.path(0, 0, None)
+        self.assertEqual((nodes, edges), ([self.compact.index[0]], []))
+        self._assert_shortest(self.tables, self.graph)
+
+    def test_incremental(self):
+        """Test only the rows affected by weight changes are rebuilt."""
+        for edge in self.random.sample(list(self.graph.edges), 3):
+            self.graph.edges[edge]['delay'] = self.random.randint(1, 20)
+        compact = CompactGraph.from_graph(self.graph)
+        tables = DistanceTables(compact, [None, 'delay'], self.tables)
+
+        self.assertLess(tables.rebuilt_rows, 30)
+        self.assertIs(tables.distances[None][0],
+                      self.tables.distances[None][0])
+        self._assert_shortest(tables, self.graph)
+
+        self.graph.add_edge(0, 29, delay=1)
+        compact = CompactGraph.from_graph(self.graph)
+        tables = DistanceTables(compact, ['delay'], tables)
+        self.assertEqual(tables.rebuilt_rows, 30)
+
+    def test_repair(self):
+        """Test repaired rows stay shortest through weight changes."""
+        tables = self.tables
+        for _ in range(10):
+            for edge in self.random.sample(list(self.graph.edges), 4):
+                self.graph.edges[edge]['delay'] = self.random.randint(1, 20)
+            compact = CompactGraph.from_graph(self.graph)
+            tables = DistanceTables(compact, ['delay'], tables)
+
+            self.assertEqual(tables.rebuilt_rows, 0)
+            self._assert_shortest(tables, self.graph)
+        self.assertGreater(tables.repaired_rows, 0)
+
+        unchanged = DistanceTables(compact, ['delay'], tables)
+        self.assertEqual(unchanged.repaired_rows, 0)
+        self.assertIs(unchanged.parents['delay'][0],
+                      tables.parents['delay'][0])
+
+
+class TestLandmarks(TestCase):
+    """Tests for the Landmarks class."""
+
+    def setUp(self):
+        """Create a weighted random graph with two components."""
+        self.graph = nx.disjoint_union(nx.gnm_random_graph(40, 80, seed=3),
+                                       nx.path_graph(5))
+        random = Random(3)
+        for edge in self.graph.edges:
+            self.graph.edges[edge]['delay'] = random.randint(1, 20)
+        self.compact = CompactGraph.from_graph(self.graph)
+        self.landmarks = Landmarks(self.compact, 'delay', 4)
+
+    def test_bounds(self):
+        """Test landmark bounds never exceed the distances."""
+        self.assertEqual(len(self.landmarks.nodes), 4)
+        self.assertTrue(any(self.compact.index[node] in self.landmarks.nodes
+                            for node in range(40, 45)))
+        lengths = dict(nx.all_pairs_dijkstra_path_length(self.graph,
+                                                         weight='delay'))
+        for target in (0, 17, 42):
+            bound = self.landmarks.heuristic(self.compact.index[target])
+            for node in self.graph:
+                expected = lengths[node].get(target, inf)
+                self.assertLessEqual(bound(self.compact.index[node]),
+                                     expected)
+        bound = self.landmarks.heuristic(self.compact.index[42])
+        self.assertEqual(bound(self.compact.index[0]), inf)
+
+    def test_shortest_simple_paths(self):
+        """Test guided searches find paths as cheap as unguided ones."""
+        expected = list(islice(self.compact.shortest_simple_paths(
+            0, 39, 'delay'), 50))
+        self.compact.set_landmarks(self.landmarks)
+        self.assertIs(self.compact.get_landmarks(
+            self.compact.column('delay')), self.landmarks)
+        self.assertIsNone(self.compact.get_landmarks(
+            self.compact.column(None)))
+
+        paths = list(islice(self.compact.shortest_simple_paths(
+            0, 39, 'delay'), 50))
+        self.assertEqual([self.compact.path_cost(path, 'delay')
+                          for path in paths],
+                         [self.compact.path_cost(path, 'delay')
+                          for path in expected])
+        self.assertIsNone(self.compact.shortest_path(0, 42, 'delay'))
+
+    def test_previous(self):
+        """Test landmarks of a graph with the same nodes are kept."""
+        for edge in self.graph.edges:
+            self.graph.edges[edge]['delay'] += 1
+        compact = CompactGraph.from_graph(self.graph)
+        landmarks = Landmarks(compact, 'delay', 4, self.landmarks)
+
+        self.assertEqual(landmarks.nodes, self.landmarks.nodes)
+        self.assertNotEqual(landmarks.rows, self.landmarks.rows)
+
+
+class TestTablesWorker(TestCase):
+    """Tests for the TablesWorker class."""
+
+    @patch('napps.kytos.pathfinder.settings.DISTANCE_TABLES', [None])
+    @patch('napps.kytos.pathfinder.settings.DISTANCE_TABLES_MAX_NODES', 3)
+    def test_submit(self):
+        """Test tables are built in background for the latest snapshot."""
+        graph = nx.path_graph(3)
+        worker = TablesWorker()
+        snapshot = MagicMock(tables=None)
+        snapshot.switch_graph = CompactGraph.from_graph(graph)
+        worker.submit(snapshot)
+
+        self.assertTrue(worker.wait(5))
+        self.assertIs(snapshot.tables, worker.tables)
+        self.assertEqual(snapshot.tables.path(0, 2)[0], [0, 1, 2])
+
+        other = MagicMock(tables=None)
+        other.switch_graph = CompactGraph.from_graph(nx.path_graph(4))
+        worker.submit(other)
+        self.assertTrue(worker.wait(5))
+        self.assertIsNone(other.tables)
+
+    @patch('napps.kytos.pathfinder.settings.LANDMARK_METRICS', ['delay'])
+    @patch('napps.kytos.pathfinder.settings.LANDMARKS', 2)
+    @patch('napps.kytos.pathfinder.settings.DISTANCE_TABLES', [])
+    @patch('napps.kytos.pathfinder.settings.GRAPH_BACKEND', 'compact')
+    def test_submit_landmarks(self):
+        """Test landmarks are set on the searched graphs in background."""
+        worker = TablesWorker()
+        snapshot = MagicMock(tables=None)
+        snapshot.switch_graph = CompactGraph.from_graph(nx.path_graph(4))
+        snapshot.compact = CompactGraph.from_graph(nx.path_graph(6))
+        worker.submit(snapshot)
+
+        self.assertTrue(worker.wait(5))
+        self.assertIsNone(snapshot.tables)
+        for graph in (snapshot.switch_graph, snapshot.compact):
+            landmarks = graph.get_landmarks(graph.column('delay'))
+            self.assertEqual(len(landmarks.nodes), 2)
+        self.assertEqual(len(worker.landmarks), 2)
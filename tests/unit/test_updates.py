@@ -0,0 +1,59 @@
+"""Test Updates methods."""
+from time import sleep
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from napps.kytos.pathfinder.updates import TopologyUpdates
+
+
+class TestTopologyUpdates(TestCase):
+    """Tests for the TopologyUpdates class."""
+
+    def test_submit_without_window(self):
+        """Test every topology is applied right away without a window."""
+        apply = MagicMock()
+        updates = TopologyUpdates(apply, 0, 1)
+        updates.submit('first')
+        updates.submit('second')
+
+        self.assertEqual(apply.call_count, 2)
+        stats = updates.get_stats()
+        self.assertEqual((stats['received'], stats['applied']), (2, 2))
+
+    def test_submit_burst(self):
+        """Test a burst of topologies is applied once, with the last one."""
+        apply = MagicMock()
+        updates = TopologyUpdates(apply, 0.05, 10)
+        for topology in range(5):
+            updates.submit(topology)
+        self.assertTrue(updates.wait(5))
+
+        apply.assert_called_once_with(4)
+        stats = updates.get_stats()
+        self.assertEqual((stats['received'], stats['applied']), (5, 1))
+        self.assertGreaterEqual(stats['rebuild_seconds'],
+                                stats['last_rebuild_seconds'])
+
+    def test_submit_max_staleness(self):
+        """Test a long burst is applied once the staleness bound expires."""
+        apply = MagicMock()
+        updates = TopologyUpdates(apply, 0.2, 0.1)
+        for topology in range(10):
+            updates.submit(topology)
+            sleep(0.03)
+        self.assertTrue(updates.wait(5))
+
+        self.assertGreater(apply.call_count, 1)
+        self.assertEqual(apply.call_args[0][0], 9)
+
+    def test_submit_failure(self):
+        """Test failed updates are counted and do not stop the updates."""
+        apply = MagicMock(side_effect=[ValueError, None])
+        updates = TopologyUpdates(apply, 0.01, 1)
+        updates.submit('first')
+        self.assertTrue(updates.wait(5))
+        updates.submit('second')
+        self.assertTrue(updates.wait(5))
+
+        stats = updates.get_stats()
+        self.assertEqual((stats['applied'], stats['failed']), (1, 1))
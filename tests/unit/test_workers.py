@@ -0,0 +1,160 @@
+"""Test Workers methods."""
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from threading import Event, Thread
+from time import sleep
+from unittest import TestCase
+
+from napps.kytos.pathfinder.workers import Cancelled, Overloaded, PathWorkers
+
+
+class TestPathWorkers(TestCase):
+    """Tests for the PathWorkers class."""
+
+    def setUp(self):
+        """Create a pool with one thread and one queued computation."""
+        self.workers = PathWorkers(1, 1)
+        self.release = Event()
+
+    def tearDown(self):
+        """Release the blocked computations and stop the pool."""
+        self.release.set()
+        self.workers.shutdown()
+
+    def _blocked(self, cancel):
+        """Wait until released or cancelled."""
+        while not self.release.wait(0.01):
+            if cancel.is_set():
+                raise Cancelled
+        return 'done'
+
+    def _stats(self):
+        """Return the pool counters once no computation is pending."""
+        while self.workers.get_stats()['pending']:
+            sleep(0.01)
+        return self.workers.get_stats()
+
+    def test_run(self):
+        """Test the result and arguments of a computation."""
+        result = self.workers.run(lambda value, cancel: (value, cancel),
+                                  'value')
+
+        self.assertEqual(result[0], 'value')
+        self.assertFalse(result[1].is_set())
+
+    def test_run_timeout(self):
+        """Test a late computation is cancelled."""
+        with self.assertRaises(FutureTimeoutError):
+            self.workers.run(self._blocked, timeout=0.05)
+
+        self.assertEqual(self.workers.run(lambda cancel: 'next',
+                                          timeout=5), 'next')
+        stats = self._stats()
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertEqual(stats['cancelled'], 1)
+        self.assertEqual(stats['completed'], 1)
+
+    def test_run_overloaded(self):
+        """Test computations beyond the queue depth are refused."""
+        callers = [Thread(target=self.workers.run, args=(self._blocked,))
+                   for _ in range(2)]
+        for caller in callers:
+            caller.start()
+        while self.workers.get_stats()['pending'] < 2:
+            sleep(0.01)
+
+        with self.assertRaises(Overloaded):
+            self.workers.run(self._blocked)
+        self.release.set()
+        for caller in callers:
+            caller.join()
+        stats = self._stats()
+        self.assertEqual(stats['rejected'], 1)
+        self.assertEqual(stats['completed'], 2)
+
+    def test_run_error(self):
+        """Test errors of a computation are raised to the caller."""
+        def fail(cancel):
+            raise ValueError(cancel)
+
+        with self.assertRaises(ValueError):
+            self.workers.run(fail)
+        self.assertEqual(self._stats()['completed'], 1)
+
+    def test_run_coalesced(self):
+        """Test callers of the same key share one computation."""
+        calls = []
+
+        def blocked(cancel):
+            calls.append(cancel)
+            return self._blocked(cancel)
+
+        results = []
+        caller = Thread(target=lambda: results.append(
+            self.workers.run(blocked, key='query')))
+        caller.start()
+        while not calls:
+            sleep(0.01)
+        with self.assertRaises(FutureTimeoutError):
+            self.workers.run(blocked, timeout=0.05, key='query')
+        self.release.set()
+        caller.join()
+
+        self.assertEqual(results, ['done'])
+        self.assertEqual(len(calls), 1)
+        self.assertFalse(calls[0].is_set())
+        stats = self._stats()
+        self.assertEqual(stats['coalesced'], 1)
+        self.assertEqual(stats['cancelled'], 0)
+        self.assertEqual(stats['completed'], 1)
+        self.assertEqual(self.workers.run(lambda cancel: 'other',
+                                          key='other'), 'other')
+
+    def test_stream(self):
+        """Test a stream holds a slot until it ends."""
+        stream = self.workers.stream(iter, ['a', 'b'])
+        self.assertEqual(self.workers.get_stats()['pending'], 1)
+        self.assertEqual(list(stream), ['a', 'b'])
+        stream.close()
+
+        stats = self.workers.get_stats()
+        self.assertEqual(stats['pending'], 0)
+        self.assertEqual(stats['completed'], 1)
+
+    def test_stream_overloaded(self):
+        """Test streams are refused when the pool is full."""
+        streams = [self.workers.stream(iter, 'ab') for _ in range(2)]
+        with self.assertRaises(Overloaded):
+            self.workers.stream(iter, 'ab')
+        with self.assertRaises(Overloaded):
+            self.workers.run(self._blocked)
+
+        for stream in streams:
+            self.assertEqual(next(stream), 'a')
+            stream.close()
+        stats = self.workers.get_stats()
+        self.assertEqual(stats['pending'], 0)
+        self.assertEqual(stats['cancelled'], 2)
+        self.assertEqual(stats['rejected'], 2)
+
+    def test_stream_timeout(self):
+        """Test reading a stream past its deadline fails."""
+        closed = Event()
+
+        def results():
+            try:
+                yield 'a'
+                sleep(0.05)
+                yield 'b'
+            finally:
+                closed.set()
+
+        stream = self.workers.stream(results, timeout=0.02)
+        self.assertEqual(next(stream), 'a')
+        self.assertEqual(next(stream), 'b')
+        with self.assertRaises(FutureTimeoutError):
+            next(stream)
+        self.assertTrue(closed.is_set())
+        self.assertEqual(list(stream), [])
+        stats = self.workers.get_stats()
+        self.assertEqual(stats['pending'], 0)
+        self.assertEqual(stats['timeouts'], 1)
@@ -0,0 +1,98 @@
+"""Module Updates of kytos/pathfinder Kytos Network Application."""
+
+from threading import Condition, Thread
+from time import monotonic
+
+from kytos.core import log
+
+
+class TopologyUpdates:
+    """Coalesce bursts of topology events into single graph updates.
+
+    Every submitted topology replaces the pending one, which is applied
+    once no other topology was submitted for ``window`` seconds, or at
+    most ``max_staleness`` seconds after the first topology of the burst.
+    A zero window applies each topology right away in the submitting
+    thread.
+    """
+
+    def __init__(self, apply, window, max_staleness):
+        self.window = window
+        self.max_staleness = max_staleness
+        self.stats = {'received': 0, 'applied': 0, 'failed': 0,
+                      'rebuild_seconds': 0.0, 'last_rebuild_seconds': 0.0}
+        self._apply = apply
+        self._pending = None
+        self._first = self._last = 0.0
+        self._busy = False
+        self._condition = Condition()
+        self._thread = None
+
+    def submit(self, topology):
+        """Schedule a topology to be applied."""
+        with self._condition:
+            self.stats['received'] += 1
+            if self.window <= 0:
+                self._busy = True
+            else:
+                now = monotonic()
+                if self._pending is None:
+                    self._first = now
+                self._pending = topology
+                self._last = now
+                if self._thread is None:
+                    self._thread = Thread(target=self._run, daemon=True,
+                                          name='pathfinder-updates')
+                    self._thread.start()
+                self._condition.notify_all()
+                return
+        self._update(topology)
+
+    def wait(self, timeout=None):
+        """Wait until every submitted topology was applied.
+
+        Return False if the timeout expired first.
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._pending is None and not self._busy, timeout)
+
+    def get_stats(self):
+        """Return the event counters and the graph update times."""
+        with self._condition:
+            return dict(self.stats)
+
+    def _deadline(self):
+        """Return when the pending topology must be applied."""
+        return min(self._last + self.window,
+                   self._first + self.max_staleness)
+
+    def _run(self):
+        """Apply the pending topologies once their bursts end, forever."""
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending is not None)
+                remaining = self._deadline() - monotonic()
+                while remaining > 0:
+                    self._condition.wait(remaining)
+                    remaining = self._deadline() - monotonic()
+                topology, self._pending = self._pending, None
+                self._busy = True
+            self._update(topology)
+
+    def _update(self, topology):
+        """Apply a topology, timing how long it takes."""
+        start = monotonic()
+        result = 'applied'
+        try:
+            self._apply(topology)
+        except Exception as error:  # pylint: disable=broad-except
+            log.error(f'Topology update not applied: {error}')
+            result = 'failed'
+        elapsed = monotonic() - start
+        with self._condition:
+            self.stats[result] += 1
+            self.stats['rebuild_seconds'] += elapsed
+            self.stats['last_rebuild_seconds'] = elapsed
+            self._busy = False
+            self._condition.notify_all()
@@ -0,0 +1,197 @@
+"""Module Workers of kytos/pathfinder Kytos Network Application."""
+
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from threading import Event, Lock
+from time import monotonic
+
+
+class Overloaded(Exception):
+    """The worker pool has too many pending computations."""
+
+
+class Cancelled(Exception):
+    """A computation was cancelled before it finished."""
+
+
+class PathStream:
+    """Iterator over the results of a computation, run as they are read.
+
+    The stream holds a slot of its PathWorkers until it is exhausted or
+    closed. Once ``timeout`` seconds passed since it was created, reading
+    the next result raises concurrent.futures.TimeoutError instead.
+    """
+
+    def __init__(self, workers, results, timeout=None):
+        self._workers = workers
+        self._results = results
+        self._deadline = None if timeout is None else monotonic() + timeout
+        self._finished = False
+        self._lock = Lock()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._finished:
+            raise StopIteration
+        if self._deadline is not None and monotonic() > self._deadline:
+            self._finish('timeouts', 'cancelled')
+            raise FutureTimeoutError
+        try:
+            return next(self._results)
+        except Exception:
+            self._finish('completed')
+            raise
+
+    def _finish(self, *stats):
+        """Close the results and give the slot back, once."""
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+        if hasattr(self._results, 'close'):
+            self._results.close()
+        self._workers.release(*stats)
+
+    def close(self):
+        """Stop the computation if it did not finish yet."""
+        self._finish('cancelled')
+
+
+class PathWorkers:
+    """Pool of threads running the path computations of requests.
+
+    At most ``workers`` computations run at once and ``queue_depth`` more
+    wait for a thread; further submissions are refused with Overloaded.
+    Every computation gets a cancellation Event, set when its callers stop
+    waiting for it, which the searches check between the paths they yield.
+
+    Computations run with a key are single-flight: callers running the same
+    key while it is in flight wait for the same computation instead of
+    starting another one, and are counted as coalesced.
+    """
+
+    def __init__(self, workers, queue_depth):
+        self.max_pending = workers + queue_depth
+        self.stats = {'completed': 0, 'rejected': 0, 'timeouts': 0,
+                      'cancelled': 0, 'coalesced': 0}
+        self._pending = 0
+        self._flights = {}
+        self._lock = Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='pathfinder-paths')
+
+    def _admit(self):
+        """Count a computation in the pending ones, if there is room."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.stats['rejected'] += 1
+                raise Overloaded('Too many path computations pending.')
+            self._pending += 1
+
+    def release(self, *stats):
+        """Count a computation out of the pending ones, and in ``stats``."""
+        with self._lock:
+            self._pending -= 1
+            for name in stats:
+                self.stats[name] += 1
+
+    def _done(self, future):
+        """Count a finished computation out of the pending ones."""
+        if future.cancelled() or isinstance(future.exception(), Cancelled):
+            self.release('cancelled')
+        else:
+            self.release('completed')
+
+    def _submit(self, function, args, kwargs, key):
+        """Submit a computation, or join the one in flight for the key.
+
+        Return its flight: the future, the cancellation Event and the
+        number of callers waiting for it.
+        """
+        with self._lock:
+            flight = self._flights.get(key) if key is not None else None
+            if flight is not None:
+                flight[2] += 1
+                self.stats['coalesced'] += 1
+                return flight
+        self._admit()
+        cancel = Event()
+        try:
+            future = self._executor.submit(function, *args, cancel=cancel,
+                                           **kwargs)
+        except RuntimeError:
+            self.release()
+            raise
+        flight = [future, cancel, 1]
+        if key is not None:
+            with self._lock:
+                self._flights.setdefault(key, flight)
+            future.add_done_callback(lambda _: self._land(key, flight))
+        future.add_done_callback(self._done)
+        return flight
+
+    def _land(self, key, flight):
+        """Stop offering a flight to the callers of its key."""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def run(self, function, *args, timeout=None, key=None, **kwargs):
+        """Run ``function(*args, cancel=event, **kwargs)`` on the pool.
+
+        Wait at most ``timeout`` seconds for its result. Raise Overloaded
+        when the pool is full, and concurrent.futures.TimeoutError when the
+        result is late. Whenever the last caller stops waiting, including on
+        errors raised in its thread, the computation is cancelled: dropped
+        if it did not start yet, or signalled through its Event otherwise.
+
+        With a hashable ``key``, the computation in flight for the same key
+        is joined if there is one, its result being shared by every caller.
+        The key must tell apart every computation with other results.
+        """
+        flight = self._submit(function, args, kwargs, key)
+        future, cancel, _ = flight
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self.stats['timeouts'] += 1
+            raise
+        finally:
+            with self._lock:
+                flight[2] -= 1
+                abandoned = not flight[2] and not future.done()
+                if abandoned and self._flights.get(key) is flight:
+                    del self._flights[key]
+            if abandoned:
+                cancel.set()
+                future.cancel()
+
+    def stream(self, function, *args, timeout=None, **kwargs):
+        """Return a PathStream over the results of a computation.
+
+        The results ``function(*args, **kwargs)`` yields are computed in the
+        thread reading the stream, which takes a pending slot as the ones of
+        ``run`` until it ends, and reads past ``timeout`` seconds fail.
+        Raise Overloaded when the pool is full.
+        """
+        self._admit()
+        try:
+            results = iter(function(*args, **kwargs))
+        except Exception:
+            self.release('completed')
+            raise
+        return PathStream(self, results, timeout)
+
+    def get_stats(self):
+        """Return the pool counters and its pending computations."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['pending'] = self._pending
+        return stats
+
+    def shutdown(self):
+        """Stop the threads once the running computations finish."""
+        self._executor.shutdown(wait=False)